@@ -3,31 +3,51 @@ Analysis of GraphQL vs REST CSV results.
 Generates stats, tests, visualizations, and a Markdown report.
 """
 import os
+import sys
 import math
 import json
 from typing import Tuple
 
+if __package__ in (None, ""):
+    # Run as a script (python src/analyzers/analyze_results.py): make the
+    # package-relative imports below resolve.
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+    __package__ = "src.analyzers"
+
 import pandas as pd
 import numpy as np
 from scipy import stats
 import matplotlib.pyplot as plt
 import seaborn as sns
 
+from .result_loader import latest_results, load_results, result_columns
+from .run_files import load_overhead
+
 RESULTS_DIR = "results"
 OUTPUT_DIR = os.path.join("results", "analysis")
 REPORT_MD = os.path.join(OUTPUT_DIR, "analysis_report.md")
 PLOTS_DIR = os.path.join(OUTPUT_DIR, "plots")
+STRATIFIED_CSV = os.path.join(OUTPUT_DIR, "stratified_summary.csv")
 
-os.makedirs(OUTPUT_DIR, exist_ok=True)
-os.makedirs(PLOTS_DIR, exist_ok=True)
+BOOTSTRAP_RESAMPLES = 2000
+BOOTSTRAP_SEED = 42
+# Upper bound on values ranked at once (resamples per batch x sample size).
+BOOTSTRAP_BATCH_CELLS = 2_000_000
 
+# Everything the report needs; other columns are not read.
+ANALYSIS_COLUMNS = ["api_type", "query_type", "cache_state", "concurrent_clients",
+                    "response_time_ms", "payload_size_bytes", "status_code"]
+# Read as well when the run has them (older runs do not).
+OPTIONAL_COLUMNS = ["rate_limited", "connection_mode", "query_mode", "fanout_strategy"]
 
-def _load_latest_csv() -> str:
-    files = [f for f in os.listdir(RESULTS_DIR) if f.endswith(".csv")]
-    if not files:
-        raise FileNotFoundError("No CSV files found in results directory.")
-    latest = sorted(files)[-1]
-    return os.path.join(RESULTS_DIR, latest)
+# Treatment factors other than api_type; each combination is one cell of the
+# stratified analysis. P-values are adjusted across cells per metric.
+STRATA = ["query_type", "cache_state", "concurrent_clients", "connection_mode"]
+# Factors of one API only (blank on the other's rows). When one varies, each
+# of that API's variants is compared with each variant of the other API.
+API_FACTORS = {"REST": "fanout_strategy", "GraphQL": "query_mode"}
+ALPHA = 0.05
+P_ADJUST = "holm"
 
 
 def _validate(df: pd.DataFrame) -> pd.DataFrame:
@@ -35,6 +55,12 @@ def _validate(df: pd.DataFrame) -> pd.DataFrame:
     df = df[df["response_time_ms"].between(0, 600000)]
     df = df[df["payload_size_bytes"] >= 0]
     df = df[df["status_code"].between(0, 599)]
+    if "rate_limited" in df.columns:
+        # Rejections for a spent rate limit measure the quota, not the API.
+        limited = df["rate_limited"] == 1
+        if limited.any():
+            print(f"Excluding {int(limited.sum())} rate-limited rows")
+        df = df[~limited]
     return df
 
 
@@ -59,9 +85,47 @@ def _normality(series: pd.Series) -> Tuple[float, float]:
     return stat, p
 
 
+def cliffs_delta(a: np.ndarray, b: np.ndarray) -> float:
+    """P(a > b) - P(a < b) over all pairs, in O((n + m) log m)."""
+    b = np.sort(b)
+    below = np.searchsorted(b, a, side="left").sum()
+    above = (len(b) - np.searchsorted(b, a, side="right")).sum()
+    return float((below - above) / (len(a) * len(b)))
+
+
+def cliffs_delta_ci(a: np.ndarray, b: np.ndarray, resamples: int = BOOTSTRAP_RESAMPLES, level: float = 0.95, seed: int = BOOTSTRAP_SEED) -> Tuple[float, float]:
+    """
+    Percentile bootstrap interval for Cliff's delta. Each batch of resamples
+    is ranked jointly, using delta = 2U / (n m) - 1 with U from the rank sum.
+    """
+    a = np.asarray(a, dtype=float)
+    b = np.asarray(b, dtype=float)
+    n, m = len(a), len(b)
+    rng = np.random.default_rng(seed)
+    batch = max(1, BOOTSTRAP_BATCH_CELLS // (n + m))
+    deltas = []
+    for start in range(0, resamples, batch):
+        k = min(batch, resamples - start)
+        sample = np.concatenate([
+            a[rng.integers(0, n, size=(k, n))],
+            b[rng.integers(0, m, size=(k, m))],
+        ], axis=1)
+        ranks = stats.rankdata(sample, axis=1)
+        u = ranks[:, :n].sum(axis=1) - n * (n + 1) / 2
+        deltas.append(2 * u / (n * m) - 1)
+    deltas = np.concatenate(deltas)
+    tail = (1 - level) / 2 * 100
+    low, high = np.percentile(deltas, [tail, 100 - tail])
+    return float(low), float(high)
+
+
 def _compare_groups(df: pd.DataFrame, col: str) -> dict:
     rest = df[df["api_type"] == "REST"][col].dropna()
     gql = df[df["api_type"] == "GraphQL"][col].dropna()
+    return _compare(rest, gql)
+
+
+def _compare(rest: pd.Series, gql: pd.Series) -> dict:
     sh_rest = _normality(rest)[1]
     sh_gql = _normality(gql)[1]
     method = "mannwhitney"
@@ -76,17 +140,134 @@ def _compare_groups(df: pd.DataFrame, col: str) -> dict:
         stat, pval = stats.mannwhitneyu(rest, gql, alternative="two-sided")
 
     eff = np.nan
-    try:
-        def cliffs_delta(a, b):
-            gt = sum(x > y for x in a for y in b)
-            lt = sum(x < y for x in a for y in b)
-            return (gt - lt) / (len(a) * len(b))
-        eff = cliffs_delta(list(rest.sample(min(1000, len(rest)), replace=False)), list(
-            gql.sample(min(1000, len(gql)), replace=False)))
-    except Exception:
-        pass
+    ci = (np.nan, np.nan)
+    if len(rest) and len(gql):
+        eff = cliffs_delta(rest.to_numpy(), gql.to_numpy())
+        ci = cliffs_delta_ci(rest.to_numpy(), gql.to_numpy())
+
+    return {"method": method, "stat": float(stat) if not np.isnan(stat) else np.nan, "p": float(pval) if not np.isnan(pval) else np.nan, "effect": eff, "effect_ci": ci}
+
+
+def adjust_pvalues(pvals, method: str = P_ADJUST) -> np.ndarray:
+    """Holm (family-wise) or Benjamini-Hochberg ("fdr_bh") adjustment; NaNs are left out."""
+    p = np.asarray(pvals, dtype=float)
+    out = np.full_like(p, np.nan)
+    valid = ~np.isnan(p)
+    m = int(valid.sum())
+    if m == 0:
+        return out
+    order = np.argsort(p[valid])
+    ranked = p[valid][order]
+    if method == "holm":
+        adj = np.maximum.accumulate(ranked * (m - np.arange(m)))
+    elif method == "fdr_bh":
+        adj = np.minimum.accumulate(
+            (ranked * m / np.arange(1, m + 1))[::-1])[::-1]
+    else:
+        raise ValueError(f"Unknown p-value adjustment: {method}")
+    restored = np.empty(m)
+    restored[order] = np.minimum(adj, 1.0)
+    out[valid] = restored
+    return out
+
+
+def _variants(df: pd.DataFrame, api: str) -> list:
+    """(factor value, rows) for each variant of `api` within one cell."""
+    rows = df[df["api_type"] == api]
+    col = API_FACTORS[api]
+    if col not in df.columns or df.loc[df["api_type"] == api, col].nunique() < 2:
+        return [(None, rows)]
+    return list(rows.groupby(col, observed=True, sort=True))
 
-    return {"method": method, "stat": float(stat) if not np.isnan(stat) else np.nan, "p": float(pval) if not np.isnan(pval) else np.nan, "effect": eff}
+
+def _summary(series: pd.Series) -> Tuple[int, float, float]:
+    if series.empty:
+        return 0, np.nan, np.nan
+    return int(series.count()), float(series.median()), float(series.quantile(0.95))
+
+
+def _stratified(df: pd.DataFrame, cols: list) -> pd.DataFrame:
+    """REST vs GraphQL per treatment cell and metric, one row each."""
+    strata = [c for c in STRATA if c in df.columns]
+    df = df.copy()
+    for col in API_FACTORS.values():
+        if col in df.columns:
+            df[col] = df[col].astype(object).fillna("").astype(str)
+    rows = []
+    for key, cell in df.groupby(strata, observed=True, sort=True):
+        key = key if isinstance(key, tuple) else (key,)
+        for rest_variant, rest in _variants(cell, "REST"):
+            for gql_variant, gql in _variants(cell, "GraphQL"):
+                factors = dict(zip(strata, key))
+                for api, variant in (("REST", rest_variant), ("GraphQL", gql_variant)):
+                    if variant is not None:
+                        factors[API_FACTORS[api]] = variant
+                for col in cols:
+                    row = {**factors, "metric": col}
+                    samples = {"rest": rest[col].dropna(), "graphql": gql[col].dropna()}
+                    for suffix, series in samples.items():
+                        row[f"n_{suffix}"], row[f"median_{suffix}"], row[f"p95_{suffix}"] = _summary(series)
+                    if row["n_rest"] >= 2 and row["n_graphql"] >= 2:
+                        test = _compare(samples["rest"], samples["graphql"])
+                    else:
+                        test = {"method": "n/a", "stat": np.nan, "p": np.nan,
+                                "effect": np.nan, "effect_ci": (np.nan, np.nan)}
+                    row.update(method=test["method"], p=test["p"], effect=test["effect"],
+                               effect_ci_low=test["effect_ci"][0], effect_ci_high=test["effect_ci"][1])
+                    rows.append(row)
+    table = pd.DataFrame(rows)
+    if table.empty:
+        return table
+    # Cell columns first, whichever API factors varied.
+    cells = [c for c in strata + list(API_FACTORS.values()) if c in table.columns]
+    table = table[cells + [c for c in table.columns if c not in cells]]
+    table["p_adj"] = np.nan
+    for col in cols:
+        mask = table["metric"] == col
+        table.loc[mask, "p_adj"] = adjust_pvalues(table.loc[mask, "p"])
+    table["reject_h0"] = table["p_adj"] < ALPHA
+    return table
+
+
+def _fmt(x) -> str:
+    if isinstance(x, (float, np.floating)):
+        return "—" if np.isnan(x) else f"{x:.4g}"
+    return str(x)
+
+
+def _stratified_lines(table: pd.DataFrame) -> list:
+    cells = list(table.columns[:table.columns.get_loc("metric")])
+    lines = ["## Análise estratificada por tratamento", "",
+             f"Comparação REST vs GraphQL em cada célula ({', '.join(cells)}); "
+             f"p-valores ajustados por {P_ADJUST} dentro de cada métrica (alfa = {ALPHA}). "
+             f"Tabela completa em `{os.path.basename(STRATIFIED_CSV)}`.", ""]
+    shown = cells + ["n_rest", "n_graphql", "median_rest", "median_graphql",
+                      "method", "p_adj", "effect", "reject_h0"]
+    for metric, sub in table.groupby("metric", sort=False):
+        lines.append(f"### {metric}")
+        lines.append("")
+        lines.append("| " + " | ".join(shown) + " |")
+        lines.append("|" + "---|" * len(shown))
+        for _, r in sub.iterrows():
+            lines.append("| " + " | ".join(_fmt(r[c]) for c in shown) + " |")
+        lines.append("")
+    return lines
+
+
+def _overhead_lines(entries: list) -> list:
+    flagged = [e for e in entries if e["flagged"]]
+    lines = ["## Saturação do cliente", "",
+             f"{len(flagged)} de {len(entries)} medições de tratamento com indícios de saturação do "
+             "próprio coletor (limites em `config[\"client_monitor\"]`); nelas, parte da latência "
+             "pode vir do cliente e não da API.", ""]
+    if flagged:
+        lines.append("| tratamento | worker | CPU (%) | atraso de agendamento p99 (ms) | tempo fora do HTTP | motivos |")
+        lines.append("|---|---|---|---|---|---|")
+        for e in flagged:
+            lines.append(f"| {e['treatment']} | {e.get('worker_id') or '—'} | {e['cpu_percent']} | "
+                         f"{e['sched_lag_p99_ms']} | {e['outside_http_ratio']:.1%} | {'; '.join(e['reasons'])} |")
+        lines.append("")
+    return lines
 
 
 def _plots(df: pd.DataFrame):
@@ -128,7 +309,7 @@ def _plots(df: pd.DataFrame):
     return [path1, path2, path3]
 
 
-def _write_report(stats_rt: dict, stats_pl: dict, test_rt: dict, test_pl: dict, plots: list):
+def _write_report(stats_rt: dict, stats_pl: dict, test_rt: dict, test_pl: dict, plots: list, stratified: pd.DataFrame | None = None, overhead: list | None = None):
     lines = []
     lines.append("# Análise dos Resultados — GraphQL vs REST")
     lines.append("")
@@ -144,7 +325,8 @@ def _write_report(stats_rt: dict, stats_pl: dict, test_rt: dict, test_pl: dict,
     decision_rt = "Rejeita H0" if (not math.isnan(
         test_rt['p']) and test_rt['p'] < 0.05) else "Não rejeita H0"
     lines.append(f"- Decisão: {decision_rt}")
-    lines.append(f"- Tamanho de efeito aproximado: {test_rt['effect']}")
+    lines.append(
+        f"- Tamanho de efeito (delta de Cliff): {test_rt['effect']} (IC 95% bootstrap: {test_rt['effect_ci'][0]} a {test_rt['effect_ci'][1]})")
 
     lines.append("")
     lines.append("## RQ2 — Tamanho de payload")
@@ -153,7 +335,16 @@ def _write_report(stats_rt: dict, stats_pl: dict, test_rt: dict, test_pl: dict,
     decision_pl = "Rejeita H0" if (not math.isnan(
         test_pl['p']) and test_pl['p'] < 0.05) else "Não rejeita H0"
     lines.append(f"- Decisão: {decision_pl}")
-    lines.append(f"- Tamanho de efeito aproximado: {test_pl['effect']}")
+    lines.append(
+        f"- Tamanho de efeito (delta de Cliff): {test_pl['effect']} (IC 95% bootstrap: {test_pl['effect_ci'][0]} a {test_pl['effect_ci'][1]})")
+
+    if stratified is not None and not stratified.empty:
+        lines.append("")
+        lines.extend(_stratified_lines(stratified))
+
+    if overhead:
+        lines.append("")
+        lines.extend(_overhead_lines(overhead))
 
     lines.append("")
     lines.append("## Visualizações")
@@ -167,11 +358,15 @@ def _write_report(stats_rt: dict, stats_pl: dict, test_rt: dict, test_pl: dict,
     print(f"Analysis report written to {REPORT_MD}")
 
 
-def run_analysis(csv_path: str | None = None):
+def run_analysis(csv_path: str | None = None, stratified: bool = True):
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    os.makedirs(PLOTS_DIR, exist_ok=True)
     if csv_path is None:
-        csv_path = _load_latest_csv()
+        csv_path = latest_results(RESULTS_DIR)
     print(f"Loading data from {csv_path}")
-    df = pd.read_csv(csv_path)
+    available = result_columns(csv_path)
+    df = load_results(csv_path, columns=ANALYSIS_COLUMNS +
+                      [c for c in OPTIONAL_COLUMNS if c in available])
     df = _validate(df)
 
     stats_rt = _descriptive(df, "response_time_ms")
@@ -180,8 +375,14 @@ def run_analysis(csv_path: str | None = None):
     test_rt = _compare_groups(df, "response_time_ms")
     test_pl = _compare_groups(df, "payload_size_bytes")
 
+    table = None
+    if stratified:
+        table = _stratified(df, ["response_time_ms", "payload_size_bytes"])
+        table.to_csv(STRATIFIED_CSV, index=False)
+
     plots = _plots(df)
-    _write_report(stats_rt, stats_pl, test_rt, test_pl, plots)
+    _write_report(stats_rt, stats_pl, test_rt, test_pl, plots, table,
+                  load_overhead(csv_path))
 
 
 if __name__ == "__main__":
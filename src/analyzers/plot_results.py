@@ -1,9 +1,17 @@
 import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import Any, Callable, Dict
+
+import matplotlib
+# Figures are only ever saved to disk, possibly from worker processes.
+matplotlib.use("Agg")
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 
+from .result_loader import load_results
+
 
 def ensure_dir(path: Path) -> Path:
     path.mkdir(parents=True, exist_ok=True)
@@ -11,13 +19,8 @@ def ensure_dir(path: Path) -> Path:
 
 
 def load_data(csv_path: Path) -> pd.DataFrame:
-    df = pd.read_csv(csv_path, parse_dates=[
-                     "timestamp"], infer_datetime_format=True)
-    # Normalize categorical columns
-    for col in ["api_type", "query_type", "cache_state"]:
-        if col in df.columns:
-            df[col] = df[col].astype("category")
-    return df
+    # Timestamps are parsed and categorical columns normalized by the loader.
+    return load_results(str(csv_path))
 
 
 def save_figure(fig: plt.Figure, out_dir: Path, name: str):
@@ -28,20 +31,39 @@ def save_figure(fig: plt.Figure, out_dir: Path, name: str):
     plt.close(fig)
 
 
-def plot_distributions(df: pd.DataFrame, out_dir: Path):
-    sns.set_theme(style="whitegrid")
+def compute_aggregates(df: pd.DataFrame) -> Dict[str, Any]:
+    """Per-API series shared by several figures, computed once per run."""
+    agg: Dict[str, Any] = {"ecdf": {}, "median_ts": {}, "throughput": {}}
+    for api in df["api_type"].cat.categories:
+        sub = df[df["api_type"] == api]
+        rt = sub["response_time_ms"].sort_values()
+        agg["ecdf"][api] = (rt.to_numpy(), (pd.RangeIndex(1, len(rt) + 1) / len(rt)).to_numpy())
+        per_sec = sub.set_index("timestamp").sort_index()["response_time_ms"].resample("1s")
+        agg["median_ts"][api] = per_sec.median().rolling(5, min_periods=1).median()
+        agg["throughput"][api] = per_sec.count()
+    status = df["status_code"] if "status_code" in df.columns else pd.Series(200, index=df.index)
+    # 304 (revalidated from the client cache) is a success.
+    is_success = (status >= 200) & (status < 400)
+    agg["success_rate"] = (
+        is_success.groupby([df["api_type"], df["cache_state"]], observed=False)
+        .mean()
+        .rename("is_success")
+        .reset_index()
+    )
+    return agg
+
 
-    # Overall response time distribution
-    fig, ax = plt.subplots(figsize=(8, 5))
+# --- figures ------------------------------------------------------------------
+
+def _draw_dist_response_time(ax, df, agg):
     sns.histplot(df["response_time_ms"], kde=True,
                  ax=ax, bins=50, color="#3b82f6")
     ax.set_title("Distribuição de Tempo de Resposta (ms)")
     ax.set_xlabel("Tempo de resposta (ms)")
     ax.set_ylabel("Contagem")
-    save_figure(fig, out_dir, "dist_response_time")
 
-    # Violin por cache_state
-    fig, ax = plt.subplots(figsize=(10, 6))
+
+def _draw_violin_cache_api(ax, df, agg):
     sns.violinplot(
         data=df,
         x="cache_state",
@@ -53,43 +75,28 @@ def plot_distributions(df: pd.DataFrame, out_dir: Path):
     ax.set_title("Distribuição por Estado de Cache e API")
     ax.set_xlabel("Estado de cache")
     ax.set_ylabel("Tempo de resposta (ms)")
-    save_figure(fig, out_dir, "violin_cache_api")
 
 
-def plot_time_series(df: pd.DataFrame, out_dir: Path):
-    sns.set_theme(style="whitegrid")
-    # Rolling median por api_type
-    fig, ax = plt.subplots(figsize=(10, 6))
-    for api in df["api_type"].cat.categories:
-        sub = df[df["api_type"] == api].sort_values("timestamp")
-        sub = sub.set_index("timestamp").resample(
-            "1S").median(numeric_only=True)
-        ax.plot(sub.index, sub["response_time_ms"].rolling(
-            5, min_periods=1).median(), label=api)
+def _draw_ts_median(ax, df, agg):
+    for api, series in agg["median_ts"].items():
+        ax.plot(series.index, series.values, label=api)
     ax.set_title("Série Temporal (Mediana Móvel) de Tempo de Resposta")
     ax.set_xlabel("Tempo")
     ax.set_ylabel("Tempo de resposta (ms)")
     ax.legend(title="API")
-    save_figure(fig, out_dir, "ts_response_time_median")
 
-    # ECDF por api_type
-    fig, ax = plt.subplots(figsize=(8, 5))
-    for api in df["api_type"].cat.categories:
-        sub = df[df["api_type"] == api]["response_time_ms"].sort_values()
-        y = pd.Series(range(1, len(sub) + 1)) / len(sub)
-        ax.step(sub.values, y.values, where="post", label=api)
+
+def _draw_ecdf(ax, df, agg):
+    for api, (x, y) in agg["ecdf"].items():
+        ax.step(x, y, where="post", label=api)
     ax.set_title("ECDF de Tempo de Resposta por API")
     ax.set_xlabel("Tempo de resposta (ms)")
     ax.set_ylabel("Probabilidade acumulada")
     ax.legend(title="API")
-    save_figure(fig, out_dir, "ecdf_response_time")
-
 
-def plot_relationships(df: pd.DataFrame, out_dir: Path):
-    sns.set_theme(style="whitegrid")
 
+def _draw_scatter_payload_response(ax, df, agg):
     # Scatter payload vs response, color por cache_state e shape por api_type
-    fig, ax = plt.subplots(figsize=(8, 6))
     sns.scatterplot(
         data=df,
         x="payload_size_bytes",
@@ -102,111 +109,99 @@ def plot_relationships(df: pd.DataFrame, out_dir: Path):
     ax.set_title("Payload vs Tempo de Resposta")
     ax.set_xlabel("Payload (bytes)")
     ax.set_ylabel("Tempo de resposta (ms)")
-    save_figure(fig, out_dir, "scatter_payload_response")
 
-    # Throughput aproximado por janela (req/s) por api_type
-    fig, ax = plt.subplots(figsize=(10, 6))
-    for api in df["api_type"].cat.categories:
-        sub = df[df["api_type"] == api].copy()
-        sub = sub.set_index("timestamp").sort_index()
-        per_sec = sub["response_time_ms"].resample("1S").count()
+
+def _draw_throughput(ax, df, agg):
+    for api, per_sec in agg["throughput"].items():
         ax.plot(per_sec.index, per_sec.values, label=api)
     ax.set_title("Vazão Aproximada (req/s) por API")
     ax.set_xlabel("Tempo")
     ax.set_ylabel("Requisições por segundo")
     ax.legend(title="API")
-    save_figure(fig, out_dir, "throughput_per_sec")
-
-    # Taxa de sucesso/erro por api_type e cache_state
-    df["is_success"] = (df.get("status_code", 200) >= 200) & (
-        df.get("status_code", 200) < 300)
-    fig, ax = plt.subplots(figsize=(10, 6))
-    pct = (
-        df.groupby(["api_type", "cache_state"])['is_success']
-        .mean()
-        .reset_index()
-    )
-    sns.barplot(data=pct, x="api_type", y="is_success",
+
+
+def _draw_success_rate(ax, df, agg):
+    sns.barplot(data=agg["success_rate"], x="api_type", y="is_success",
                 hue="cache_state", ax=ax)
     ax.set_title("Taxa de Sucesso por API e Cache")
     ax.set_xlabel("API")
     ax.set_ylabel("Taxa de sucesso")
     ax.set_ylim(0, 1)
-    save_figure(fig, out_dir, "success_rate_api_cache")
 
 
-def plot_dashboard(df: pd.DataFrame, out_dir: Path):
-    sns.set_theme(style="whitegrid")
+def _single(draw: Callable, figsize) -> Callable:
+    def render(df, agg, out_dir: Path, name: str):
+        fig, ax = plt.subplots(figsize=figsize)
+        draw(ax, df, agg)
+        save_figure(fig, out_dir, name)
+    return render
+
+
+def _render_dashboard(df, agg, out_dir: Path, name: str):
     fig, axes = plt.subplots(nrows=2, ncols=3, figsize=(18, 10))
+    _draw_dist_response_time(axes[0, 0], df, agg)
+    _draw_ecdf(axes[0, 1], df, agg)
+    _draw_success_rate(axes[0, 2], df, agg)
+    _draw_throughput(axes[1, 0], df, agg)
+    _draw_violin_cache_api(axes[1, 1], df, agg)
+    # Hide unused subplot
+    axes[1, 2].axis('off')
+    save_figure(fig, out_dir, name)
 
-    # dist_response_time
-    ax = axes[0, 0]
-    sns.histplot(df["response_time_ms"], kde=True,
-                 ax=ax, bins=50, color="#3b82f6")
-    ax.set_title("Distribuição de Tempo de Resposta (ms)")
-    ax.set_xlabel("Tempo de resposta (ms)")
-    ax.set_ylabel("Contagem")
 
-    # ecdf_response_time
-    ax = axes[0, 1]
-    for api in df["api_type"].cat.categories:
-        sub = df[df["api_type"] == api]["response_time_ms"].sort_values()
-        y = pd.Series(range(1, len(sub) + 1)) / len(sub)
-        ax.step(sub.values, y.values, where="post", label=api)
-    ax.set_title("ECDF de Tempo de Resposta por API")
-    ax.set_xlabel("Tempo de resposta (ms)")
-    ax.set_ylabel("Probabilidade acumulada")
-    ax.legend(title="API")
+# Output name -> renderer(df, aggregates, out_dir, name)
+FIGURES: Dict[str, Callable] = {
+    "dist_response_time": _single(_draw_dist_response_time, (8, 5)),
+    "violin_cache_api": _single(_draw_violin_cache_api, (10, 6)),
+    "ts_response_time_median": _single(_draw_ts_median, (10, 6)),
+    "ecdf_response_time": _single(_draw_ecdf, (8, 5)),
+    "scatter_payload_response": _single(_draw_scatter_payload_response, (8, 6)),
+    "throughput_per_sec": _single(_draw_throughput, (10, 6)),
+    "success_rate_api_cache": _single(_draw_success_rate, (10, 6)),
+    "dashboard_overview": _render_dashboard,
+}
 
-    # success_rate_api_cache
-    ax = axes[0, 2]
-    df["is_success"] = (df.get("status_code", 200) >= 200) & (
-        df.get("status_code", 200) < 300)
-    pct = (
-        df.groupby(["api_type", "cache_state"])['is_success']
-        .mean()
-        .reset_index()
-    )
-    sns.barplot(data=pct, x="api_type", y="is_success",
-                hue="cache_state", ax=ax)
-    ax.set_title("Taxa de Sucesso por API e Cache")
-    ax.set_xlabel("API")
-    ax.set_ylabel("Taxa de sucesso")
-    ax.set_ylim(0, 1)
 
-    # throughput_per_second (req/s)
-    ax = axes[1, 0]
-    for api in df["api_type"].cat.categories:
-        sub = df[df["api_type"] == api].copy()
-        sub = sub.set_index("timestamp").sort_index()
-        per_sec = sub["response_time_ms"].resample("1S").count()
-        ax.plot(per_sec.index, per_sec.values, label=api)
-    ax.set_title("Vazão Aproximada (req/s) por API")
-    ax.set_xlabel("Tempo")
-    ax.set_ylabel("Requisições por segundo")
-    ax.legend(title="API")
+def _render(names, df, agg, out_dir: Path):
+    sns.set_theme(style="whitegrid")
+    for name in names:
+        FIGURES[name](df, agg, out_dir, name)
 
-    # violin_cache_api
-    ax = axes[1, 1]
-    sns.violinplot(
-        data=df,
-        x="cache_state",
-        y="response_time_ms",
-        hue="api_type",
-        split=True,
-        ax=ax,
-    )
-    ax.set_title("Distribuição por Estado de Cache e API")
-    ax.set_xlabel("Estado de cache")
-    ax.set_ylabel("Tempo de resposta (ms)")
 
-    # Hide unused subplot
-    axes[1, 2].axis('off')
+def plot_distributions(df: pd.DataFrame, out_dir: Path, agg: Dict[str, Any] | None = None):
+    _render(["dist_response_time", "violin_cache_api"],
+            df, agg or compute_aggregates(df), out_dir)
+
+
+def plot_time_series(df: pd.DataFrame, out_dir: Path, agg: Dict[str, Any] | None = None):
+    _render(["ts_response_time_median", "ecdf_response_time"],
+            df, agg or compute_aggregates(df), out_dir)
+
+
+def plot_relationships(df: pd.DataFrame, out_dir: Path, agg: Dict[str, Any] | None = None):
+    _render(["scatter_payload_response", "throughput_per_sec", "success_rate_api_cache"],
+            df, agg or compute_aggregates(df), out_dir)
+
+
+def plot_dashboard(df: pd.DataFrame, out_dir: Path, agg: Dict[str, Any] | None = None):
+    _render(["dashboard_overview"], df, agg or compute_aggregates(df), out_dir)
+
+
+# Worker-process state, set once per worker so the data is not re-sent per figure.
+_WORKER: Dict[str, Any] = {}
+
+
+def _init_worker(df: pd.DataFrame, agg: Dict[str, Any], out_dir: Path):
+    _WORKER.update(df=df, agg=agg, out_dir=out_dir)
+
 
-    save_figure(fig, out_dir, "dashboard_overview")
+def _render_in_worker(name: str) -> str:
+    _render([name], _WORKER["df"], _WORKER["agg"], _WORKER["out_dir"])
+    return name
 
 
-def generate_all_plots(csv_path: str, out_dir: str | None = None):
+def generate_all_plots(csv_path: str, out_dir: str | None = None, workers: int | None = None):
+    """Render every figure; `workers` > 1 renders them in a process pool."""
     csv_path = Path(csv_path)
     if out_dir is None:
         # Save under src/results/analysis/plots
@@ -217,16 +212,22 @@ def generate_all_plots(csv_path: str, out_dir: str | None = None):
     ensure_dir(out_dir)
 
     df = load_data(csv_path)
-    plot_distributions(df, out_dir)
-    plot_time_series(df, out_dir)
-    plot_relationships(df, out_dir)
-    plot_dashboard(df, out_dir)
+    agg = compute_aggregates(df)
+    if workers is None:
+        workers = min(len(FIGURES), os.cpu_count() or 1)
+    if workers <= 1:
+        _render(list(FIGURES), df, agg, out_dir)
+        return
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(df, agg, out_dir)) as pool:
+        # Consume results so a failed figure raises here.
+        list(pool.map(_render_in_worker, FIGURES))
 
 
 if __name__ == "__main__":
     # Default to the latest experiment CSV in src/results
     base = Path(__file__).resolve().parents[1] / "results"
-    candidates = sorted(base.glob("experiment_*.csv"))
+    candidates = sorted(list(base.glob("experiment_*.csv")) +
+                        list(base.glob("experiment_*.parquet")))
     if not candidates:
         raise SystemExit(
             "Nenhum arquivo de experimento encontrado em src/results")
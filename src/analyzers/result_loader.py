@@ -0,0 +1,65 @@
+"""
+Load experiment results from either output format.
+CSV runs are single files; Parquet runs are directories partitioned by
+api_type/query_type/cache_state/concurrent_clients, so column and partition
+selections are pushed down and only the needed files are read.
+"""
+import os
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+CATEGORICAL_COLS = ["api_type", "query_type", "cache_state",
+                    "connection_mode", "query_mode", "fanout_strategy", "worker_id", "cache_result"]
+TIMESTAMP_COLS = ["timestamp", "intended_send_ts", "actual_send_ts"]
+
+
+def is_parquet(path: str) -> bool:
+    return os.path.isdir(path) or str(path).endswith(".parquet")
+
+
+def latest_results(results_dir: str) -> str:
+    """Most recent run in `results_dir`, CSV file or Parquet dataset."""
+    runs = [f for f in os.listdir(results_dir)
+            if f.endswith(".csv") or f.endswith(".parquet")]
+    if not runs:
+        raise FileNotFoundError("No result files found in results directory.")
+    return os.path.join(results_dir, sorted(runs)[-1])
+
+
+def result_columns(path: str) -> List[str]:
+    """Column names of a run, without reading its rows."""
+    if is_parquet(path):
+        import pyarrow.parquet as pq
+        return list(pq.ParquetDataset(path).schema.names)
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+def load_results(path: str, columns: Optional[List[str]] = None, filters: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+    """
+    Read a run. `filters` maps a column to a value or list of accepted values,
+    e.g. {"query_type": "nested", "concurrent_clients": [10, 50]}.
+    """
+    filters = {col: v if isinstance(v, (list, tuple, set)) else [v]
+               for col, v in (filters or {}).items()}
+    if is_parquet(path):
+        df = pd.read_parquet(
+            path,
+            columns=columns,
+            filters=[(col, "in", list(v))
+                     for col, v in filters.items()] or None,
+        )
+        if "concurrent_clients" in df.columns:
+            # Partition keys come back as categoricals of the directory values.
+            df["concurrent_clients"] = df["concurrent_clients"].astype("int32")
+    else:
+        df = pd.read_csv(path, usecols=columns)
+        for col, accepted in filters.items():
+            df = df[df[col].isin(list(accepted))]
+        for col in TIMESTAMP_COLS:
+            if col in df.columns:
+                df[col] = pd.to_datetime(df[col], utc=True, format="ISO8601")
+    for col in CATEGORICAL_COLS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype("category")
+    return df
@@ -0,0 +1,62 @@
+"""
+Files a run leaves next to its results, read by the analysis as well as
+written by the collectors. Standard library only, so the collection path can
+use it without loading the scientific stack.
+"""
+import json
+import os
+from typing import Any, Dict, List
+
+
+def markers_path(path: str) -> str:
+    return path.rstrip("/\\") + ".markers"
+
+
+def read_markers(path: str) -> List[Dict[str, Any]]:
+    """Markers of the treatments whose rows are durable, in completion order."""
+    mpath = markers_path(path)
+    if not os.path.exists(mpath):
+        return []
+    markers = []
+    with open(mpath, encoding="utf-8") as f:
+        for line in f:
+            try:
+                markers.append(json.loads(line))
+            except ValueError:
+                # A torn last line from a crash mid-append.
+                break
+    return markers
+
+
+def overhead_path(results_path: str) -> str:
+    return results_path.rstrip("/\\") + ".overhead.jsonl"
+
+
+def load_reports(path: str, results_path: str) -> List[Dict[str, Any]]:
+    """
+    Per-treatment (and per-worker) reports appended to `path`. They are saved
+    before the treatment's marker, like its histogram: the last entry of a
+    rerun treatment wins, and only treatments with a marker count.
+    """
+    if not os.path.exists(path):
+        return []
+    markers = read_markers(results_path)
+    completed = {m["treatment"] for m in markers}
+    entries: Dict[tuple, Dict[str, Any]] = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                break
+            if markers and entry["treatment"] not in completed:
+                continue
+            key = (entry["treatment"], entry.get("worker_id"))
+            entries.pop(key, None)
+            entries[key] = entry
+    return list(entries.values())
+
+
+def load_overhead(results_path: str) -> List[Dict[str, Any]]:
+    """Collector self-measurement summaries, one per treatment (and worker)."""
+    return load_reports(overhead_path(results_path), results_path)
@@ -0,0 +1,178 @@
+"""
+Mergeable fixed-memory summaries for streaming analysis.
+RunningStats keeps count/mean/variance (Welford); HdrHistogram keeps a
+log-linear histogram of non-negative integers with a bounded relative error,
+in the style of HdrHistogram. Both merge exactly, so per-chunk, per-thread or
+per-run summaries can be combined without revisiting the rows.
+"""
+import base64
+import math
+from typing import Any, Dict, Iterable
+
+import numpy as np
+
+
+class RunningStats:
+    __slots__ = ("count", "mean", "m2", "min", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, values: Iterable[float]):
+        x = np.asarray(values, dtype=float)
+        x = x[~np.isnan(x)]
+        if x.size == 0:
+            return
+        other = RunningStats()
+        other.count = int(x.size)
+        other.mean = float(x.mean())
+        other.m2 = float(((x - other.mean) ** 2).sum())
+        other.min = float(x.min())
+        other.max = float(x.max())
+        self.merge(other)
+
+    def merge(self, other: "RunningStats"):
+        # Chan et al. pairwise update of the Welford accumulators.
+        if other.count == 0:
+            return
+        n = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / n
+        self.m2 += other.m2 + delta * delta * self.count * other.count / n
+        self.count = n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def variance(self) -> float:
+        return self.m2 / (self.count - 1) if self.count > 1 else math.nan
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance) if self.count > 1 else math.nan
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {k: getattr(self, k) for k in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "RunningStats":
+        s = cls()
+        for k in cls.__slots__:
+            setattr(s, k, d[k])
+        return s
+
+
+class HdrHistogram:
+    """
+    Counts of integer values in [0, highest], bucketed so that any recorded
+    value is reproduced within 10**-significant_digits relative error.
+    Values above `highest` are clamped to it and counted in `overflow`.
+    """
+
+    def __init__(self, highest: int = 3_600_000_000, significant_digits: int = 3):
+        if not 1 <= significant_digits <= 5:
+            raise ValueError("significant_digits must be between 1 and 5")
+        self.highest = int(highest)
+        self.significant_digits = significant_digits
+        # Sub-buckets per power of two: the smallest power of two giving the
+        # requested precision within each exponent range.
+        self._k = int(math.ceil(math.log2(2 * 10 ** significant_digits)))
+        self._half = 1 << (self._k - 1)
+        top = self._bucket(np.array([self.highest]))[0]
+        self.counts = np.zeros((top + 2) * self._half, dtype=np.int64)
+        self.overflow = 0
+
+    def _bucket(self, v: np.ndarray) -> np.ndarray:
+        magnitude = np.floor(np.log2(np.maximum(v, 1))).astype(np.int64)
+        return np.maximum(0, magnitude - (self._k - 1))
+
+    def _index(self, v: np.ndarray) -> np.ndarray:
+        b = self._bucket(v)
+        return b * self._half + (v >> b)
+
+    def _lowest(self, idx: np.ndarray) -> np.ndarray:
+        b = np.maximum(0, idx // self._half - 1)
+        return (idx - b * self._half) << b
+
+    def _width(self, idx: np.ndarray) -> np.ndarray:
+        return np.int64(1) << np.maximum(0, idx // self._half - 1)
+
+    def record(self, values: Iterable[float]):
+        v = np.asarray(values, dtype=float)
+        v = v[~np.isnan(v)]
+        if v.size == 0:
+            return
+        v = np.rint(np.maximum(v, 0)).astype(np.int64)
+        over = v > self.highest
+        self.overflow += int(over.sum())
+        v[over] = self.highest
+        self.counts += np.bincount(self._index(v), minlength=self.counts.size)
+
+    def record_value(self, value: int):
+        """Record one value; cheaper than record() on the measurement path."""
+        v = int(value)
+        if v > self.highest:
+            self.overflow += 1
+            v = self.highest
+        elif v < 0:
+            v = 0
+        b = max(0, v.bit_length() - self._k)
+        self.counts[b * self._half + (v >> b)] += 1
+
+    @property
+    def total(self) -> int:
+        return int(self.counts.sum())
+
+    def _compatible(self, other: "HdrHistogram") -> bool:
+        return (self.highest, self.significant_digits) == (other.highest, other.significant_digits)
+
+    def merge(self, other: "HdrHistogram"):
+        if not self._compatible(other):
+            raise ValueError("Cannot merge histograms with different ranges or precision")
+        self.counts += other.counts
+        self.overflow += other.overflow
+
+    def quantiles(self, qs: Iterable[float]) -> np.ndarray:
+        """Values at quantiles `qs` (0-1), each the upper edge of its bucket."""
+        qs = np.asarray(list(qs), dtype=float)
+        total = self.total
+        if total == 0:
+            return np.full(qs.shape, np.nan)
+        cum = np.cumsum(self.counts)
+        ranks = np.maximum(1, np.ceil(qs * total)).astype(np.int64)
+        idx = np.searchsorted(cum, ranks, side="left")
+        return (self._lowest(idx) + self._width(idx) - 1).astype(float)
+
+    def quantile(self, q: float) -> float:
+        return float(self.quantiles([q])[0])
+
+    def mean(self) -> float:
+        total = self.total
+        if total == 0:
+            return math.nan
+        idx = np.nonzero(self.counts)[0]
+        mid = self._lowest(idx) + (self._width(idx) - 1) / 2
+        return float((mid * self.counts[idx]).sum() / total)
+
+    def to_dict(self) -> Dict[str, Any]:
+        # Sparse: only non-empty buckets are stored.
+        idx = np.nonzero(self.counts)[0]
+        return {
+            "highest": self.highest,
+            "significant_digits": self.significant_digits,
+            "overflow": self.overflow,
+            "index": base64.b64encode(idx.astype("<u4").tobytes()).decode("ascii"),
+            "counts": base64.b64encode(self.counts[idx].astype("<i8").tobytes()).decode("ascii"),
+        }
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "HdrHistogram":
+        h = cls(d["highest"], d["significant_digits"])
+        idx = np.frombuffer(base64.b64decode(d["index"]), dtype="<u4")
+        h.counts[idx] = np.frombuffer(base64.b64decode(d["counts"]), dtype="<i8")
+        h.overflow = d["overflow"]
+        return h
@@ -0,0 +1,237 @@
+"""
+Bounded-memory summaries of experiment results.
+Rows are read in chunks and folded into per-treatment sketches (Welford
+moments and an HDR histogram per metric), so runs too large to load into a
+DataFrame can still be summarized. The aggregator state can be saved and
+updated later with only the rows that arrived since. Of a run still being
+written (or resumed), only completed treatments are read: rows after the
+last marker may still be discarded by the writer.
+
+    python -m src.main summarize [--results PATH]
+    python -m src.analyzers.streaming [results_path]
+"""
+import csv
+import json
+import os
+import sys
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from .result_loader import is_parquet, latest_results
+from .run_files import read_markers
+from .sketches import HdrHistogram, RunningStats
+
+GROUP_COLS = ["api_type", "query_type", "cache_state", "concurrent_clients"]
+# Metric -> factor to the integer unit the histogram records (ms -> us).
+METRICS = {"response_time_ms": 1000, "payload_size_bytes": 1}
+QUANTILES = [0.5, 0.9, 0.95, 0.99, 0.999]
+CHUNK_ROWS = 200_000
+SUMMARY_CSV = os.path.join("results", "analysis", "streaming_summary.csv")
+
+
+class _Window:
+    """Read side of a binary file, from its current position up to byte `end`."""
+
+    def __init__(self, f, end: int):
+        self._f = f
+        self._end = end
+
+    def read(self, size: int = -1) -> bytes:
+        left = self._end - self._f.tell()
+        if left <= 0:
+            return b""
+        return self._f.read(left if size is None or size < 0 else min(size, left))
+
+
+def _csv_end(path: str, markers: List[Dict[str, Any]]) -> int:
+    """Byte offset up to which a CSV run's rows are final."""
+    if markers:
+        return markers[-1]["offset"]
+    # Not written by ResultWriter: everything up to the last complete line.
+    with open(path, "rb") as f:
+        size = f.seek(0, os.SEEK_END)
+        f.seek(max(0, size - 65536))
+        tail = f.read()
+    return size - len(tail) + tail.rfind(b"\n") + 1 if b"\n" in tail else 0
+
+
+def _parquet_seq(name: str) -> int:
+    # part-<checkpoint seq>-<chunk>-<i>.parquet (see result_writer.ParquetSink)
+    return int(name.split("-")[1])
+
+
+class _Sketch:
+    __slots__ = ("stats", "hist", "scale")
+
+    def __init__(self, scale: int):
+        self.stats = RunningStats()
+        self.hist = HdrHistogram()
+        self.scale = scale
+
+    def update(self, values):
+        self.stats.update(values)
+        self.hist.record(values * self.scale)
+
+    def merge(self, other: "_Sketch"):
+        self.stats.merge(other.stats)
+        self.hist.merge(other.hist)
+
+
+class StreamingAggregator:
+    def __init__(self, group_cols: Optional[List[str]] = None, metrics: Optional[Dict[str, int]] = None):
+        self.group_cols = list(group_cols or GROUP_COLS)
+        self.metrics = dict(metrics or METRICS)
+        self.sketches: Dict[Tuple, Dict[str, _Sketch]] = {}
+        # Progress through the source: the CSV byte offset, or the Parquet
+        # files, already folded in.
+        self.bytes_seen = 0
+        self.files_seen: List[str] = []
+
+    def _cell(self, key: Tuple) -> Dict[str, _Sketch]:
+        cell = self.sketches.get(key)
+        if cell is None:
+            cell = self.sketches[key] = {
+                m: _Sketch(scale) for m, scale in self.metrics.items()}
+        return cell
+
+    def update(self, chunk: pd.DataFrame):
+        for key, rows in chunk.groupby(self.group_cols, observed=True, sort=False):
+            cell = self._cell(tuple(str(k) for k in key))
+            for metric, sketch in cell.items():
+                if metric in rows.columns:
+                    sketch.update(pd.to_numeric(rows[metric], errors="coerce").to_numpy(float))
+
+    def merge(self, other: "StreamingAggregator"):
+        for key, cell in other.sketches.items():
+            mine = self._cell(key)
+            for metric, sketch in cell.items():
+                mine[metric].merge(sketch)
+
+    def reset(self):
+        self.sketches = {}
+        self.bytes_seen = 0
+        self.files_seen = []
+
+    def _iter_new_chunks(self, path: str, chunk_rows: int) -> Iterator[pd.DataFrame]:
+        columns = self.group_cols + list(self.metrics)
+        markers = read_markers(path)
+        if is_parquet(path):
+            import pyarrow.parquet as pq
+            files = sorted(
+                os.path.join(root, f) for root, _, names in os.walk(path)
+                for f in names if f.endswith(".parquet")
+                # Files past the last marker belong to an unfinished treatment.
+                and (not markers or _parquet_seq(f) < len(markers)))
+            for f in files:
+                rel = os.path.relpath(f, path)
+                if rel in self.files_seen:
+                    continue
+                # Partition values live in the directory names.
+                keys = dict(part.split("=", 1) for part in os.path.dirname(rel).split(os.sep) if "=" in part)
+                for batch in pq.ParquetFile(f).iter_batches(batch_size=chunk_rows, columns=[c for c in columns if c not in keys]):
+                    yield batch.to_pandas().assign(**keys)
+                self.files_seen.append(rel)
+        else:
+            end = _csv_end(path, markers)
+            if end < self.bytes_seen:
+                # Rewritten below what was read: the sketches no longer match it.
+                self.reset()
+            with open(path, "rb") as f:
+                header = f.readline()
+                names = next(csv.reader([header.decode("utf-8")]))
+                f.seek(max(self.bytes_seen, len(header)))
+                if f.tell() >= end:
+                    return
+                reader = pd.read_csv(_Window(f, end), header=None, names=names,
+                                     usecols=columns, chunksize=chunk_rows)
+                for chunk in reader:
+                    yield chunk
+            self.bytes_seen = end
+
+    def consume(self, path: str, chunk_rows: int = CHUNK_ROWS) -> int:
+        """Fold rows of `path` not seen yet into the sketches; returns rows read."""
+        n = 0
+        for chunk in self._iter_new_chunks(path, chunk_rows):
+            self.update(chunk)
+            n += len(chunk)
+        return n
+
+    def summary(self, quantiles: Optional[List[float]] = None) -> pd.DataFrame:
+        quantiles = quantiles or QUANTILES
+        rows = []
+        for key, cell in sorted(self.sketches.items()):
+            for metric, sketch in cell.items():
+                if sketch.stats.count == 0:
+                    continue
+                row = {**dict(zip(self.group_cols, key)), "metric": metric,
+                       "count": sketch.stats.count, "mean": sketch.stats.mean,
+                       "std": sketch.stats.std, "min": sketch.stats.min,
+                       "max": sketch.stats.max}
+                for q, v in zip(quantiles, sketch.hist.quantiles(quantiles)):
+                    # Bucket edges can overshoot the exact extremes.
+                    row[f"p{q * 100:g}"] = min(max(v / sketch.scale, sketch.stats.min), sketch.stats.max)
+                rows.append(row)
+        return pd.DataFrame(rows)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "group_cols": self.group_cols,
+            "metrics": self.metrics,
+            "bytes_seen": self.bytes_seen,
+            "files_seen": self.files_seen,
+            "cells": [{
+                "key": list(key),
+                "sketches": {m: {"stats": s.stats.to_dict(), "hist": s.hist.to_dict()}
+                             for m, s in cell.items()},
+            } for key, cell in self.sketches.items()],
+        }
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "StreamingAggregator":
+        agg = cls(d["group_cols"], d["metrics"])
+        if "bytes_seen" not in d:
+            # Saved with a CSV row offset, which a resumed run invalidates: start over.
+            return agg
+        agg.bytes_seen = d["bytes_seen"]
+        agg.files_seen = d["files_seen"]
+        for cell in d["cells"]:
+            sketches = agg._cell(tuple(cell["key"]))
+            for m, s in cell["sketches"].items():
+                sketches[m].stats = RunningStats.from_dict(s["stats"])
+                sketches[m].hist = HdrHistogram.from_dict(s["hist"])
+        return agg
+
+    def save(self, path: str):
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "StreamingAggregator":
+        with open(path, encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+
+def summarize(results_path: str, state_path: Optional[str] = None, out_csv: str = SUMMARY_CSV) -> pd.DataFrame:
+    """
+    Summarize a run in bounded memory. With `state_path`, the sketches from a
+    previous call are reloaded and only new rows are read.
+    """
+    state_path = state_path or results_path.rstrip("/\\") + ".sketches.json"
+    if os.path.exists(state_path):
+        agg = StreamingAggregator.load(state_path)
+    else:
+        agg = StreamingAggregator()
+    n = agg.consume(results_path)
+    agg.save(state_path)
+    table = agg.summary()
+    os.makedirs(os.path.dirname(out_csv), exist_ok=True)
+    table.to_csv(out_csv, index=False)
+    print(f"Streaming summary: {n} new rows, written to {out_csv}")
+    return table
+
+
+if __name__ == "__main__":
+    summarize(sys.argv[1] if len(sys.argv) > 1 else latest_results("results"))
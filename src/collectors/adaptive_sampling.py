@@ -0,0 +1,117 @@
+"""
+Adaptive sample size per treatment.
+Instead of a fixed number of repetitions, a treatment keeps being measured
+until the distribution-free confidence interval of every tracked quantile
+(order statistics bracketing the binomial interval around n*q) is narrower
+than `target_rel_width` of the quantile's value, or the budget runs out.
+The outcome of each treatment is appended to `<results>.sampling.jsonl`.
+"""
+import json
+import math
+import os
+import threading
+from statistics import NormalDist
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from ..analyzers.run_files import load_reports
+
+
+def sampling_path(results_path: str) -> str:
+    return results_path.rstrip("/\\") + ".sampling.jsonl"
+
+
+def quantile_ci(sorted_values: np.ndarray, q: float, confidence: float = 0.95):
+    """(estimate, low, high) for quantile q; low/high are nan when n is too small."""
+    n = sorted_values.size
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    spread = z * math.sqrt(n * q * (1 - q))
+    lo = math.floor(n * q - spread)
+    hi = math.ceil(n * q + spread)
+    estimate = float(sorted_values[min(n - 1, max(0, math.ceil(n * q) - 1))])
+    if lo < 0 or hi > n - 1:
+        return estimate, math.nan, math.nan
+    return estimate, float(sorted_values[lo]), float(sorted_values[hi])
+
+
+class EarlyStopping:
+    """
+    Shared by every client of one treatment (or of one worker's share).
+    Clients call add() after each measurement and stop when it returns False.
+    """
+
+    def __init__(self, settings: Dict[str, Any], clients: int):
+        self.settings = settings
+        self.clients = clients
+        self.min_total = settings["min_repetitions"] * clients
+        self.max_total = settings["max_repetitions"] * clients
+        # Re-check once every client has had another turn.
+        self.check_every = max(clients, 10)
+        # Appends are atomic under the GIL; only the check takes the lock.
+        self._values: List[float] = []
+        self._lock = threading.Lock()
+        self._next_check = self.min_total
+        self.done = False
+        self.reason = ""
+        self.widths: Dict[str, float] = {}
+
+    def add(self, latency_ms: float) -> bool:
+        self._values.append(latency_ms)
+        n = len(self._values)
+        if self.done:
+            return False
+        if n >= self.max_total:
+            self.done, self.reason = True, "budget"
+        elif n >= self._next_check and self._lock.acquire(blocking=False):
+            try:
+                self._next_check = n + self.check_every
+                if self._converged():
+                    self.done, self.reason = True, "converged"
+            finally:
+                self._lock.release()
+        return not self.done
+
+    def _converged(self) -> bool:
+        x = np.sort(np.asarray(self._values, dtype=float))
+        converged = True
+        for q in self.settings["quantiles"]:
+            estimate, low, high = quantile_ci(x, q, self.settings["confidence"])
+            width = (high - low) / estimate if estimate > 0 else math.nan
+            self.widths[f"p{q * 100:g}"] = round(width, 4)
+            if not width <= self.settings["target_rel_width"]:
+                converged = False
+        return converged
+
+    def summary(self) -> Dict[str, Any]:
+        if self.reason != "converged" and self._values:
+            # Widths at the point the budget ran out.
+            self._converged()
+        return {
+            "clients": self.clients,
+            "measurements": len(self._values),
+            "reason": self.reason or "budget",
+            "rel_ci_width": self.widths,
+        }
+
+
+def new_stopper(settings: Dict[str, Any], clients: int) -> Optional[EarlyStopping]:
+    return EarlyStopping(settings, clients) if settings["enabled"] else None
+
+
+def repetitions_budget(experiment: Dict[str, Any]) -> int:
+    """Most repetitions one client can make in a treatment."""
+    adaptive = experiment["adaptive"]
+    return adaptive["max_repetitions"] if adaptive["enabled"] else experiment["repetitions"]
+
+
+def save_sampling(results_path: str, treatment: str, summary: Dict[str, Any]):
+    with open(sampling_path(results_path), "a", encoding="utf-8") as f:
+        f.write(json.dumps({"treatment": treatment, **summary}) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def load_sampling(results_path: str) -> List[Dict[str, Any]]:
+    """Adaptive sampling outcomes, one per treatment (and worker)."""
+    return load_reports(sampling_path(results_path), results_path)
@@ -0,0 +1,157 @@
+"""
+Asyncio collection engine.
+Drives every virtual client of a treatment as a task on one event loop, so
+high concurrency levels do not need one OS thread per client.
+"""
+import time
+import asyncio
+from typing import Callable, Dict, Any, Optional
+
+from tqdm import tqdm
+
+from . import live_metrics
+from .adaptive_sampling import EarlyStopping, new_stopper, repetitions_budget
+from .client_overhead import OverheadMonitor, start_monitor
+from ..configs.config import config
+from ..configs.async_clients import AsyncClientRegistry
+from ..configs.http_cache import new_cache
+from ..configs.rate_limit import shared_limiter
+from ..configs.request_generators import (
+    generate_rest_request_async,
+    generate_graphql_request_async,
+    build_record,
+    get_arrival_rate,
+    arrival_offsets,
+    cache_enabled,
+    observe_limits,
+    rate_limit_resource,
+    request_cost,
+)
+
+
+async def _run_single_measurement_async(registry: AsyncClientRegistry, api_type: str, query_type: str, concurrent_clients: int, cache_state: str, intended: Optional[float] = None, measured: bool = True) -> Dict[str, Any]:
+    limiter = registry.limiter
+    paced = 0.0
+    if limiter:
+        paced = await limiter.acquire_async(rate_limit_resource(api_type),
+                                            request_cost(limiter, api_type, query_type))
+        if intended is not None:
+            intended += paced
+    actual = time.time()
+    if api_type == "REST":
+        result = await generate_rest_request_async(query_type, registry)
+    else:
+        result = await generate_graphql_request_async(query_type, registry)
+    if limiter:
+        observe_limits(limiter, api_type, query_type, result)
+    result["actualSend"] = actual
+    result["throttleMs"] = paced * 1000
+    if intended is not None:
+        result["intendedSend"] = intended
+    rec = build_record(api_type, query_type, concurrent_clients,
+                       cache_state, result, registry.connection_mode)
+    if measured:
+        live_metrics.observe(rec)
+    return rec
+
+
+async def _run_treatment_async(writer, api_type: str, query_type: str, concurrent_clients: int, cache_state: str, connection_mode: str, query_mode: str, clients: Optional[int] = None, warmup: bool = True, on_ready: Optional[Callable[[], None]] = None):
+    clients = clients or concurrent_clients
+    pool_maxsize = config["http"]["pool_maxsize"] or clients
+    cache = new_cache(config["http_cache"]) if cache_enabled(cache_state) else None
+    registry = AsyncClientRegistry(
+        connection_mode, pool_maxsize=pool_maxsize, query_mode=query_mode, cache=cache,
+        limiter=shared_limiter(config["rate_limit"], config["github"]["target"]))
+    try:
+        interval = config["experiment"]["request_interval"]
+        if warmup and cache_enabled(cache_state):
+            for _ in range(config["experiment"]["warmup_requests"]):
+                await _run_single_measurement_async(
+                    registry, api_type, query_type, concurrent_clients, cache_state, measured=False)
+                await asyncio.sleep(interval)
+        if on_ready:
+            # Nothing else is scheduled on the loop yet, so blocking is fine.
+            on_ready()
+
+        reps = repetitions_budget(config["experiment"])
+        stopper = new_stopper(config["experiment"]["adaptive"], clients)
+        total_iters = clients * reps
+        desc = f"Coleta async {api_type}/{query_type} (cache={cache_state}, cc={concurrent_clients}, conn={connection_mode})"
+        show = config["experiment"]["progress_bars"]
+
+        monitor = start_monitor(config["client_monitor"], probe="loop")
+        probe = asyncio.create_task(monitor.probe_loop()) if monitor else None
+        try:
+            if config["experiment"]["load_model"] == "open":
+                with tqdm(total=total_iters, desc=desc, disable=not show) as pbar:
+                    await _run_open_loop_async(registry, writer, api_type, query_type, concurrent_clients,
+                                               cache_state, total_iters, pbar.update, clients, monitor, stopper)
+            else:
+                async def client_loop(progress_cb=None):
+                    for i in range(reps):
+                        started = time.perf_counter()
+                        rec = await _run_single_measurement_async(
+                            registry, api_type, query_type, concurrent_clients, cache_state)
+                        writer.writerow(rec)
+                        if progress_cb:
+                            progress_cb(1)
+                        if monitor:
+                            monitor.add(started, rec["response_time_ms"], rec["throttle_ms"])
+                        if stopper and not stopper.add(rec["response_time_ms"]):
+                            break
+                        if i < reps - 1:
+                            await asyncio.sleep(interval)
+
+                with tqdm(total=total_iters, desc=desc, disable=not show) as pbar:
+                    def progress_cb(n): return pbar.update(n)
+                    await asyncio.gather(*(client_loop(progress_cb)
+                                           for _ in range(clients)))
+        finally:
+            overhead = monitor.stop() if monitor else None
+            if probe:
+                await probe
+        return {"overhead": overhead, "sampling": stopper.summary() if stopper else None}
+    finally:
+        await registry.close()
+
+
+async def _run_open_loop_async(registry: AsyncClientRegistry, writer, api_type: str, query_type: str, concurrent_clients: int, cache_state: str, total: int, progress_cb=None, clients: Optional[int] = None, monitor: Optional[OverheadMonitor] = None, stopper: Optional[EarlyStopping] = None):
+    # One task per scheduled request; at most `clients` are in flight and time
+    # spent waiting for a slot is charged to the request's latency.
+    clients = clients or concurrent_clients
+    rate = get_arrival_rate(
+        config["experiment"]["arrival_rate"], concurrent_clients) * clients / concurrent_clients
+    offsets = arrival_offsets(
+        total, rate, config["experiment"]["arrival_process"])
+    slots = asyncio.Semaphore(clients)
+
+    async def measure(intended: float):
+        async with slots:
+            started = time.perf_counter()
+            queued_ms = (time.time() - intended) * 1000
+            rec = await _run_single_measurement_async(
+                registry, api_type, query_type, concurrent_clients, cache_state, intended)
+        writer.writerow(rec)
+        if progress_cb:
+            progress_cb(1)
+        if monitor:
+            monitor.add(started, rec["response_time_ms"] - queued_ms, rec["throttle_ms"])
+        if stopper:
+            stopper.add(rec["response_time_ms"])
+
+    t0 = time.time()
+    tasks = []
+    for offset in offsets:
+        if stopper and stopper.done:
+            break
+        intended = t0 + offset
+        delay = intended - time.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(measure(intended)))
+    await asyncio.gather(*tasks)
+
+
+def run_treatment_async(writer, api_type: str, query_type: str, concurrent_clients: int, cache_state: str, connection_mode: str = "reuse", query_mode: str = "full", clients: Optional[int] = None, warmup: bool = True, on_ready: Optional[Callable[[], None]] = None):
+    return asyncio.run(_run_treatment_async(writer, api_type, query_type,
+                concurrent_clients, cache_state, connection_mode, query_mode, clients, warmup, on_ready))
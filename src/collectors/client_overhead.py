@@ -0,0 +1,129 @@
+"""
+Collector self-measurement.
+While a treatment is measured, OverheadMonitor tracks the collector's own
+process CPU use, how late a sleeping probe (a thread, or a task on the
+asyncio engine's loop) wakes up, and how much of each client iteration is
+spent outside the HTTP call (record building, queueing the row, progress
+bars). Each treatment's summary is appended to `<results>.overhead.jsonl`
+and flagged when the client, not the API, may be what limits the latency.
+"""
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from ..analyzers.run_files import load_overhead, overhead_path
+
+
+def _pct(values: List[float], q: float) -> float:
+    return round(float(np.percentile(values, q)), 3) if values else 0.0
+
+
+class OverheadMonitor:
+    def __init__(self, settings: Dict[str, Any]):
+        self.settings = settings
+        self.interval = settings["sample_interval_s"]
+        # Appends are atomic under the GIL, so client threads need no lock.
+        self._lags: List[float] = []
+        self._outside: List[float] = []
+        self._http: List[float] = []
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, probe: str = "thread"):
+        """Start the clocks; `probe` "thread" samples thread wake-up lag, "loop" expects probe_loop()."""
+        self._cpu0 = time.process_time()
+        self._wall0 = time.perf_counter()
+        if probe == "thread":
+            self._thread = threading.Thread(
+                target=self._probe_thread, name="overhead-probe", daemon=True)
+            self._thread.start()
+
+    def _probe_thread(self):
+        while not self._stop.is_set():
+            t0 = time.perf_counter()
+            time.sleep(self.interval)
+            self._lags.append((time.perf_counter() - t0 - self.interval) * 1000)
+
+    async def probe_loop(self):
+        # Event-loop lag: how much later than asked the loop resumes a sleeper.
+        while not self._stop.is_set():
+            t0 = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self._lags.append((time.perf_counter() - t0 - self.interval) * 1000)
+
+    def add(self, started: float, http_ms: float, paced_ms: float = 0.0):
+        """
+        One client iteration that began at perf_counter() `started` and spent
+        `http_ms` in the request; `paced_ms` held by the rate limiter is not overhead.
+        """
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self._http.append(http_ms)
+        self._outside.append(max(0.0, elapsed_ms - http_ms - paced_ms))
+
+    def stop(self) -> Dict[str, Any]:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        wall = time.perf_counter() - self._wall0
+        cpu = time.process_time() - self._cpu0
+        http_total = sum(self._http)
+        summary = {
+            "measurements": len(self._outside),
+            "wall_s": round(wall, 3),
+            # Of one core: with the GIL, ~100% means the collector is saturated.
+            "cpu_percent": round(100 * cpu / wall, 1) if wall > 0 else 0.0,
+            "sched_lag_p50_ms": _pct(self._lags, 50),
+            "sched_lag_p99_ms": _pct(self._lags, 99),
+            "sched_lag_max_ms": round(max(self._lags), 3) if self._lags else 0.0,
+            "outside_http_p50_ms": _pct(self._outside, 50),
+            "outside_http_p95_ms": _pct(self._outside, 95),
+            "outside_http_ratio": round(sum(self._outside) / http_total, 4) if http_total > 0 else 0.0,
+        }
+        summary["reasons"] = saturation_reasons(summary, self.settings)
+        summary["flagged"] = bool(summary["reasons"])
+        return summary
+
+
+def start_monitor(settings: Dict[str, Any], probe: str = "thread") -> Optional[OverheadMonitor]:
+    if not settings["enabled"]:
+        return None
+    monitor = OverheadMonitor(settings)
+    monitor.start(probe)
+    return monitor
+
+
+def saturation_reasons(summary: Dict[str, Any], settings: Dict[str, Any]) -> List[str]:
+    reasons = []
+    if summary["cpu_percent"] > settings["max_cpu_percent"]:
+        reasons.append(f"cpu {summary['cpu_percent']}% > {settings['max_cpu_percent']}%")
+    if summary["sched_lag_p99_ms"] > settings["max_sched_lag_p99_ms"]:
+        reasons.append(
+            f"scheduling lag p99 {summary['sched_lag_p99_ms']} ms > {settings['max_sched_lag_p99_ms']} ms")
+    if summary["outside_http_ratio"] > settings["max_outside_http_ratio"]:
+        reasons.append(
+            f"time outside HTTP {summary['outside_http_ratio']:.1%} of HTTP time > {settings['max_outside_http_ratio']:.0%}")
+    return reasons
+
+
+def save_overhead(results_path: str, treatment: str, summary: Dict[str, Any]):
+    with open(overhead_path(results_path), "a", encoding="utf-8") as f:
+        f.write(json.dumps({"treatment": treatment, **summary}) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+if __name__ == "__main__":
+    # python -m src.collectors.client_overhead results/experiment_X.csv
+    for entry in load_overhead(sys.argv[1]):
+        mark = "SATURATED" if entry["flagged"] else "ok"
+        print(" ".join(filter(None, [
+            f"{mark:9}", entry["treatment"], entry.get("worker_id"),
+            f"cpu={entry['cpu_percent']}% lag_p99={entry['sched_lag_p99_ms']}ms "
+            f"outside_http={entry['outside_http_ratio']:.1%}",
+            "; ".join(entry["reasons"])])))
@@ -2,24 +2,46 @@
 Run the full GraphQL vs REST experiment.
 Executes all treatments and saves CSV incrementally.
 """
-import csv
 import os
 import time
 import random
 import logging
 from concurrent.futures import ThreadPoolExecutor
-from typing import Dict, Any, List
+from typing import Callable, Dict, Any, List, Optional
 
 from tqdm import tqdm
 
 from ..configs.config import config
 from ..design import get_design_summary, DESIGN_MARKDOWN
+from ..configs.clients import ClientRegistry, preload_queries, validate_query_mode
+from ..configs.http_cache import new_cache
+from ..configs.rate_limit import shared_limiter
+from ..configs.queries import graphql_queries
+from . import live_metrics
+from .adaptive_sampling import EarlyStopping, new_stopper, repetitions_budget, save_sampling
+from .client_overhead import OverheadMonitor, save_overhead, start_monitor
+from .latency_histograms import HistogramRecorder, save_histogram
+from .result_writer import ResultWriter, read_markers
+from .run_manifest import (
+    latest_unfinished,
+    load_manifest,
+    new_manifest,
+    reconcile,
+    record_done,
+    save_manifest,
+)
+from .stabilization import Stabilizer, TreatmentPipeline
 from ..configs.request_generators import (
     generate_rest_request,
     generate_graphql_request,
     build_record,
     get_load_levels,
+    get_arrival_rate,
+    arrival_offsets,
     cache_enabled,
+    observe_limits,
+    rate_limit_resource,
+    request_cost,
 )
 
 RESULTS_DIR = config["output"]["results_dir"]
@@ -50,82 +72,310 @@ def _setup_logging():
     logging.info("Logging initialized for experiment run")
 
 
-def _new_csv_path() -> str:
+def _new_results_path() -> str:
     ts = time.strftime("%Y-%m-%dT%H-%M-%S", time.gmtime())
-    return os.path.join(RESULTS_DIR, f"experiment_{ts}.csv")
+    ext = "parquet" if config["output"]["format"] == "parquet" else "csv"
+    return os.path.join(RESULTS_DIR, f"experiment_{ts}.{ext}")
 
 
-def _run_single_measurement(api_type: str, query_type: str, concurrent_clients: int, cache_state: str) -> Dict[str, Any]:
+def _run_single_measurement(registry: ClientRegistry, api_type: str, query_type: str, concurrent_clients: int, cache_state: str, intended: Optional[float] = None, measured: bool = True) -> Dict[str, Any]:
+    limiter = registry.limiter
+    paced = 0.0
+    if limiter:
+        paced = limiter.acquire(rate_limit_resource(api_type),
+                                request_cost(limiter, api_type, query_type))
+        if intended is not None:
+            # Pacing postpones the scheduled send; it is not the API's latency.
+            intended += paced
+    actual = time.time()
     if api_type == "REST":
-        result = generate_rest_request(query_type)
+        result = generate_rest_request(query_type, registry)
     else:
-        result = generate_graphql_request(query_type)
-    return build_record(api_type, query_type, concurrent_clients, cache_state, result)
-
-
-def _run_treatment(writer, api_type: str, query_type: str, concurrent_clients: int, cache_state: str):
-    if cache_enabled(cache_state):
-        warmups = config["experiment"]["warmup_requests"]
-        for _ in range(warmups):
-            _run_single_measurement(
-                api_type, query_type, concurrent_clients, cache_state)
-            time.sleep(config["experiment"]["request_interval"])
-
-    reps = config["experiment"]["repetitions"]
-    interval = config["experiment"]["request_interval"]
-
-    def client_loop(progress_cb=None):
-        for i in range(reps):
-            rec = _run_single_measurement(
-                api_type, query_type, concurrent_clients, cache_state)
-            writer.writerow(rec)
-            if progress_cb:
-                progress_cb(1)
-            if i < reps - 1:
-                time.sleep(interval)
-
-    total_iters = concurrent_clients * reps
-    with ThreadPoolExecutor(max_workers=concurrent_clients) as pool:
-        with tqdm(total=total_iters, desc=f"Coleta {api_type}/{query_type} (cache={cache_state}, cc={concurrent_clients})") as pbar:
-            def progress_cb(n): return pbar.update(n)
-            futures = [pool.submit(client_loop, progress_cb)
-                       for _ in range(concurrent_clients)]
-            for f in futures:
-                f.result()
-
-
-def _generate_treatments() -> List[Dict[str, Any]]:
+        result = generate_graphql_request(query_type, registry)
+    if limiter:
+        observe_limits(limiter, api_type, query_type, result)
+    result["actualSend"] = actual
+    result["throttleMs"] = paced * 1000
+    if intended is not None:
+        result["intendedSend"] = intended
+    rec = build_record(api_type, query_type, concurrent_clients,
+                       cache_state, result, registry.connection_mode)
+    if measured:
+        # Warmup requests are not recorded, so they stay out of the live metrics too.
+        live_metrics.observe(rec)
+    return rec
+
+
+def _run_treatment(writer, api_type: str, query_type: str, concurrent_clients: int, cache_state: str, connection_mode: str = "reuse", query_mode: str = "full", clients: Optional[int] = None, warmup: bool = True, on_ready: Optional[Callable[[], None]] = None):
+    """
+    Measure one treatment. `clients` is how many of the treatment's
+    concurrent_clients this process drives (all of them unless the treatment
+    is split across workers); `on_ready` is called after the warmup, right
+    before measuring starts. Returns the treatment's reports: "overhead"
+    (see client_overhead) and "sampling" (see adaptive_sampling), each None
+    when disabled.
+    """
+    if config["experiment"]["engine"] == "asyncio":
+        from .async_collector import run_treatment_async
+        return run_treatment_async(writer, api_type, query_type, concurrent_clients, cache_state, connection_mode, query_mode, clients, warmup, on_ready)
+
+    clients = clients or concurrent_clients
+    pool_maxsize = config["http"]["pool_maxsize"] or clients
+    cache = new_cache(config["http_cache"]) if cache_enabled(cache_state) else None
+    registry = ClientRegistry(
+        connection_mode, pool_maxsize=pool_maxsize, query_mode=query_mode, cache=cache,
+        limiter=shared_limiter(config["rate_limit"], config["github"]["target"]))
+    try:
+        if warmup and cache_enabled(cache_state):
+            warmups = config["experiment"]["warmup_requests"]
+            for _ in range(warmups):
+                _run_single_measurement(
+                    registry, api_type, query_type, concurrent_clients, cache_state, measured=False)
+                time.sleep(config["experiment"]["request_interval"])
+        if on_ready:
+            on_ready()
+
+        reps = repetitions_budget(config["experiment"])
+        stopper = new_stopper(config["experiment"]["adaptive"], clients)
+        interval = config["experiment"]["request_interval"]
+        total_iters = clients * reps
+        desc = f"Coleta {api_type}/{query_type} (cache={cache_state}, cc={concurrent_clients}, conn={connection_mode})"
+        show = config["experiment"]["progress_bars"]
+
+        monitor = start_monitor(config["client_monitor"])
+        try:
+            if config["experiment"]["load_model"] == "open":
+                with tqdm(total=total_iters, desc=desc, disable=not show) as pbar:
+                    _run_open_loop(registry, writer, api_type, query_type, concurrent_clients,
+                                   cache_state, total_iters, pbar.update, clients, monitor, stopper)
+            else:
+                def client_loop(progress_cb=None):
+                    for i in range(reps):
+                        started = time.perf_counter()
+                        rec = _run_single_measurement(
+                            registry, api_type, query_type, concurrent_clients, cache_state)
+                        writer.writerow(rec)
+                        if progress_cb:
+                            progress_cb(1)
+                        if monitor:
+                            monitor.add(started, rec["response_time_ms"], rec["throttle_ms"])
+                        if stopper and not stopper.add(rec["response_time_ms"]):
+                            break
+                        if i < reps - 1:
+                            time.sleep(interval)
+
+                with ThreadPoolExecutor(max_workers=clients) as pool:
+                    with tqdm(total=total_iters, desc=desc, disable=not show) as pbar:
+                        def progress_cb(n): return pbar.update(n)
+                        futures = [pool.submit(client_loop, progress_cb)
+                                   for _ in range(clients)]
+                        for f in futures:
+                            f.result()
+        finally:
+            overhead = monitor.stop() if monitor else None
+        return {"overhead": overhead, "sampling": stopper.summary() if stopper else None}
+    finally:
+        registry.close()
+
+
+def _run_open_loop(registry: ClientRegistry, writer, api_type: str, query_type: str, concurrent_clients: int, cache_state: str, total: int, progress_cb=None, clients: Optional[int] = None, monitor: Optional[OverheadMonitor] = None, stopper: Optional[EarlyStopping] = None):
+    # Requests are submitted at their scheduled time whether or not earlier
+    # ones finished; when all workers are busy the queueing delay shows up in
+    # the latency instead of silently lowering the offered load.
+    clients = clients or concurrent_clients
+    # A share of a split treatment offers the same share of its arrival rate.
+    rate = get_arrival_rate(
+        config["experiment"]["arrival_rate"], concurrent_clients) * clients / concurrent_clients
+    offsets = arrival_offsets(
+        total, rate, config["experiment"]["arrival_process"])
+
+    def measure(intended: float):
+        started = time.perf_counter()
+        queued_ms = (time.time() - intended) * 1000
+        rec = _run_single_measurement(
+            registry, api_type, query_type, concurrent_clients, cache_state, intended)
+        writer.writerow(rec)
+        if progress_cb:
+            progress_cb(1)
+        if monitor:
+            monitor.add(started, rec["response_time_ms"] - queued_ms, rec["throttle_ms"])
+        if stopper:
+            stopper.add(rec["response_time_ms"])
+
+    t0 = time.time()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        futures = []
+        for offset in offsets:
+            if stopper and stopper.done:
+                break
+            intended = t0 + offset
+            delay = intended - time.time()
+            if delay > 0:
+                time.sleep(delay)
+            futures.append(pool.submit(measure, intended))
+        for f in futures:
+            f.result()
+
+
+def _generate_treatments(seed: Optional[int] = None) -> List[Dict[str, Any]]:
     treatments: List[Dict[str, Any]] = []
     for qt in config["experiment"]["query_types"]:
         for cc in get_load_levels(config["experiment"]["concurrent_clients"]):
             for cs in config["experiment"]["cache_states"]:
-                treatments.append(
-                    {"api": "REST", "qt": qt, "cc": cc, "cs": cs})
-                treatments.append(
-                    {"api": "GraphQL", "qt": qt, "cc": cc, "cs": cs})
-    random.shuffle(treatments)
+                for cm in config["experiment"]["connection_modes"]:
+                    treatments.append(
+                        {"api": "REST", "qt": qt, "cc": cc, "cs": cs, "cm": cm, "qm": "full"})
+                    for qm in config["experiment"]["graphql_query_modes"]:
+                        treatments.append(
+                            {"api": "GraphQL", "qt": qt, "cc": cc, "cs": cs, "cm": cm, "qm": qm})
+    random.Random(seed).shuffle(treatments)
     return treatments
 
 
-def run_experiment() -> str:
+def _treatment_key(t: Dict[str, Any]) -> str:
+    return "|".join(str(t[k]) for k in ("api", "qt", "cc", "cs", "cm", "qm"))
+
+
+def _start_mock_server():
+    if config["github"]["target"] != "mock" or not config["mock_server"]["autostart"]:
+        return None
+    from ..servers.mock_github import spawn
+    proc = spawn()
+    logging.info(
+        f"Mock GitHub server started (pid {proc.pid}): {config['mock_server']}")
+    return proc
+
+
+def _open_manifest(results_path: str) -> Dict[str, Any]:
+    """The run's manifest, created with a seeded treatment order for a new run."""
+    manifest = load_manifest(results_path)
+    if manifest is None:
+        seed = config["experiment"]["seed"]
+        if seed is None:
+            seed = random.randrange(2 ** 32)
+        manifest = new_manifest(results_path, seed, _generate_treatments(seed),
+                                config["experiment"], config["output"]["format"])
+    else:
+        # The whole design is the manifest's, so one result store never mixes designs.
+        design = manifest["design"]
+        if {k: config["experiment"].get(k) for k in design} != design:
+            logging.warning(
+                f"Settings differ from those {results_path} started with; resuming with its design: {design}")
+            config["experiment"].update(design)
+    reconcile(manifest, read_markers(results_path))
+    save_manifest(results_path, manifest)
+    return manifest
+
+
+def _run_treatments(results_path: str, cluster=None):
+    manifest = _open_manifest(results_path)
+    # Fail before the first treatment rather than when a GraphQL client is built.
+    for qm in {t["qm"] for t in manifest["treatments"]}:
+        validate_query_mode(qm)
+    with ResultWriter(results_path, CSV_HEADERS, fmt=manifest["format"], **config["output"]["writer"]) as writer:
+        treatments = manifest["treatments"]
+        logging.info(f"Total treatments: {len(treatments)} (order seed {manifest['seed']})")
+        pending = [t for t in treatments
+                   if _treatment_key(t) not in writer.completed]
+        if len(pending) < len(treatments):
+            logging.info(
+                f"Resuming {results_path}: {len(treatments) - len(pending)} treatments already completed ({manifest['rows']} rows)")
+        done = len(treatments) - len(pending)
+        hdr = config["output"]["hdr_histogram"]
+        stabilization = config["experiment"]["stabilization"]
+        stabilizer = Stabilizer(stabilization)
+        stabilizer.measure_baselines(sorted({t["api"] for t in pending}))
+        if stabilizer.baselines:
+            logging.info(f"Baseline latency (ms): {stabilizer.baselines}")
+        pipeline = TreatmentPipeline(stabilizer)
+        # Requests made under adaptive sampling vs. the fixed repetitions.
+        measured = fixed = 0
+        for idx, t in enumerate(pending, start=1):
+            logging.info(f"Running treatment {idx}/{len(pending)}: {t}")
+            live_metrics.set_treatment(t, done, len(treatments))
+            sink = writer
+            if hdr["enabled"]:
+                sink = HistogramRecorder(
+                    writer, hdr["highest_us"], hdr["significant_digits"])
+            key = _treatment_key(t)
+            on_ready = pipeline.start(t["api"])
+            if cluster is not None:
+                reports = cluster.run_treatment(sink, t, on_ready)
+            else:
+                reports = [{"worker_id": "", **_run_treatment(
+                    sink, t["api"], t["qt"], t["cc"], t["cs"], t["cm"], t["qm"], on_ready=on_ready)}]
+            gap = pipeline.finish(t["api"], more=idx < len(pending))
+            if gap:
+                logging.info(f"Before {key}: {gap}")
+            # Before the marker: a treatment marked done is never rerun.
+            if hdr["enabled"]:
+                save_histogram(results_path, key, sink.merged())
+            for report in reports:
+                worker = {"worker_id": report["worker_id"]}
+                if report["overhead"]:
+                    save_overhead(results_path, key, {**worker, **report["overhead"]})
+                if report["sampling"]:
+                    save_sampling(results_path, key, {**worker, **report["sampling"]})
+            marker = writer.mark_done(key)
+            record_done(manifest, key, marker["rows"])
+            save_manifest(results_path, manifest)
+            for report in reports:
+                label = f"{key} [{report['worker_id']}]" if report["worker_id"] else key
+                overhead, sampling = report["overhead"], report["sampling"]
+                if overhead and overhead["flagged"]:
+                    logging.warning(
+                        f"Client saturation in {label}: {'; '.join(overhead['reasons'])}")
+                if sampling:
+                    measured += sampling["measurements"]
+                    fixed += sampling["clients"] * config["experiment"]["repetitions"]
+                    logging.info(
+                        f"Adaptive sampling {label}: {sampling['measurements']} requests ({sampling['reason']}), relative CI widths {sampling['rel_ci_width']}")
+            done += 1
+        stabilizer.close()
+        manifest["finished"] = time.time()
+        save_manifest(results_path, manifest)
+        if pipeline.serial:
+            logging.info(
+                f"Between treatments: {pipeline.idle:.0f} s idle where fixed {stabilization['fixed_s']:g} s pauses "
+                f"and serial warmups would take {pipeline.serial:.0f} s ({pipeline.saved():.0f} s of wall time saved)")
+        if fixed:
+            logging.info(
+                f"Adaptive sampling made {measured} requests where fixed repetitions would make {fixed} ({(fixed - measured) / fixed:.1%} fewer)")
+
+
+def run_experiment(results_path: Optional[str] = None, resume: bool = False) -> str:
+    """
+    Run every treatment. Pass the results of an interrupted run to resume it,
+    or `resume` to pick up the latest unfinished run in the results directory.
+    """
     _setup_logging()
-    csv_path = _new_csv_path()
-
-    with open(csv_path, "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=CSV_HEADERS)
-        writer.writeheader()
-
-        treatments = _generate_treatments()
-        logging.info(f"Total treatments: {len(treatments)}")
-        for idx, t in enumerate(treatments, start=1):
-            logging.info(f"Running treatment {idx}/{len(treatments)}: {t}")
-            _run_treatment(writer, t["api"], t["qt"], t["cc"], t["cs"])
-            if idx < len(treatments):
-                logging.info("Stabilization interval...")
-                time.sleep(30.0)
-
-    logging.info(f"Results saved to: {csv_path}")
-    return csv_path
+    if resume and results_path is None:
+        results_path = latest_unfinished(RESULTS_DIR)
+        if results_path is None:
+            logging.info("No unfinished run to resume; starting a new one")
+    results_path = results_path or _new_results_path()
+    # Parse every GraphQL document up front so no measurement pays for it.
+    preload_queries(graphql_queries.values())
+    mock = _start_mock_server()
+    metrics_server = live_metrics.start_server(config["live_metrics"])
+    cluster = None
+    try:
+        if config["distributed"]["workers"] > 0:
+            from .distributed import Coordinator
+            cluster = Coordinator(config["distributed"])
+            cluster.start()
+        _run_treatments(results_path, cluster)
+    finally:
+        if cluster is not None:
+            cluster.close()
+        if metrics_server is not None:
+            metrics_server.shutdown()
+            metrics_server.server_close()
+        if mock is not None:
+            mock.terminate()
+            mock.wait()
+    logging.info(f"Results saved to: {results_path}")
+    return results_path
 
 
 if __name__ == "__main__":
@@ -0,0 +1,351 @@
+"""
+Coordinator/worker load generation.
+The coordinator splits each treatment's concurrent_clients across worker
+processes (local subprocesses or other hosts), releases them together once
+every worker has warmed up, and merges the records they stream back into the
+run's single result store, tagging each row with its worker_id.
+
+    python -m src.collectors.distributed worker --connect 10.0.0.5:9200 [--id host-a]
+"""
+import argparse
+import logging
+import os
+import ipaddress
+import queue
+import secrets
+import socket
+import subprocess
+import sys
+import threading
+import time
+import traceback
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener, wait
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from tqdm import tqdm
+
+from . import live_metrics
+from .adaptive_sampling import repetitions_budget
+from ..configs.config import config
+
+_STOP = object()
+
+# Settings pushed to every worker so all shares of a treatment run alike; the
+# GitHub token is left out and always comes from the worker's environment.
+SHARED_SECTIONS = ("experiment", "http", "http_cache", "rate_limit", "github", "mock_server", "client_monitor")
+
+
+def split_clients(concurrent_clients: int, workers: int) -> List[int]:
+    """Clients per worker, as even as possible; workers left without a share are dropped."""
+    base, extra = divmod(concurrent_clients, workers)
+    shares = [base + (i < extra) for i in range(workers)]
+    return [n for n in shares if n > 0]
+
+
+def _shared_config(workers: int) -> Dict[str, Dict[str, Any]]:
+    shared = {section: dict(config[section]) for section in SHARED_SECTIONS}
+    shared["github"].pop("token", None)
+    # The secondary rate limits are per token; split them between the workers.
+    shared["rate_limit"]["share"] = config["rate_limit"]["share"] / workers
+    return shared
+
+
+def _is_loopback(host: str) -> bool:
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def cluster_key(settings: Dict[str, Any]) -> str:
+    """
+    The worker handshake key. Peers that pass the handshake can send the
+    coordinator pickles, so a key is required (GVR_CLUSTER_KEY) whenever
+    remote workers could connect; local-only runs get a fresh random key.
+    """
+    if settings["authkey"]:
+        return settings["authkey"]
+    if settings["spawn_local"] and _is_loopback(settings["host"]):
+        return secrets.token_hex()
+    raise ValueError(
+        f"Set GVR_CLUSTER_KEY to a shared secret: the coordinator on {settings['host']} "
+        f"accepts remote workers (spawn_local={settings['spawn_local']})")
+
+
+def _locked_send(conn) -> Callable[[Any], None]:
+    # Connection.send is not thread-safe; the record stream and the worker's
+    # control messages share the connection.
+    lock = threading.Lock()
+
+    def send(msg):
+        with lock:
+            conn.send(msg)
+    return send
+
+
+class RecordStream:
+    """Worker-side writer: records are batched and sent to the coordinator from one thread."""
+
+    def __init__(self, send: Callable[[Any], None], batch_size: int = 200, flush_interval: float = 0.5):
+        self._send = send
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: "queue.SimpleQueue[Any]" = queue.SimpleQueue()
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(
+            target=self._run, name="record-stream", daemon=True)
+        self._thread.start()
+
+    def writerow(self, rec: Dict[str, Any]):
+        if self._error is not None:
+            raise RuntimeError("Record stream failed") from self._error
+        self._queue.put(rec)
+
+    def close(self):
+        self._queue.put(_STOP)
+        self._thread.join()
+        if self._error is not None:
+            raise RuntimeError("Record stream failed") from self._error
+
+    def _run(self):
+        batch: List[Dict[str, Any]] = []
+        last_send = time.monotonic()
+        try:
+            while True:
+                try:
+                    item = self._queue.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    item = None
+                if item is _STOP:
+                    break
+                if item is not None:
+                    batch.append(item)
+                if batch and (len(batch) >= self.batch_size or time.monotonic() - last_send >= self.flush_interval):
+                    self._send(("rows", batch))
+                    batch = []
+                    last_send = time.monotonic()
+            if batch:
+                self._send(("rows", batch))
+        except BaseException as e:
+            self._error = e
+
+
+def _connect(address: Tuple[str, int], authkey: bytes, timeout: float):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return Client(address, authkey=authkey)
+        except OSError:
+            if time.monotonic() >= deadline:
+                raise
+            time.sleep(0.2)
+
+
+def run_worker(address: Tuple[str, int], worker_id: Optional[str] = None, authkey: Optional[bytes] = None, connect_timeout: float = 60.0):
+    """Serve treatment shares for a coordinator until it says stop or goes away."""
+    # Imported here: the collector imports this module for the coordinator.
+    from .collector import _run_treatment
+    from ..configs.clients import preload_queries
+    from ..configs.queries import graphql_queries
+
+    settings = config["distributed"]
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    authkey = authkey or settings["authkey"].encode()
+    if not authkey:
+        raise ValueError("Set GVR_CLUSTER_KEY to the coordinator's key")
+    conn = _connect(address, authkey, connect_timeout)
+    send = _locked_send(conn)
+    send(("hello", worker_id))
+    try:
+        while True:
+            msg = conn.recv()
+            kind = msg[0]
+            if kind == "config":
+                for section, values in msg[1].items():
+                    config[section].update(values)
+                config["experiment"]["progress_bars"] = False
+                preload_queries(graphql_queries.values())
+            elif kind == "run":
+                _, t, clients, warmup = msg
+
+                def ready():
+                    send(("ready",))
+                    if conn.recv()[0] != "go":
+                        raise RuntimeError("Treatment aborted by the coordinator")
+
+                stream = RecordStream(
+                    send, settings["batch_size"], settings["flush_interval"])
+                error = reports = None
+                try:
+                    reports = _run_treatment(stream, t["api"], t["qt"], t["cc"], t["cs"], t["cm"], t["qm"],
+                                   clients=clients, warmup=warmup, on_ready=ready)
+                except Exception:
+                    error = traceback.format_exc()
+                try:
+                    stream.close()
+                except RuntimeError:
+                    error = error or traceback.format_exc()
+                send(("error", error) if error else ("done", reports))
+            elif kind == "stop":
+                break
+    except EOFError:
+        logging.warning(f"Worker {worker_id}: coordinator closed the connection")
+    finally:
+        conn.close()
+
+
+class Coordinator:
+    """
+    Accepts `workers` connections and runs every treatment across them.
+    Warmup runs on the first worker only (on every worker when they keep a
+    client cache); measuring starts on all workers at once, after each has
+    reported ready.
+    """
+
+    def __init__(self, settings: Dict[str, Any]):
+        self.settings = settings
+        self.authkey = cluster_key(settings)
+        self.listener = Listener(
+            (settings["host"], settings["port"]), authkey=self.authkey.encode())
+        self.address = self.listener.address
+        self.workers: List[Tuple[str, Any]] = []
+        self._procs: List[subprocess.Popen] = []
+        self._closed = False
+
+    def _spawn_local(self):
+        host, port = self.address
+        if host in ("0.0.0.0", ""):
+            host = "127.0.0.1"
+        env = {**os.environ, "GVR_CLUSTER_KEY": self.authkey}
+        for i in range(self.settings["workers"]):
+            self._procs.append(subprocess.Popen(
+                [sys.executable, "-m", "src.collectors.distributed", "worker",
+                 "--connect", f"{host}:{port}", "--id", f"local-{i}"],
+                env=env))
+
+    def _accept(self):
+        expected = self.settings["workers"]
+
+        def accept():
+            while len(self.workers) < expected:
+                try:
+                    conn = self.listener.accept()
+                    _, worker_id = conn.recv()
+                except (OSError, EOFError, AuthenticationError):
+                    # Listener closed, or a peer with the wrong authkey.
+                    if self._closed:
+                        return
+                    continue
+                self.workers.append((worker_id, conn))
+                logging.info(
+                    f"Worker {worker_id} connected ({len(self.workers)}/{expected})")
+
+        thread = threading.Thread(target=accept, daemon=True)
+        thread.start()
+        thread.join(self.settings["connect_timeout_s"])
+        if len(self.workers) < expected:
+            raise TimeoutError(
+                f"Only {len(self.workers)} of {expected} workers connected to {self.address}")
+
+    def start(self):
+        if self.settings["spawn_local"]:
+            self._spawn_local()
+        logging.info(
+            f"Coordinator waiting for {self.settings['workers']} workers on {self.address}")
+        self._accept()
+        shared = _shared_config(len(self.workers))
+        for _, conn in self.workers:
+            conn.send(("config", shared))
+
+    def run_treatment(self, writer, t: Dict[str, Any], on_ready: Optional[Callable[[], None]] = None) -> List[Dict[str, Any]]:
+        """
+        Run `t` across the workers; returns each worker's treatment reports.
+        `on_ready` is called once every worker has warmed up, before they start measuring.
+        """
+        shares = split_clients(t["cc"], len(self.workers))
+        active = self.workers[:len(shares)]
+        # Each worker's client cache needs its own warmup.
+        warm_all = config["http_cache"]["enabled"]
+        for i, ((_, conn), clients) in enumerate(zip(active, shares)):
+            conn.send(("run", t, clients, i == 0 or warm_all))
+        ids = {conn: worker_id for worker_id, conn in active}
+        running = set(ids)
+        waiting = set(ids)
+        reports: List[Dict[str, Any]] = []
+        desc = f"Coleta {t['api']}/{t['qt']} (cache={t['cs']}, cc={t['cc']}, workers={len(active)})"
+        total = t["cc"] * repetitions_budget(config["experiment"])
+        with tqdm(total=total, desc=desc, disable=not config["experiment"]["progress_bars"]) as pbar:
+            while running:
+                for conn in wait(list(running)):
+                    try:
+                        msg = conn.recv()
+                    except EOFError:
+                        self._abort(waiting)
+                        raise RuntimeError(f"Worker {ids[conn]} disconnected")
+                    kind = msg[0]
+                    if kind == "rows":
+                        for rec in msg[1]:
+                            rec["worker_id"] = ids[conn]
+                            live_metrics.observe(rec)
+                            writer.writerow(rec)
+                        pbar.update(len(msg[1]))
+                    elif kind == "ready":
+                        waiting.discard(conn)
+                        if not waiting:
+                            if on_ready:
+                                on_ready()
+                            for c in ids:
+                                c.send(("go",))
+                    elif kind == "done":
+                        running.discard(conn)
+                        reports.append({"worker_id": ids[conn], **msg[1]})
+                    elif kind == "error":
+                        self._abort(waiting - {conn})
+                        raise RuntimeError(
+                            f"Worker {ids[conn]} failed:\n{msg[1]}")
+        return reports
+
+    def _abort(self, waiting):
+        for conn in waiting:
+            try:
+                conn.send(("abort",))
+            except OSError:
+                pass
+
+    def close(self):
+        for _, conn in self.workers:
+            try:
+                conn.send(("stop",))
+                conn.close()
+            except OSError:
+                pass
+        self._closed = True
+        self.listener.close()
+        for proc in self._procs:
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.terminate()
+                proc.wait()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Distributed load generation")
+    sub = parser.add_subparsers(dest="command", required=True)
+    worker = sub.add_parser("worker", help="drive client shares for a coordinator")
+    worker.add_argument("--connect", required=True, metavar="HOST:PORT")
+    worker.add_argument("--id", default=None, help="worker_id in the results (default: host-pid)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO,
+                        format="%(asctime)s [%(levelname)s] %(message)s")
+    host, port = args.connect.rsplit(":", 1)
+    run_worker((host, int(port)), args.id,
+               connect_timeout=config["distributed"]["connect_timeout_s"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Per-treatment latency histograms.
+HistogramRecorder wraps the result writer: every measured row is also
+recorded, in microseconds, into a histogram owned by the calling thread, so
+recording never contends. The per-thread histograms are merged when the
+treatment ends and appended to `<results>.hdr.jsonl`; histograms from other
+runs of the same treatment merge the same way.
+"""
+import json
+import os
+import sys
+import threading
+from typing import Any, Dict, List, Optional
+
+from ..analyzers.sketches import HdrHistogram
+from .result_writer import read_markers
+
+
+def histograms_path(results_path: str) -> str:
+    return results_path.rstrip("/\\") + ".hdr.jsonl"
+
+
+class HistogramRecorder:
+    def __init__(self, writer, highest_us: int = 3_600_000_000, significant_digits: int = 3):
+        self.writer = writer
+        self.highest_us = highest_us
+        self.significant_digits = significant_digits
+        self._local = threading.local()
+        self._histograms: List[HdrHistogram] = []
+        self._lock = threading.Lock()
+
+    def _histogram(self) -> HdrHistogram:
+        hist = getattr(self._local, "hist", None)
+        if hist is None:
+            hist = HdrHistogram(self.highest_us, self.significant_digits)
+            with self._lock:
+                self._histograms.append(hist)
+            self._local.hist = hist
+        return hist
+
+    def writerow(self, rec: Dict[str, Any]):
+        self._histogram().record_value(round(rec["response_time_ms"] * 1000))
+        self.writer.writerow(rec)
+
+    def merged(self) -> HdrHistogram:
+        total = HdrHistogram(self.highest_us, self.significant_digits)
+        with self._lock:
+            for hist in self._histograms:
+                total.merge(hist)
+        return total
+
+
+def save_histogram(results_path: str, treatment: str, hist: HdrHistogram):
+    with open(histograms_path(results_path), "a", encoding="utf-8") as f:
+        f.write(json.dumps({
+            "treatment": treatment,
+            "metric": "response_time_us",
+            "count": hist.total,
+            "histogram": hist.to_dict(),
+        }) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def load_histograms(*results_paths: str, into: Optional[Dict[str, HdrHistogram]] = None) -> Dict[str, HdrHistogram]:
+    """Histograms per treatment key, merged across every run given."""
+    merged: Dict[str, HdrHistogram] = into if into is not None else {}
+    for results_path in results_paths:
+        path = histograms_path(results_path)
+        if not os.path.exists(path):
+            continue
+        # A histogram is saved before its treatment's marker: a treatment
+        # interrupted in between is rerun on resume and saved again, so the
+        # last entry wins, and only treatments with a marker count.
+        markers = read_markers(results_path)
+        completed = {m["treatment"] for m in markers}
+        run: Dict[str, HdrHistogram] = {}
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break
+                if markers and entry["treatment"] not in completed:
+                    continue
+                run[entry["treatment"]] = HdrHistogram.from_dict(entry["histogram"])
+        for treatment, hist in run.items():
+            if treatment in merged:
+                merged[treatment].merge(hist)
+            else:
+                merged[treatment] = hist
+    return merged
+
+
+def percentile_rows(histograms: Dict[str, HdrHistogram], quantiles=(0.5, 0.9, 0.99, 0.999)) -> List[Dict[str, Any]]:
+    rows = []
+    for treatment, hist in sorted(histograms.items()):
+        values = hist.quantiles(quantiles) / 1000
+        rows.append({"treatment": treatment, "count": hist.total,
+                     **{f"p{q * 100:g}_ms": round(float(v), 3) for q, v in zip(quantiles, values)}})
+    return rows
+
+
+if __name__ == "__main__":
+    # python -m src.collectors.latency_histograms results/experiment_A.csv [results/experiment_B.csv ...]
+    rows = percentile_rows(load_histograms(*sys.argv[1:]))
+    if rows:
+        print("\t".join(rows[0]))
+        for row in rows:
+            print("\t".join(str(v) for v in row.values()))
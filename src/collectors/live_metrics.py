@@ -0,0 +1,187 @@
+"""
+Live metrics for a running collection, in Prometheus text format.
+The measurement path only appends to a bounded deque and bumps its series'
+counters under that series' lock; rolling percentiles, throughput and error
+rate are computed when scraped.
+
+    curl http://127.0.0.1:9108/metrics
+"""
+import logging
+import threading
+import time
+from collections import deque
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, Any, Optional, Tuple
+
+import numpy as np
+
+PREFIX = "gvr"
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def is_success(status_code) -> bool:
+    return 200 <= int(status_code or 0) < 400
+
+
+class _Series:
+    __slots__ = ("samples", "lock", "requests", "errors", "latency_sum")
+
+    def __init__(self, maxlen: int):
+        # (monotonic time, latency ms, ok)
+        self.samples: deque = deque(maxlen=maxlen)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.latency_sum = 0.0
+
+    def add(self, latency_ms: float, ok: bool):
+        with self.lock:
+            self.samples.append((time.monotonic(), latency_ms, ok))
+            self.requests += 1
+            self.latency_sum += latency_ms
+            if not ok:
+                self.errors += 1
+
+    def totals(self) -> Tuple[int, int, float]:
+        """Requests, errors and summed latency (ms) since the start."""
+        with self.lock:
+            return self.requests, self.errors, self.latency_sum
+
+
+class LiveMetrics:
+    def __init__(self, window_s: float = 60.0, max_samples: int = 100_000):
+        self.window_s = window_s
+        self.max_samples = max_samples
+        self._series: Dict[Tuple[str, str], _Series] = {}
+        self._create_lock = threading.Lock()
+        self.started = time.monotonic()
+        self.treatment: Dict[str, Any] = {}
+        self.progress = (0, 0)
+
+    def _get(self, key: Tuple[str, str]) -> _Series:
+        series = self._series.get(key)
+        if series is None:
+            with self._create_lock:
+                series = self._series.setdefault(
+                    key, _Series(self.max_samples))
+        return series
+
+    def observe(self, rec: Dict[str, Any]):
+        series = self._get((rec["api_type"], rec["query_type"]))
+        series.add(rec["response_time_ms"], is_success(rec["status_code"]))
+
+    def set_treatment(self, treatment: Dict[str, Any], index: int, total: int):
+        self.treatment = dict(treatment)
+        self.progress = (index, total)
+
+    def render(self) -> str:
+        now = time.monotonic()
+        lines = []
+
+        def metric(name: str, kind: str, help_text: str):
+            lines.append(f"# HELP {PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {PREFIX}_{name} {kind}")
+
+        def labels(key: Tuple[str, str], **extra) -> str:
+            pairs = {"api_type": key[0], "query_type": key[1], **extra}
+            return "{" + ",".join(f'{k}="{v}"' for k, v in pairs.items()) + "}"
+
+        snapshot = {}
+        for key, series in list(self._series.items()):
+            totals = series.totals()
+            recent = [s for s in list(series.samples)
+                      if now - s[0] <= self.window_s]
+            snapshot[key] = (totals, recent)
+
+        metric("requests_total", "counter", "Measured requests.")
+        for key, ((requests, _, _), _) in snapshot.items():
+            lines.append(f"{PREFIX}_requests_total{labels(key)} {requests}")
+        metric("request_errors_total", "counter", "Measured requests without a 2xx/3xx status.")
+        for key, ((_, errors, _), _) in snapshot.items():
+            lines.append(f"{PREFIX}_request_errors_total{labels(key)} {errors}")
+
+        metric("response_time_ms", "summary",
+               f"Response time; quantiles over the last {self.window_s:g} s, count and sum since the start.")
+        for key, ((requests, _, latency_sum), recent) in snapshot.items():
+            if recent:
+                latencies = np.fromiter((s[1] for s in recent), dtype=float)
+                for q, v in zip(QUANTILES, np.quantile(latencies, QUANTILES)):
+                    lines.append(
+                        f"{PREFIX}_response_time_ms{labels(key, quantile=q)} {v:.3f}")
+            lines.append(f"{PREFIX}_response_time_ms_sum{labels(key)} {latency_sum:.3f}")
+            lines.append(f"{PREFIX}_response_time_ms_count{labels(key)} {requests}")
+
+        window = min(self.window_s, max(now - self.started, 1e-9))
+        metric("throughput_rps", "gauge", f"Requests per second over the last {self.window_s:g} s.")
+        for key, (_, recent) in snapshot.items():
+            lines.append(f"{PREFIX}_throughput_rps{labels(key)} {len(recent) / window:.3f}")
+        metric("error_rate", "gauge", f"Share of failed requests over the last {self.window_s:g} s.")
+        for key, (_, recent) in snapshot.items():
+            errors = sum(1 for s in recent if not s[2])
+            rate = errors / len(recent) if recent else 0.0
+            lines.append(f"{PREFIX}_error_rate{labels(key)} {rate:.4f}")
+
+        metric("treatments_completed", "gauge", "Treatments finished in this run.")
+        lines.append(f"{PREFIX}_treatments_completed {self.progress[0]}")
+        metric("treatments_total", "gauge", "Treatments scheduled in this run.")
+        lines.append(f"{PREFIX}_treatments_total {self.progress[1]}")
+        if self.treatment:
+            metric("current_treatment", "gauge", "Treatment being collected.")
+            info = ",".join(f'{k}="{v}"' for k, v in self.treatment.items())
+            lines.append(f"{PREFIX}_current_treatment{{{info}}} 1")
+        return "\n".join(lines) + "\n"
+
+
+# Shared by both collection engines; replaced by start_server's configuration.
+METRICS = LiveMetrics()
+
+
+def observe(rec: Dict[str, Any]):
+    METRICS.observe(rec)
+
+
+def set_treatment(treatment: Dict[str, Any], index: int, total: int):
+    METRICS.set_treatment(treatment, index, total)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "MetricsServer"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.server.metrics.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class MetricsServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], metrics: LiveMetrics):
+        self.metrics = metrics
+        super().__init__(address, _Handler)
+
+
+def start_server(settings: Dict[str, Any]) -> Optional[MetricsServer]:
+    """Reset the shared metrics and serve them; None if disabled or the port is taken."""
+    global METRICS
+    if not settings.get("enabled"):
+        return None
+    METRICS = LiveMetrics(window_s=settings["window_s"])
+    try:
+        server = MetricsServer((settings["host"], settings["port"]), METRICS)
+    except OSError as e:
+        logging.warning(f"Live metrics endpoint disabled: {e}")
+        return None
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    logging.info(f"Live metrics at http://{host}:{port}/metrics")
+    return server
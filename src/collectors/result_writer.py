@@ -0,0 +1,278 @@
+"""
+Queued result writer for the collectors.
+Measurement threads (or event-loop tasks) only enqueue records; one writer
+thread appends them in batches, flushes and fsyncs periodically, and appends a
+resume marker for each finished treatment once its rows are on disk.
+Rows go to a CSV file or to a Parquet dataset partitioned by treatment.
+"""
+import csv
+import json
+import os
+import queue
+import threading
+import time
+from typing import Dict, Any, List, Optional, Set
+
+from ..analyzers.run_files import markers_path, read_markers
+
+_STOP = object()
+
+# Hive-style directory levels of the Parquet store, outermost first.
+PARTITION_COLS = ["api_type", "query_type", "cache_state", "concurrent_clients"]
+
+
+class _Marker:
+    __slots__ = ("treatment", "done", "record")
+
+    def __init__(self, treatment: str):
+        self.treatment = treatment
+        self.done = threading.Event()
+        self.record: Optional[Dict[str, Any]] = None
+
+
+def _row(item: Any) -> Dict[str, Any]:
+    """Row dict of a queued record; measurement records are formatted here, off the hot path."""
+    as_row = getattr(item, "as_row", None)
+    return as_row() if as_row is not None else item
+
+
+def _fsync(f):
+    f.flush()
+    os.fsync(f.fileno())
+
+
+class CsvSink:
+    def __init__(self, path: str, fieldnames: List[str], markers: List[Dict[str, Any]]):
+        resume_at = markers[-1]["offset"] if markers else 0
+        if os.path.exists(path):
+            os.truncate(path, min(resume_at, os.path.getsize(path)))
+        self._file = open(path, "a", newline="", encoding="utf-8")
+        self._writer = csv.DictWriter(self._file, fieldnames=fieldnames)
+        if resume_at == 0:
+            self._writer.writeheader()
+            _fsync(self._file)
+
+    def write(self, rows: List[Dict[str, Any]]):
+        self._writer.writerows(rows)
+
+    def sync(self, durable: bool):
+        if durable:
+            _fsync(self._file)
+        else:
+            self._file.flush()
+
+    def checkpoint(self) -> Dict[str, Any]:
+        _fsync(self._file)
+        return {"offset": os.fstat(self._file.fileno()).st_size}
+
+    def close(self):
+        self._file.close()
+
+
+def _arrow_type(pa, column: str):
+    if column == "timestamp" or column.endswith("_ts"):
+        return pa.timestamp("us", tz="UTC")
+    if column in ("api_type", "query_type", "cache_state", "connection_mode", "query_mode", "fanout_strategy", "worker_id", "cache_result"):
+        return pa.dictionary(pa.int8(), pa.string())
+    if column == "concurrent_clients":
+        return pa.int32()
+    if column == "rate_limited":
+        return pa.int8()
+    if column in ("status_code", "graphql_cost") or column.endswith("_bytes"):
+        return pa.int64()
+    if column.endswith("_ms") and column != "subrequest_ms":
+        return pa.float64()
+    return pa.string()
+
+
+class ParquetSink:
+    """
+    Parquet dataset under `path`, one directory level per PARTITION_COLS entry.
+    Rows are buffered and written as one file per partition at each treatment
+    checkpoint (or every `row_group_size` rows), so durability is per treatment.
+    Files are tagged with the checkpoint sequence number; on resume, files
+    newer than the last marker belong to an interrupted treatment and are removed.
+    """
+
+    def __init__(self, path: str, fieldnames: List[str], markers: List[Dict[str, Any]], row_group_size: int = 100_000):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError(
+                "output format 'parquet' requires pyarrow") from e
+        import pandas as pd
+        self._pa, self._pq, self._pd = pa, pq, pd
+        self.path = path
+        self.fieldnames = fieldnames
+        self.schema = pa.schema([(c, _arrow_type(pa, c)) for c in fieldnames])
+        self.row_group_size = row_group_size
+        self._seq = len(markers)
+        self._chunk = 0
+        self._rows: List[Dict[str, Any]] = []
+        os.makedirs(path, exist_ok=True)
+        for root, _, files in os.walk(path):
+            for name in files:
+                if name.startswith("part-") and int(name.split("-")[1]) >= self._seq:
+                    os.remove(os.path.join(root, name))
+
+    def _table(self, rows: List[Dict[str, Any]]):
+        pd = self._pd
+        df = pd.DataFrame.from_records(rows, columns=self.fieldnames)
+        for field in self.schema:
+            col = field.name
+            if self._pa.types.is_timestamp(field.type):
+                df[col] = pd.to_datetime(df[col], utc=True, format="ISO8601")
+            elif self._pa.types.is_integer(field.type) or self._pa.types.is_floating(field.type):
+                df[col] = pd.to_numeric(df[col], errors="coerce")
+            elif self._pa.types.is_dictionary(field.type):
+                # A column absent from every row comes back as all-NaN floats.
+                df[col] = df[col].fillna("").astype(str)
+            else:
+                df[col] = df[col].astype("string")
+        return self._pa.Table.from_pandas(df, schema=self.schema, preserve_index=False)
+
+    def _flush(self):
+        if not self._rows:
+            return
+        table = self._table(self._rows)
+        self._rows = []
+        self._pq.write_to_dataset(
+            table,
+            self.path,
+            partition_cols=PARTITION_COLS,
+            basename_template=f"part-{self._seq:06d}-{self._chunk:04d}-{{i}}.parquet",
+            existing_data_behavior="overwrite_or_ignore",
+        )
+        self._chunk += 1
+
+    def write(self, rows: List[Dict[str, Any]]):
+        self._rows.extend(rows)
+        if len(self._rows) >= self.row_group_size:
+            self._flush()
+
+    def sync(self, durable: bool):
+        pass
+
+    def checkpoint(self) -> Dict[str, Any]:
+        self._flush()
+        marker = {"seq": self._seq}
+        self._seq += 1
+        self._chunk = 0
+        return marker
+
+    def close(self):
+        self._flush()
+
+
+def _open_sink(fmt: str, path: str, fieldnames: List[str], markers: List[Dict[str, Any]]):
+    if fmt == "csv":
+        return CsvSink(path, fieldnames, markers)
+    if fmt == "parquet":
+        return ParquetSink(path, fieldnames, markers)
+    raise ValueError(f"Unknown output format: {fmt}")
+
+
+class ResultWriter:
+    """
+    Drop-in for csv.DictWriter.writerow that is safe to call from many threads.
+    If `path` already holds a previous run, rows written after its last marker
+    (an interrupted treatment) are discarded and writing continues after the
+    last completed treatment; see `completed`.
+    """
+
+    def __init__(self, path: str, fieldnames: List[str], batch_size: int = 500, flush_interval: float = 1.0, fsync: bool = True, fmt: str = "csv"):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        markers = read_markers(path)
+        self.completed: Set[str] = {m["treatment"] for m in markers}
+        self._sink = _open_sink(fmt, path, fieldnames, markers)
+        self._markers = open(markers_path(path), "a", encoding="utf-8")
+        self._queue: "queue.SimpleQueue[Any]" = queue.SimpleQueue()
+        self._error: Optional[BaseException] = None
+        self._rows = 0
+        self._thread = threading.Thread(
+            target=self._run, name="result-writer", daemon=True)
+        self._thread.start()
+
+    def writerow(self, rec: Any):
+        """Queue a row: a dict, or a record with as_row() (see request_generators.Record)."""
+        if self._error is not None:
+            raise RuntimeError("Result writer failed") from self._error
+        self._queue.put(rec)
+
+    def mark_done(self, treatment: str, wait: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        Record that every row of `treatment` has been submitted. With `wait`,
+        returns the marker once written (treatment, rows, position).
+        """
+        marker = _Marker(treatment)
+        self._queue.put(marker)
+        if wait:
+            while not marker.done.wait(0.5) and self._thread.is_alive():
+                pass
+            if self._error is not None:
+                raise RuntimeError("Result writer failed") from self._error
+        self.completed.add(treatment)
+        return marker.record
+
+    def close(self):
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._sink.close()
+        self._markers.close()
+        if self._error is not None:
+            raise RuntimeError("Result writer failed") from self._error
+
+    def __enter__(self) -> "ResultWriter":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _write(self, pending: List[Dict[str, Any]]):
+        if pending:
+            self._sink.write([_row(item) for item in pending])
+            self._rows += len(pending)
+            pending.clear()
+
+    def _run(self):
+        pending: List[Dict[str, Any]] = []
+        last_sync = time.monotonic()
+        try:
+            while True:
+                try:
+                    item = self._queue.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    item = None
+                if item is _STOP:
+                    break
+                if isinstance(item, _Marker):
+                    self._write(pending)
+                    position = self._sink.checkpoint()
+                    last_sync = time.monotonic()
+                    item.record = {
+                        "treatment": item.treatment,
+                        "rows": self._rows,
+                        **position,
+                        "ts": time.time(),
+                    }
+                    self._markers.write(json.dumps(item.record) + "\n")
+                    _fsync(self._markers)
+                    self._rows = 0
+                    item.done.set()
+                    continue
+                if item is not None:
+                    pending.append(item)
+                if len(pending) >= self.batch_size:
+                    self._write(pending)
+                if time.monotonic() - last_sync >= self.flush_interval:
+                    self._write(pending)
+                    self._sink.sync(self.fsync)
+                    last_sync = time.monotonic()
+            self._write(pending)
+            self._sink.sync(self.fsync)
+        except BaseException as e:
+            self._error = e
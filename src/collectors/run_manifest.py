@@ -0,0 +1,78 @@
+"""
+Run manifest: `<results>.manifest.json`, written when a run starts and
+rewritten (atomically) as each treatment completes. It holds the shuffle seed
+and resulting treatment order, the design settings of the run, and the row
+count of every completed treatment, so an interrupted run can be resumed in
+the same order and into the same result store. The writer's markers remain
+the record of which rows are durable; on resume the manifest is brought in
+line with them.
+"""
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+# Settings that define the treatments; a resumed run restores the manifest's.
+DESIGN_KEYS = ("repetitions", "adaptive", "concurrent_clients", "query_types", "cache_states",
+               "connection_modes", "graphql_query_modes", "engine", "load_model")
+
+
+def manifest_path(results_path: str) -> str:
+    return results_path.rstrip("/\\") + ".manifest.json"
+
+
+def load_manifest(results_path: str) -> Optional[Dict[str, Any]]:
+    path = manifest_path(results_path)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(results_path: str, manifest: Dict[str, Any]):
+    path = manifest_path(results_path)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def new_manifest(results_path: str, seed: int, treatments: List[Dict[str, Any]], experiment: Dict[str, Any], fmt: str) -> Dict[str, Any]:
+    return {
+        "results": results_path,
+        "format": fmt,
+        "seed": seed,
+        "created": time.time(),
+        "design": {k: experiment[k] for k in DESIGN_KEYS},
+        "treatments": treatments,
+        "completed": {},
+        "rows": 0,
+        "finished": None,
+    }
+
+
+def reconcile(manifest: Dict[str, Any], markers: List[Dict[str, Any]]):
+    """Completed treatments and row counts as the markers record them."""
+    manifest["completed"] = {m["treatment"]: m.get("rows", 0) for m in markers}
+    manifest["rows"] = sum(manifest["completed"].values())
+
+
+def record_done(manifest: Dict[str, Any], treatment: str, rows: int):
+    manifest["completed"][treatment] = rows
+    manifest["rows"] = sum(manifest["completed"].values())
+
+
+def latest_unfinished(results_dir: str) -> Optional[str]:
+    """Results path of the most recent run whose manifest is not finished."""
+    if not os.path.isdir(results_dir):
+        return None
+    runs = []
+    for name in os.listdir(results_dir):
+        if name.endswith(".manifest.json"):
+            results = os.path.join(results_dir, name[:-len(".manifest.json")])
+            manifest = load_manifest(results)
+            if manifest and not manifest.get("finished"):
+                runs.append((manifest["created"], results))
+    return max(runs)[1] if runs else None
@@ -0,0 +1,174 @@
+"""
+Adaptive stabilization between treatments.
+Instead of a fixed pause, the API a treatment just loaded is probed with its
+simple query until the median of the last `window` probes is back within
+`tolerance` of that API's baseline, measured before the first treatment
+(bounded by min_s and max_s). The cooldown runs in the background: the next
+treatment warms up meanwhile when it targets the other API, and only starts
+measuring once the cooldown is over.
+"""
+import math
+import threading
+import time
+from collections import deque
+from statistics import median
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from ..configs.clients import ClientRegistry
+from ..configs.config import config
+from ..configs.rate_limit import shared_limiter
+from ..configs.request_generators import (
+    generate_graphql_request,
+    generate_rest_request,
+    observe_limits,
+    rate_limit_resource,
+    request_cost,
+)
+
+PROBE_QUERY = "simple"
+
+
+class Cooldown:
+    """A cooldown in progress; wait() returns once the API has settled (or max_s passed)."""
+
+    def __init__(self, api: str):
+        self.api = api
+        self.elapsed = 0.0
+        self.reason = ""
+        self._done = threading.Event()
+
+    def wait(self):
+        self._done.wait()
+
+
+class Stabilizer:
+    def __init__(self, settings: Dict[str, Any], probe: Optional[Callable[[str], Optional[float]]] = None):
+        self.settings = settings
+        self._probe = probe or self._probe_api
+        self._registry: Optional[ClientRegistry] = None
+        self.baselines: Dict[str, float] = {}
+
+    def _probe_api(self, api: str) -> Optional[float]:
+        """Latency (ms) of one simple request to `api`, None if it failed."""
+        if self._registry is None:
+            self._registry = ClientRegistry(pool_maxsize=1, limiter=shared_limiter(
+                config["rate_limit"], config["github"]["target"]))
+        limiter = self._registry.limiter
+        if limiter:
+            limiter.acquire(rate_limit_resource(api), request_cost(limiter, api, PROBE_QUERY))
+        if api == "REST":
+            result = generate_rest_request(PROBE_QUERY, self._registry)
+        else:
+            result = generate_graphql_request(PROBE_QUERY, self._registry)
+        if limiter:
+            observe_limits(limiter, api, PROBE_QUERY, result)
+        return result["responseTime"] if result["success"] else None
+
+    def measure_baselines(self, apis: Iterable[str]):
+        if self.settings["mode"] != "adaptive":
+            return
+        for api in apis:
+            latencies = []
+            for _ in range(self.settings["baseline_probes"]):
+                latencies.append(self._probe(api))
+                time.sleep(self.settings["probe_interval_s"])
+            ok = [x for x in latencies if x is not None]
+            # No baseline: every cooldown of this API runs to max_s.
+            self.baselines[api] = median(ok) if ok else math.nan
+
+    def cool_down(self, api: str) -> Cooldown:
+        cooldown = Cooldown(api)
+        threading.Thread(target=self._run, args=(cooldown,),
+                         name="cooldown", daemon=True).start()
+        return cooldown
+
+    def _run(self, cooldown: Cooldown):
+        start = time.monotonic()
+        try:
+            if self.settings["mode"] == "adaptive":
+                cooldown.reason = self._settle(cooldown.api, start)
+            else:
+                time.sleep(self.settings["fixed_s"])
+                cooldown.reason = "fixed"
+        except Exception as e:
+            cooldown.reason = f"probe failed: {e}"
+        finally:
+            cooldown.elapsed = time.monotonic() - start
+            cooldown._done.set()
+
+    def _settle(self, api: str, start: float) -> str:
+        s = self.settings
+        recent: deque = deque(maxlen=s["window"])
+        limit = self.baselines.get(api, math.nan) * (1 + s["tolerance"])
+        while True:
+            recent.append(self._probe(api))
+            elapsed = time.monotonic() - start
+            if (elapsed >= s["min_s"] and len(recent) == recent.maxlen
+                    and None not in recent and median(recent) <= limit):
+                return "settled"
+            if elapsed >= s["max_s"]:
+                return "max_s"
+            time.sleep(s["probe_interval_s"])
+
+    def close(self):
+        if self._registry is not None:
+            self._registry.close()
+
+
+class TreatmentPipeline:
+    """
+    Sequences treatments through a Stabilizer. The cooldown after a treatment
+    overlaps the next one's warmup when that one targets the other API (with
+    overlap_warmup); otherwise the next treatment starts once it is over.
+    Keeps the time spent between treatments, and what fixed pauses followed
+    by serial warmups would have taken.
+    """
+
+    def __init__(self, stabilizer: Stabilizer):
+        self.stabilizer = stabilizer
+        self.settings = stabilizer.settings
+        self.idle = 0.0
+        self.serial = 0.0
+        self._cooldown: Optional[Cooldown] = None
+        self._cooldown_from = 0.0
+        self._timing: Dict[str, float] = {}
+        self._overlapped = False
+
+    def start(self, api: str) -> Callable[[], None]:
+        """Begin a treatment on `api`; returns its on_ready callback."""
+        cooldown, gate = self._cooldown, None
+        if cooldown is not None:
+            if self.settings["overlap_warmup"] and cooldown.api != api:
+                gate = cooldown.wait
+            else:
+                cooldown.wait()
+        self._overlapped = gate is not None
+        timing = self._timing = {"started": time.monotonic()}
+
+        def on_ready():
+            timing["warmed"] = time.monotonic()
+            if gate:
+                gate()
+            timing["ready"] = time.monotonic()
+        return on_ready
+
+    def finish(self, api: str, more: bool) -> Optional[str]:
+        """
+        End the current treatment and, if `more` follow, start its cooldown.
+        Returns a summary of the gap before the treatment, if there was one.
+        """
+        summary = None
+        cooldown, timing = self._cooldown, self._timing
+        if cooldown is not None and "ready" in timing:
+            warmup = timing["warmed"] - timing["started"]
+            gap = timing["ready"] - self._cooldown_from
+            self.idle += gap
+            self.serial += self.settings["fixed_s"] + warmup
+            summary = (f"stabilization {cooldown.elapsed:.1f} s ({cooldown.reason}), warmup {warmup:.1f} s"
+                       f"{' overlapped' if self._overlapped else ''}, {gap:.1f} s between treatments")
+        self._cooldown = self.stabilizer.cool_down(api) if more else None
+        self._cooldown_from = time.monotonic()
+        return summary
+
+    def saved(self) -> float:
+        return self.serial - self.idle
@@ -0,0 +1,354 @@
+"""
+Asyncio counterparts of the REST/GraphQL clients (aiohttp).
+Results use the same dict shape as the sync clients so build_record applies unchanged.
+"""
+import time
+import asyncio
+from typing import List, Dict, Any, Optional
+
+import aiohttp
+from .config import config, github_endpoints
+from .clients import (
+    GRAPHQL_ERRORS_MARKER,
+    FANOUT_STRATEGIES,
+    PERSISTED_QUERY_NOT_FOUND,
+    fanout_width,
+    header_bytes,
+    prepare_query,
+    graphql_body,
+    validate_query_mode,
+    _decode_json,
+    _sum_sizes,
+)
+from .http_timing import decode_body, sum_phases
+from .http_cache import ResponseCache, cached_response, combine, graphql_key, rest_key, through_cache
+from .rate_limit import RateLimiter, graphql_cost, lowest_budget, rate_limit_info
+
+
+def _rest_headers(keep_alive: bool) -> Dict[str, str]:
+    headers = {
+        "Authorization": f"token {config['github']['token']}",
+        "Accept": "application/vnd.github.v3+json",
+        "Accept-Encoding": "gzip, deflate",
+        "User-Agent": "GraphQL-vs-REST-Experiment",
+    }
+    if not keep_alive:
+        headers["Connection"] = "close"
+    return headers
+
+
+def _graphql_headers(keep_alive: bool) -> Dict[str, str]:
+    headers = {
+        "Authorization": f"Bearer {config['github']['token']}",
+        "Accept-Encoding": "gzip, deflate",
+        "Content-Type": "application/json",
+        "User-Agent": "GraphQL-vs-REST-Experiment",
+    }
+    if not keep_alive:
+        headers["Connection"] = "close"
+    return headers
+
+
+def _phase_trace_config() -> aiohttp.TraceConfig:
+    # aiohttp reports DNS inside connection creation and does not expose the
+    # TLS handshake separately, so "connect" here includes TLS.
+    trace = aiohttp.TraceConfig()
+
+    async def dns_start(session, ctx, params):
+        ctx.dns_start = time.perf_counter()
+
+    async def dns_end(session, ctx, params):
+        ctx.trace_request_ctx["dns"] += (time.perf_counter() -
+                                         ctx.dns_start) * 1000
+
+    async def conn_start(session, ctx, params):
+        ctx.conn_start = time.perf_counter()
+
+    async def conn_end(session, ctx, params):
+        phases = ctx.trace_request_ctx
+        phases["connect"] += (time.perf_counter() -
+                              ctx.conn_start) * 1000 - phases["dns"]
+
+    trace.on_dns_resolvehost_start.append(dns_start)
+    trace.on_dns_resolvehost_end.append(dns_end)
+    trace.on_connection_create_start.append(conn_start)
+    trace.on_connection_create_end.append(conn_end)
+    return trace
+
+
+def _new_session(headers: Dict[str, str], pool_maxsize: Optional[int], keep_alive: bool, per_client: int = 1) -> aiohttp.ClientSession:
+    # per_client: connections one virtual client may hold at once (0 = no cap).
+    limit = (pool_maxsize or config["http"]["pool_maxsize"] or 0) * per_client
+    connector = aiohttp.TCPConnector(
+        limit=limit,
+        force_close=not keep_alive,
+    )
+    # Bodies are decompressed by hand so the transfer size stays observable.
+    return aiohttp.ClientSession(
+        headers=headers,
+        connector=connector,
+        auto_decompress=False,
+        trace_configs=[_phase_trace_config()],
+        timeout=aiohttp.ClientTimeout(total=config["experiment"]["timeout"]),
+    )
+
+
+async def _send(session: aiohttp.ClientSession, method: str, url: str, **kwargs) -> tuple:
+    """Send a request and read its body; returns (response, body, sizes, phases)."""
+    phases = {"dns": 0.0, "connect": 0.0}
+    start = time.perf_counter()
+    async with session.request(method, url, trace_request_ctx=phases, **kwargs) as resp:
+        headers_at = time.perf_counter()
+        raw = await resp.read()
+        done = time.perf_counter()
+    phases["ttfb"] = (headers_at - start) * 1000 - \
+        phases["dns"] - phases["connect"]
+    phases["download"] = (done - headers_at) * 1000
+    body = decode_body(raw, resp.headers.get("Content-Encoding", ""))
+    version = resp.version or aiohttp.HttpVersion11
+    status_line = f"HTTP/{version.major}.{version.minor} {resp.status} {resp.reason}"
+    sizes = {
+        "payloadSize": len(body),
+        "wireBytes": len(raw),
+        "headerBytes": header_bytes(status_line, resp.raw_headers),
+    }
+    return resp, body, sizes, phases
+
+
+def _error_result(start: float, e: Exception) -> Dict[str, Any]:
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    status = getattr(e, "status", 0) or 0
+    result = {
+        "responseTime": elapsed_ms,
+        "payloadSize": 0,
+        "wireBytes": 0,
+        "headerBytes": 0,
+        "statusCode": status,
+        "success": False,
+        "error": str(e),
+    }
+    if getattr(e, "headers", None) is not None:
+        # ClientResponseError from raise_for_status; the body is already gone.
+        result["rateLimit"] = rate_limit_info(status, e.headers)
+    return result
+
+
+class AsyncRestClient:
+    def __init__(self, pool_maxsize: Optional[int] = None, keep_alive: Optional[bool] = None, cache: Optional[ResponseCache] = None, keep_data: bool = True):
+        if keep_alive is None:
+            keep_alive = config["http"]["keep_alive"]
+        self.fanout_strategy = config["http"]["fanout_strategy"]
+        if self.fanout_strategy not in FANOUT_STRATEGIES:
+            raise ValueError(
+                f"Unknown fan-out strategy: {self.fanout_strategy}")
+        per_client = {"sequential": 1, "parallel": 0}.get(
+            self.fanout_strategy, config["http"]["fanout_concurrency"])
+        self.session = _new_session(
+            _rest_headers(keep_alive), pool_maxsize, keep_alive, per_client)
+        self.base_url = github_endpoints()[0]
+        self.parse_json = config["http"]["parse_json"]
+        self.keep_data = keep_data
+        self.cache = cache
+
+    async def close(self):
+        await self.session.close()
+
+    async def _fetch(self, url: str) -> tuple:
+        """GET through the cache: (response, or None on a cache hit, body, sizes, cache fields, phases)."""
+        key = rest_key(url)
+        entry, fresh = self.cache.lookup(key) if self.cache else (None, False)
+        if fresh:
+            return (None, *cached_response(entry), {})
+        resp, body, sizes, phases = await _send(
+            self.session, "GET", self.base_url + url, headers=entry.validators() if entry else None)
+        body, sizes, cache = through_cache(
+            self.cache, key, entry, resp.status, body, sizes, resp.headers)
+        return resp, body, sizes, cache, phases
+
+    async def make_request(self, url: str) -> Dict[str, Any]:
+        start = time.perf_counter()
+        try:
+            resp, body, sizes, cache, phases = await self._fetch(url)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            result = {
+                "responseTime": elapsed_ms,
+                **sizes,
+                "statusCode": resp.status if resp is not None else 200,
+                "success": True,
+                "phases": phases,
+                **cache,
+            }
+            if resp is not None:
+                result["rateLimit"] = rate_limit_info(resp.status, resp.headers)
+            if self.parse_json:
+                data = _decode_json(body, phases)
+                if self.keep_data:
+                    result["data"] = data
+            return result
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError, OSError) as e:
+            return _error_result(start, e)
+
+    async def _get(self, url: str, slots: asyncio.Semaphore) -> tuple:
+        async with slots:
+            start = time.perf_counter()
+            resp, body, sizes, cache, phases = await self._fetch(url)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+        if resp is None:
+            return body, sizes, cache, phases, elapsed_ms, {}
+        resp.raise_for_status()
+        return body, sizes, cache, phases, elapsed_ms, rate_limit_info(resp.status, resp.headers)
+
+    async def make_aggregated_request(self, urls: List[str]) -> Dict[str, Any]:
+        start = time.perf_counter()
+        try:
+            slots = asyncio.Semaphore(
+                fanout_width(self.fanout_strategy, len(urls)))
+            parts = await asyncio.gather(*(self._get(u, slots) for u in urls))
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            phases = sum_phases(p for _, _, _, p, _, _ in parts)
+            result = {
+                "responseTime": elapsed_ms,
+                **_sum_sizes([sizes for _, sizes, _, _, _, _ in parts]),
+                "statusCode": 200,
+                "success": True,
+                "fanout": self.fanout_strategy,
+                "subrequestTimes": [t for _, _, _, _, t, _ in parts],
+                "phases": phases,
+                **combine([cache for _, _, cache, _, _, _ in parts]),
+                "rateLimit": lowest_budget([limits for *_, limits in parts]),
+            }
+            if self.parse_json:
+                data = [_decode_json(body, phases) for body, *_ in parts]
+                if self.keep_data:
+                    result["data"] = data
+            return result
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError, OSError) as e:
+            return {**_error_result(start, e), "fanout": self.fanout_strategy}
+
+
+class AsyncGraphQLClientWrapper:
+    def __init__(self, pool_maxsize: Optional[int] = None, keep_alive: Optional[bool] = None, query_mode: str = "full", cache: Optional[ResponseCache] = None, keep_data: bool = True):
+        if keep_alive is None:
+            keep_alive = config["http"]["keep_alive"]
+        validate_query_mode(query_mode)
+        self.query_mode = query_mode
+        self.cache = cache
+        self.session = _new_session(
+            _graphql_headers(keep_alive), pool_maxsize, keep_alive)
+        self.url = github_endpoints()[1]
+        self.parse_json = config["http"]["parse_json"]
+        self.keep_data = keep_data
+
+    async def close(self):
+        await self.session.close()
+
+    async def make_request(self, query: str) -> Dict[str, Any]:
+        parse_start = time.perf_counter()
+        try:
+            prepared = prepare_query(query)
+        except Exception as e:
+            return {**_error_result(parse_start, e), "queryMode": self.query_mode}
+        parse_ms = (time.perf_counter() - parse_start) * 1000
+        request_body = graphql_body(prepared, self.query_mode)
+        key = graphql_key(prepared.sha256)
+        start = time.perf_counter()
+        try:
+            entry, fresh = self.cache.lookup(key) if self.cache else (None, False)
+            if fresh:
+                body, total_sizes, cache = cached_response(entry)
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                status, request_bytes, phases = 200, 0, {}
+                limits, cost = {}, None
+            else:
+                validators = entry.validators() if entry else None
+                resp, body, sizes, phases = await _send(
+                    self.session, "POST", self.url, data=request_body, headers=validators)
+                all_sizes = [sizes]
+                request_bytes = len(request_body)
+                if self.query_mode == "persisted" and PERSISTED_QUERY_NOT_FOUND in body:
+                    resp, body, sizes, retry_phases = await _send(
+                        self.session, "POST", self.url, data=prepared.register_body, headers=validators)
+                    phases = sum_phases([phases, retry_phases])
+                    all_sizes.append(sizes)
+                    request_bytes += len(prepared.register_body)
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                resp.raise_for_status()
+                status = resp.status
+                limits = rate_limit_info(status, resp.headers)
+                cost = graphql_cost(body) if status == 200 else None
+                body, total_sizes, cache = through_cache(
+                    self.cache, key, entry, status, body, _sum_sizes(all_sizes), resp.headers,
+                    cacheable=GRAPHQL_ERRORS_MARKER not in body,
+                    unvalidated_max_age_s=config["http_cache"]["graphql_max_age_s"])
+            phases["parse"] = parse_ms
+            result = {
+                "responseTime": elapsed_ms,
+                **total_sizes,
+                "requestBytes": request_bytes,
+                "statusCode": status,
+                "success": True,
+                "queryMode": self.query_mode,
+                "phases": phases,
+                **cache,
+                "rateLimit": limits,
+            }
+            if cost is not None:
+                result["graphqlCost"] = cost
+            if self.parse_json:
+                data = _decode_json(body, phases)
+                has_errors = "errors" in data
+                if self.keep_data:
+                    result["data"] = data.get("data")
+            else:
+                has_errors = GRAPHQL_ERRORS_MARKER in body
+            if has_errors:
+                result.update(statusCode=0, success=False,
+                              error="GraphQL errors in response")
+            return result
+        except Exception as e:
+            return {**_error_result(start, e), "queryMode": self.query_mode}
+
+
+class AsyncClientRegistry:
+    """
+    Async analogue of ClientRegistry. A single event loop drives every virtual
+    client, so "reuse" shares one pooled client per API across all of them.
+    As there, clients are built with keep_data=False: the decode is timed but
+    its result is not kept.
+    """
+
+    def __init__(self, connection_mode: str = "reuse", pool_maxsize: Optional[int] = None, query_mode: str = "full", cache: Optional[ResponseCache] = None, limiter: Optional[RateLimiter] = None):
+        if connection_mode not in ("reuse", "fresh"):
+            raise ValueError(f"Unknown connection mode: {connection_mode}")
+        self.connection_mode = connection_mode
+        self.pool_maxsize = pool_maxsize
+        self.query_mode = query_mode
+        self.cache = cache
+        self.limiter = limiter
+        self._rest: Optional[AsyncRestClient] = None
+        self._graphql: Optional[AsyncGraphQLClientWrapper] = None
+
+    async def rest(self) -> AsyncRestClient:
+        if self.connection_mode == "fresh":
+            return AsyncRestClient(pool_maxsize=1, keep_alive=False, cache=self.cache, keep_data=False)
+        if self._rest is None:
+            self._rest = AsyncRestClient(pool_maxsize=self.pool_maxsize, cache=self.cache, keep_data=False)
+        return self._rest
+
+    async def graphql(self) -> AsyncGraphQLClientWrapper:
+        if self.connection_mode == "fresh":
+            return AsyncGraphQLClientWrapper(pool_maxsize=1, keep_alive=False, query_mode=self.query_mode, cache=self.cache, keep_data=False)
+        if self._graphql is None:
+            self._graphql = AsyncGraphQLClientWrapper(
+                pool_maxsize=self.pool_maxsize, query_mode=self.query_mode, cache=self.cache, keep_data=False)
+        return self._graphql
+
+    async def release(self, client):
+        if self.connection_mode == "fresh":
+            await client.close()
+
+    async def close(self):
+        for client in (self._rest, self._graphql):
+            if client is not None:
+                await client.close()
+        self._rest = self._graphql = None
@@ -1,117 +1,432 @@
 import json
 import time
-from typing import List, Dict, Any
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import List, Dict, Any, NamedTuple, Optional, Iterable, Tuple
 
 import requests
 from requests import Response
-from gql import Client, gql
-from gql.transport.requests import RequestsHTTPTransport
+from graphql import parse, print_ast
 
-from .config import config
+from .config import config, github_endpoints
+from .http_timing import TimedHTTPAdapter, timed_request, sum_phases
+from .http_cache import ResponseCache, cached_response, combine, graphql_key, rest_key, through_cache
+from .rate_limit import RateLimiter, graphql_cost, lowest_budget, rate_limit_info, with_cost_field
+
+# Matches a top-level "errors" key in GitHub's compact JSON without decoding
+# the body; string values escape their quotes, so they cannot match.
+GRAPHQL_ERRORS_MARKER = b'"errors":'
+# Apollo automatic persisted queries: the server does not know the hash yet.
+PERSISTED_QUERY_NOT_FOUND = b"PersistedQueryNotFound"
+
+GRAPHQL_QUERY_MODES = ("full", "persisted")
+FANOUT_STRATEGIES = ("sequential", "parallel", "bounded")
+
+
+@dataclass(frozen=True)
+class PreparedQuery:
+    """A GraphQL document parsed once, with its request bodies pre-encoded."""
+    text: str
+    sha256: str
+    full_body: bytes
+    hash_body: bytes
+    register_body: bytes
+
+
+# Keyed by (query, query_cost): the cost field changes the printed document.
+_prepared: Dict[Tuple[str, bool], PreparedQuery] = {}
+_prepared_lock = threading.Lock()
+
+
+def prepare_query(query: str) -> PreparedQuery:
+    query_cost = config["rate_limit"]["query_cost"]
+    prepared = _prepared.get((query, query_cost))
+    if prepared is not None:
+        return prepared
+    # graphql-core's parser directly; importing gql would pull in its whole client stack.
+    document = parse(query)
+    if query_cost:
+        document = with_cost_field(document)
+    text = print_ast(document)
+    sha256 = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    extensions = {"persistedQuery": {"version": 1, "sha256Hash": sha256}}
+    prepared = PreparedQuery(
+        text=text,
+        sha256=sha256,
+        full_body=json.dumps({"query": text}).encode("utf-8"),
+        hash_body=json.dumps({"extensions": extensions}).encode("utf-8"),
+        register_body=json.dumps(
+            {"query": text, "extensions": extensions}).encode("utf-8"),
+    )
+    with _prepared_lock:
+        return _prepared.setdefault((query, query_cost), prepared)
+
+
+def preload_queries(queries: Iterable[str]):
+    for query in queries:
+        prepare_query(query)
+
+
+def validate_query_mode(query_mode: str):
+    if query_mode not in GRAPHQL_QUERY_MODES:
+        raise ValueError(f"Unknown GraphQL query mode: {query_mode}")
+    if query_mode == "persisted" and config["github"]["target"] == "github":
+        # GitHub rejects a bare hash with an error of its own, not
+        # PersistedQueryNotFound, so every request would be a GraphQL error.
+        raise ValueError("GraphQL query mode 'persisted' is not supported by the GitHub API")
+
+
+def _mount_pool(session: requests.Session, pool_maxsize: Optional[int]) -> int:
+    maxsize = pool_maxsize or config["http"]["pool_maxsize"] or 1
+    adapter = TimedHTTPAdapter(
+        pool_connections=config["http"]["pool_connections"],
+        pool_maxsize=maxsize,
+    )
+    replaced = {session.adapters[p] for p in ("http://", "https://") if p in session.adapters}
+    for prefix in ("http://", "https://"):
+        session.mount(prefix, adapter)
+    # Re-mounting (a wider fan-out) replaces the pool: close the old one's connections.
+    for old in replaced:
+        old.close()
+    return maxsize
+
+
+def fanout_width(strategy: str, n_urls: int) -> int:
+    """How many sub-requests of an aggregated REST call may be in flight at once."""
+    if strategy == "sequential":
+        return 1
+    if strategy == "parallel":
+        return n_urls
+    if strategy == "bounded":
+        return max(1, min(n_urls, config["http"]["fanout_concurrency"]))
+    raise ValueError(f"Unknown fan-out strategy: {strategy}")
+
+
+def header_bytes(status_line: str, headers) -> int:
+    """Size of the response head as sent: status line, "k: v" lines, blank line."""
+    size = len(status_line) + 2
+    for k, v in headers:
+        size += len(k) + len(v) + 4
+    return size + 2
+
+
+def _wire_sizes(resp: Response, wire: int) -> Dict[str, int]:
+    """`wire` is the body as transferred (compressed), as counted by timed_request."""
+    status_line = f"HTTP/1.1 {resp.status_code} {resp.reason}"
+    return {
+        "payloadSize": len(resp.content),
+        "wireBytes": wire,
+        "headerBytes": header_bytes(status_line, resp.raw.headers.items()),
+    }
+
+
+def _decode_json(body: bytes, phases: Dict[str, float]) -> Any:
+    t0 = time.perf_counter()
+    data = json.loads(body)
+    phases["decode"] = phases.get("decode", 0.0) + \
+        (time.perf_counter() - t0) * 1000
+    return data
+
+
+def _sum_sizes(sizes: List[Dict[str, int]]) -> Dict[str, int]:
+    return {k: sum(s[k] for s in sizes) for k in ("payloadSize", "wireBytes", "headerBytes")}
+
+
+def graphql_body(prepared: PreparedQuery, query_mode: str) -> bytes:
+    return prepared.hash_body if query_mode == "persisted" else prepared.full_body
+
+
+def _error_result(start: float, e: Exception) -> Dict[str, Any]:
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    resp = getattr(e, 'response', None)
+    status = getattr(resp, 'status_code', 0) or 0
+    result = {
+        "responseTime": elapsed_ms,
+        "payloadSize": 0,
+        "wireBytes": 0,
+        "headerBytes": 0,
+        "statusCode": status,
+        "success": False,
+        "error": str(e),
+    }
+    if resp is not None:
+        result["rateLimit"] = rate_limit_info(status, resp.headers, resp.content)
+    return result
+
+
+class _Fetched(NamedTuple):
+    resp: Optional[Response]  # None when served from the cache
+    body: bytes
+    sizes: Dict[str, int]
+    cache: Dict[str, Any]
+    phases: Dict[str, float]
+    elapsed_ms: float
 
 
 class RestClient:
-    def __init__(self):
+    def __init__(self, pool_maxsize: Optional[int] = None, keep_alive: Optional[bool] = None, cache: Optional[ResponseCache] = None, keep_data: bool = True):
+        if keep_alive is None:
+            keep_alive = config["http"]["keep_alive"]
         self.session = requests.Session()
         self.session.headers.update({
             "Authorization": f"token {config['github']['token']}",
             "Accept": "application/vnd.github.v3+json",
+            # Only encodings decode_body can undo (requests adds br when brotli is installed).
+            "Accept-Encoding": "gzip, deflate",
             "User-Agent": "GraphQL-vs-REST-Experiment",
         })
-        self.base_url = config["github"]["rest_base_url"]
+        if not keep_alive:
+            self.session.headers["Connection"] = "close"
+        self._pool_maxsize = _mount_pool(self.session, pool_maxsize)
+        self.base_url = github_endpoints()[0]
         self.timeout = config["experiment"]["timeout"]
+        self.parse_json = config["http"]["parse_json"]
+        self.keep_data = keep_data
+        self.fanout_strategy = config["http"]["fanout_strategy"]
+        if self.fanout_strategy not in FANOUT_STRATEGIES:
+            raise ValueError(
+                f"Unknown fan-out strategy: {self.fanout_strategy}")
+        self._fanout: Optional[ThreadPoolExecutor] = None
+        self.cache = cache
+
+    def close(self):
+        if self._fanout is not None:
+            self._fanout.shutdown(wait=False)
+        self.session.close()
+
+    def _fetch(self, url: str) -> _Fetched:
+        start = time.perf_counter()
+        key = rest_key(url)
+        entry, fresh = self.cache.lookup(key) if self.cache else (None, False)
+        if fresh:
+            return _Fetched(None, *cached_response(entry), {}, (time.perf_counter() - start) * 1000)
+        resp, phases, wire = timed_request(
+            self.session, "GET", self.base_url + url, timeout=self.timeout,
+            headers=entry.validators() if entry else None)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        body, sizes, cache = through_cache(
+            self.cache, key, entry, resp.status_code, resp.content, _wire_sizes(resp, wire), resp.headers)
+        return _Fetched(resp, body, sizes, cache, phases, elapsed_ms)
+
+    def _fan_out(self, urls: List[str]) -> list:
+        width = fanout_width(self.fanout_strategy, len(urls))
+        if width == 1:
+            return [self._fetch(u) for u in urls]
+        if self._fanout is None:
+            # Keep one pooled connection per concurrent sub-request, otherwise
+            # urllib3 opens and discards the extra ones on every call.
+            if width > self._pool_maxsize:
+                self._pool_maxsize = _mount_pool(self.session, width)
+            self._fanout = ThreadPoolExecutor(max_workers=width)
+        return list(self._fanout.map(self._fetch, urls))
 
     def make_request(self, url: str) -> Dict[str, Any]:
         start = time.perf_counter()
         try:
-            resp: Response = self.session.get(
-                self.base_url + url, timeout=self.timeout)
+            fetched = self._fetch(url)
             elapsed_ms = (time.perf_counter() - start) * 1000
-            data = resp.json()
-            payload_size = len(json.dumps(data))
-            return {
+            result = {
                 "responseTime": elapsed_ms,
-                "payloadSize": payload_size,
-                "statusCode": resp.status_code,
+                **fetched.sizes,
+                "statusCode": fetched.resp.status_code if fetched.resp is not None else 200,
                 "success": True,
-                "data": data,
-            }
-        except requests.RequestException as e:
-            elapsed_ms = (time.perf_counter() - start) * 1000
-            status = getattr(getattr(e, 'response', None),
-                             'status_code', 0) or 0
-            return {
-                "responseTime": elapsed_ms,
-                "payloadSize": 0,
-                "statusCode": status,
-                "success": False,
-                "error": str(e),
+                "phases": fetched.phases,
+                **fetched.cache,
             }
+            if fetched.resp is not None:
+                result["rateLimit"] = rate_limit_info(
+                    fetched.resp.status_code, fetched.resp.headers)
+            if self.parse_json:
+                data = _decode_json(fetched.body, fetched.phases)
+                if self.keep_data:
+                    result["data"] = data
+            return result
+        except (requests.RequestException, ValueError) as e:
+            # ValueError: a body that is not JSON (e.g. an HTML error page).
+            return _error_result(start, e)
 
     def make_aggregated_request(self, urls: List[str]) -> Dict[str, Any]:
         start = time.perf_counter()
         try:
-            responses = [self.session.get(
-                self.base_url + u, timeout=self.timeout) for u in urls]
-            for r in responses:
-                r.raise_for_status()
-            combined = [r.json() for r in responses]
+            sent = self._fan_out(urls)
+            for f in sent:
+                if f.resp is not None:
+                    f.resp.raise_for_status()
             elapsed_ms = (time.perf_counter() - start) * 1000
-            payload_size = len(json.dumps(combined))
-            return {
+            # Phases are summed over sub-requests, so with a concurrent
+            # fan-out they add up to more than the wall-clock responseTime.
+            phases = sum_phases(f.phases for f in sent)
+            result = {
                 "responseTime": elapsed_ms,
-                "payloadSize": payload_size,
+                **_sum_sizes([f.sizes for f in sent]),
                 "statusCode": 200,
                 "success": True,
-                "data": combined,
-            }
-        except requests.RequestException as e:
-            elapsed_ms = (time.perf_counter() - start) * 1000
-            status = getattr(getattr(e, 'response', None),
-                             'status_code', 0) or 0
-            return {
-                "responseTime": elapsed_ms,
-                "payloadSize": 0,
-                "statusCode": status,
-                "success": False,
-                "error": str(e),
+                "fanout": self.fanout_strategy,
+                "subrequestTimes": [f.elapsed_ms for f in sent],
+                "phases": phases,
+                **combine([f.cache for f in sent]),
+                "rateLimit": lowest_budget([rate_limit_info(f.resp.status_code, f.resp.headers)
+                                            for f in sent if f.resp is not None]),
             }
+            if self.parse_json:
+                data = [_decode_json(f.body, phases) for f in sent]
+                if self.keep_data:
+                    result["data"] = data
+            return result
+        except (requests.RequestException, ValueError) as e:
+            return {**_error_result(start, e), "fanout": self.fanout_strategy}
 
 
 class GraphQLClientWrapper:
-    def __init__(self):
-        transport = RequestsHTTPTransport(
-            url=config["github"]["graphql_url"],
-            headers={
-                "Authorization": f"Bearer {config['github']['token']}",
-                "User-Agent": "GraphQL-vs-REST-Experiment",
-            },
-            timeout=config["experiment"]["timeout"],
-            verify=True,
-        )
-        self.client = Client(transport=transport,
-                             fetch_schema_from_transport=False)
+    # The document is parsed client-side (prepare_query); the POST itself goes
+    # through a pooled requests.Session so the raw response is measurable.
+    def __init__(self, pool_maxsize: Optional[int] = None, keep_alive: Optional[bool] = None, query_mode: str = "full", cache: Optional[ResponseCache] = None, keep_data: bool = True):
+        if keep_alive is None:
+            keep_alive = config["http"]["keep_alive"]
+        validate_query_mode(query_mode)
+        self.query_mode = query_mode
+        self.cache = cache
+        self.session = requests.Session()
+        self.session.headers.update({
+            "Authorization": f"Bearer {config['github']['token']}",
+            "Accept-Encoding": "gzip, deflate",
+            "Content-Type": "application/json",
+            "User-Agent": "GraphQL-vs-REST-Experiment",
+        })
+        if not keep_alive:
+            self.session.headers["Connection"] = "close"
+        _mount_pool(self.session, pool_maxsize)
+        self.url = github_endpoints()[1]
+        self.timeout = config["experiment"]["timeout"]
+        self.parse_json = config["http"]["parse_json"]
+        self.keep_data = keep_data
+
+    def close(self):
+        self.session.close()
 
     def make_request(self, query: str) -> Dict[str, Any]:
+        # Client-side document parsing is timed as its own phase and kept out
+        # of responseTime, which covers the HTTP exchange only (as for REST).
+        parse_start = time.perf_counter()
+        try:
+            prepared = prepare_query(query)
+        except Exception as e:
+            return {**_error_result(parse_start, e), "queryMode": self.query_mode}
+        parse_ms = (time.perf_counter() - parse_start) * 1000
+        body = graphql_body(prepared, self.query_mode)
+        key = graphql_key(prepared.sha256)
         start = time.perf_counter()
         try:
-            data = self.client.execute(gql(query))
-            elapsed_ms = (time.perf_counter() - start) * 1000
-            payload_size = len(json.dumps(data))
-            return {
+            entry, fresh = self.cache.lookup(key) if self.cache else (None, False)
+            if fresh:
+                payload, total_sizes, cache = cached_response(entry)
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                status, request_bytes, phases = 200, 0, {}
+                limits, cost = {}, None
+            else:
+                validators = entry.validators() if entry else None
+                resp, phases, wire = timed_request(
+                    self.session, "POST", self.url, data=body, timeout=self.timeout, headers=validators)
+                sizes = [_wire_sizes(resp, wire)]
+                request_bytes = len(body)
+                if self.query_mode == "persisted" and PERSISTED_QUERY_NOT_FOUND in resp.content:
+                    # Hash miss: send query and hash together so the server stores
+                    # it; the extra round trip is part of this measurement.
+                    resp, retry_phases, wire = timed_request(
+                        self.session, "POST", self.url, data=prepared.register_body, timeout=self.timeout,
+                        headers=validators)
+                    phases = sum_phases([phases, retry_phases])
+                    sizes.append(_wire_sizes(resp, wire))
+                    request_bytes += len(prepared.register_body)
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                resp.raise_for_status()
+                status = resp.status_code
+                limits = rate_limit_info(status, resp.headers)
+                # A 304 carries no body of its own to read the cost from.
+                cost = graphql_cost(resp.content) if status == 200 else None
+                payload, total_sizes, cache = through_cache(
+                    self.cache, key, entry, status, resp.content, _sum_sizes(sizes), resp.headers,
+                    cacheable=GRAPHQL_ERRORS_MARKER not in resp.content,
+                    unvalidated_max_age_s=config["http_cache"]["graphql_max_age_s"])
+            phases["parse"] = parse_ms
+            result = {
                 "responseTime": elapsed_ms,
-                "payloadSize": payload_size,
-                "statusCode": 200,
+                **total_sizes,
+                "requestBytes": request_bytes,
+                "statusCode": status,
                 "success": True,
-                "data": data,
+                "queryMode": self.query_mode,
+                "phases": phases,
+                **cache,
+                "rateLimit": limits,
             }
+            if cost is not None:
+                result["graphqlCost"] = cost
+            if self.parse_json:
+                data = _decode_json(payload, phases)
+                has_errors = "errors" in data
+                if self.keep_data:
+                    result["data"] = data.get("data")
+            else:
+                has_errors = GRAPHQL_ERRORS_MARKER in payload
+            if has_errors:
+                # Query-level errors keep status 0, as when gql raised them.
+                result.update(statusCode=0, success=False,
+                              error="GraphQL errors in response")
+            return result
         except Exception as e:
-            elapsed_ms = (time.perf_counter() - start) * 1000
-            status = 0
-            return {
-                "responseTime": elapsed_ms,
-                "payloadSize": 0,
-                "statusCode": status,
-                "success": False,
-                "error": str(e),
-            }
+            return {**_error_result(start, e), "queryMode": self.query_mode}
+
+
+class ClientRegistry:
+    """
+    Per-worker REST/GraphQL clients for one treatment.
+    In "reuse" mode each worker thread keeps a long-lived pooled client;
+    in "fresh" mode every measurement gets a new client (and connection).
+    """
+
+    def __init__(self, connection_mode: str = "reuse", pool_maxsize: Optional[int] = None, query_mode: str = "full", cache: Optional[ResponseCache] = None, limiter: Optional[RateLimiter] = None):
+        if connection_mode not in ("reuse", "fresh"):
+            raise ValueError(f"Unknown connection mode: {connection_mode}")
+        self.connection_mode = connection_mode
+        self.pool_maxsize = pool_maxsize
+        self.query_mode = query_mode
+        # Shared by all of this registry's clients, including fresh ones.
+        self.cache = cache
+        # Paces the measurements made through this registry (see rate_limit).
+        self.limiter = limiter
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._clients: List[Any] = []
+
+    def _get(self, name: str, factory, **kwargs):
+        # Measurements only need sizes and timings: with parse_json the body is
+        # still decoded (and timed) but not kept in the result as "data".
+        kwargs["keep_data"] = False
+        if self.connection_mode == "fresh":
+            return factory(pool_maxsize=1, keep_alive=False, **kwargs)
+        client = getattr(self._local, name, None)
+        if client is None:
+            client = factory(pool_maxsize=self.pool_maxsize, **kwargs)
+            setattr(self._local, name, client)
+            with self._lock:
+                self._clients.append(client)
+        return client
+
+    def rest(self) -> RestClient:
+        return self._get("rest", RestClient, cache=self.cache)
+
+    def graphql(self) -> GraphQLClientWrapper:
+        return self._get("graphql", GraphQLClientWrapper, query_mode=self.query_mode, cache=self.cache)
+
+    def release(self, client):
+        if self.connection_mode == "fresh":
+            client.close()
+
+    def close(self):
+        with self._lock:
+            clients, self._clients = self._clients, []
+        for client in clients:
+            client.close()
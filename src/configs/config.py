@@ -1,4 +1,5 @@
 import os
+from typing import Tuple
 
 GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
 
@@ -7,27 +8,246 @@ config = {
         "token": GITHUB_TOKEN,
         "rest_base_url": "https://api.github.com",
         "graphql_url": "https://api.github.com/graphql",
+        # "github": the real API. "mock": the local stand-in (src/servers).
+        "target": "github",
+    },
+    "mock_server": {
+        "host": "127.0.0.1",
+        "port": 8787,
+        # Start the stand-in in a subprocess for the duration of the run.
+        "autostart": True,
+        "latency_ms": 20.0,
+        "latency_jitter_ms": 10.0,
+        "error_rate": 0.0,
+        # Multiplies fixture list lengths and text field sizes.
+        "payload_scale": 1,
+        "gzip": True,
+        "seed": 42,
+        # Requests per window and resource ("core", "graphql") before a 403,
+        # with GitHub's X-RateLimit-* headers; 0 sends no rate-limit headers.
+        "rate_limit": 0,
+        "rate_limit_window_s": 3600.0,
+    },
+    "http": {
+        # Connection pool per client session. None ties the pool size to the
+        # treatment's concurrent_clients level.
+        "pool_connections": 10,
+        "pool_maxsize": None,
+        "keep_alive": True,
+        # Decode response JSON on the measurement path. Sizes are always taken
+        # from the raw response, so this only matters if the data is needed.
+        "parse_json": False,
+        # Aggregated REST sub-requests: "sequential", "parallel" (all at once)
+        # or "bounded" (at most fanout_concurrency in flight per client).
+        "fanout_strategy": "parallel",
+        "fanout_concurrency": 2,
+    },
+    "http_cache": {
+        # Client-side cache for the "warm" cache state: a bounded LRU of
+        # response bodies with their ETag/Last-Modified validators, shared by
+        # the clients of a treatment. Stored responses are revalidated
+        # (If-None-Match / If-Modified-Since; a 304 reuses the body); entries
+        # younger than max_age_s are served without a request. GraphQL
+        # responses are keyed by normalized document + variables. Disabled,
+        # "warm" only sends warmup_requests before measuring.
+        "enabled": True,
+        "max_entries": 256,
+        "max_age_s": 0.0,
+        # Max age of GraphQL responses without ETag/Last-Modified, which is
+        # all of them on GitHub's API: without it "warm" GraphQL would always
+        # miss while REST revalidates. Such hits show as cache_result "hit".
+        "graphql_max_age_s": 60.0,
+    },
+    "rate_limit": {
+        # Pace clients to stay inside the API's budgets, tracked per resource
+        # ("core" for REST, "graphql") from the X-RateLimit-* headers: the
+        # remaining budget, minus reserve_remaining, is spread over the time
+        # left until its reset. A 403/429 rate-limit rejection holds the
+        # resource until Retry-After (or the reset). The wait is recorded in
+        # throttle_ms and is not part of response_time_ms.
+        "enabled": True,
+        "reserve_remaining": 50,
+        # Requests (GraphQL: points) a resource may send back to back.
+        "burst": 20,
+        # Longest single sleep of a held client before it re-checks the budget.
+        "max_wait_step_s": 1.0,
+        # GitHub's secondary limits, in points per minute; only applied
+        # against the real API.
+        "secondary_per_minute": {"core": 900, "graphql": 2000},
+        # Fraction of the secondary limits this process may use (the
+        # distributed coordinator gives each worker 1/workers).
+        "share": 1.0,
+        # Select rateLimit { cost remaining resetAt } in every GraphQL query,
+        # so each row records the query's point cost in graphql_cost. Off by
+        # default: it changes the GraphQL payload and server work compared
+        # with REST. Without it the limiter counts one point per query until
+        # a response reports otherwise.
+        "query_cost": False,
     },
     "experiment": {
+        # Measurements per client in each treatment (unless adaptive).
         "repetitions": 100,
+        # Adaptive sample size: keep measuring a treatment until the
+        # distribution-free CI of each quantile is narrower than
+        # target_rel_width of its value, with min/max repetitions per client.
+        "adaptive": {
+            "enabled": False,
+            "quantiles": [0.5, 0.95],
+            "confidence": 0.95,
+            "target_rel_width": 0.10,
+            "min_repetitions": 20,
+            "max_repetitions": 300,
+        },
         "warmup_requests": 15,
+        # Pause between treatments. "adaptive": probe the API just loaded with
+        # its simple query until the median of the last `window` probes is
+        # within `tolerance` of the baseline measured before the first
+        # treatment (between min_s and max_s). "fixed": sleep fixed_s.
+        # With overlap_warmup, a treatment on the other API warms up during
+        # the pause and starts measuring when it ends.
+        "stabilization": {
+            "mode": "adaptive",
+            "fixed_s": 30.0,
+            "baseline_probes": 10,
+            "probe_interval_s": 0.5,
+            "window": 5,
+            "tolerance": 0.2,
+            "min_s": 2.0,
+            "max_s": 30.0,
+            "overlap_warmup": True,
+        },
         "request_interval": 0.1,
         "timeout": 30,
         "concurrent_clients": [1, 10, 50],
+        # Seed of the treatment order shuffle; None draws one. Either way it
+        # is recorded in the run manifest, and a resumed run keeps its order.
+        "seed": None,
         "query_types": ["simple", "nested", "aggregated"],
         "cache_states": ["cold", "warm"],
+        # "reuse": long-lived pooled client per worker thread.
+        # "fresh": new client and TCP/TLS connection per measurement.
+        "connection_modes": ["reuse"],
+        # GraphQL only. "full": query text in every request. "persisted":
+        # Apollo-style persisted query, sending only the document's SHA-256
+        # (needs server support, e.g. the mock target; GitHub does not
+        # support it, so "persisted" is rejected when target is "github").
+        "graphql_query_modes": ["full"],
+        # "threads": one OS thread per client (ThreadPoolExecutor).
+        # "asyncio": all clients as tasks on one event loop (requires aiohttp).
+        "engine": "threads",
+        # "closed": each client waits for its response, then sleeps request_interval.
+        # "open": requests are issued on a fixed arrival schedule regardless of
+        # response times and latency is measured from the intended send time.
+        "load_model": "closed",
+        # Open loop only: req/s per treatment, either a number or a mapping
+        # {concurrent_clients: rate}; "constant" or "poisson" inter-arrivals.
+        "arrival_rate": 10.0,
+        "arrival_process": "constant",
+        # tqdm bars per treatment (turned off in distributed workers).
+        "progress_bars": True,
+    },
+    "client_monitor": {
+        # Collector self-measurement per treatment: process CPU, wake-up lag
+        # of a probe thread (or of the asyncio loop) and time per iteration
+        # spent outside the HTTP call. Appended to <results>.overhead.jsonl.
+        "enabled": True,
+        "sample_interval_s": 0.01,
+        # A treatment is flagged as client-saturated when any limit is
+        # exceeded. CPU is a share of one core (the GIL caps Python near 100%).
+        "max_cpu_percent": 80.0,
+        "max_sched_lag_p99_ms": 10.0,
+        # Time outside the HTTP call relative to time inside it.
+        "max_outside_http_ratio": 0.1,
+    },
+    "distributed": {
+        # Worker processes sharing each treatment's concurrent_clients; 0 runs
+        # everything in this process. The coordinator listens on host:port and
+        # merges the workers' records into the run's result store.
+        "workers": 0,
+        # Start the workers as local subprocesses. Otherwise wait for
+        # `workers` remote hosts to connect with
+        # `python -m src.collectors.distributed worker --connect HOST:PORT`.
+        "spawn_local": True,
+        "host": "127.0.0.1",
+        "port": 9200,
+        # Shared secret for the worker handshake (not encryption). Required
+        # unless the coordinator listens on loopback and spawns its workers,
+        # in which case a random key is generated for the run.
+        "authkey": os.getenv("GVR_CLUSTER_KEY", ""),
+        "connect_timeout_s": 60.0,
+        # Records are streamed to the coordinator in batches of this size, or
+        # at least every flush_interval s.
+        "batch_size": 200,
+        "flush_interval": 0.5,
+    },
+    "live_metrics": {
+        # Prometheus-style text endpoint with rolling percentiles, throughput
+        # and error rate per api_type/query_type while collecting.
+        "enabled": True,
+        "host": "127.0.0.1",
+        "port": 9108,
+        "window_s": 60.0,
     },
     "output": {
         "results_dir": "./results",
+        # "csv": one flat file per run. "parquet": a dataset directory
+        # partitioned by api_type/query_type/cache_state/concurrent_clients
+        # (requires pyarrow).
+        "format": "csv",
+        # Rows are queued to a single writer thread and appended in batches;
+        # the file is flushed (and fsync'd) at least every flush_interval s.
+        "writer": {
+            "batch_size": 500,
+            "flush_interval": 1.0,
+            "fsync": True,
+        },
+        # Per-treatment response time histogram (microseconds), appended to
+        # <results>.hdr.jsonl as each treatment completes.
+        "hdr_histogram": {
+            "enabled": True,
+            "highest_us": 3_600_000_000,
+            "significant_digits": 3,
+        },
         "csv_headers": [
             "timestamp",
             "api_type",
             "query_type",
             "concurrent_clients",
             "cache_state",
+            "connection_mode",
+            "query_mode",
+            "fanout_strategy",
+            "intended_send_ts",
+            "actual_send_ts",
             "response_time_ms",
+            "request_body_bytes",
             "payload_size_bytes",
+            "wire_bytes",
+            "header_bytes",
             "status_code",
+            "cache_result",
+            "cache_saved_bytes",
+            "throttle_ms",
+            "rate_limited",
+            "graphql_cost",
+            "dns_ms",
+            "connect_ms",
+            "tls_ms",
+            "ttfb_ms",
+            "download_ms",
+            "json_decode_ms",
+            "query_parse_ms",
+            "subrequest_ms",
+            "worker_id",
         ],
     },
 }
+
+
+def github_endpoints() -> Tuple[str, str]:
+    """REST base URL and GraphQL URL for the configured target."""
+    if config["github"]["target"] == "mock":
+        mock = config["mock_server"]
+        base = f"http://{mock['host']}:{mock['port']}"
+        return base, base + "/graphql"
+    return config["github"]["rest_base_url"], config["github"]["graphql_url"]
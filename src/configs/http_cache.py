@@ -0,0 +1,124 @@
+"""
+Client-side HTTP cache for the "warm" cache state.
+Response bodies are kept with their ETag/Last-Modified validators in a bounded
+LRU shared by every client of a treatment. Stored responses are revalidated
+with If-None-Match/If-Modified-Since and a 304 reuses the stored body; entries
+younger than max_age_s are served without a request. GraphQL POSTs are keyed
+by the normalized document and variables, so the same cache applies; GitHub
+sends no validators for them, so they can be given a max age of their own.
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+# cache_result values; blank when the treatment does not use the cache.
+HIT, REVALIDATED, MISS = "hit", "revalidated", "miss"
+
+
+@dataclass
+class CacheEntry:
+    body: bytes
+    wire_bytes: int
+    etag: Optional[str]
+    last_modified: Optional[str]
+    stored_at: float
+    max_age_s: float
+
+    def validators(self) -> Dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int = 256, max_age_s: float = 0.0):
+        self.max_entries = max_entries
+        self.max_age_s = max_age_s
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup(self, key: str) -> Tuple[Optional[CacheEntry], bool]:
+        """The entry for `key` (if any) and whether it can be used without a request."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None, False
+            self._entries.move_to_end(key)
+        return entry, time.monotonic() - entry.stored_at < entry.max_age_s
+
+    def store(self, key: str, body: bytes, wire_bytes: int, headers: Mapping[str, str], unvalidated_max_age_s: float = 0.0):
+        """unvalidated_max_age_s: max age for a response without ETag/Last-Modified, if longer."""
+        etag, last_modified = headers.get("ETag"), headers.get("Last-Modified")
+        max_age_s = self.max_age_s
+        if not (etag or last_modified):
+            max_age_s = max(max_age_s, unvalidated_max_age_s)
+            if max_age_s <= 0:
+                # Nothing to revalidate with and never fresh: storing is useless.
+                return
+        entry = CacheEntry(body, wire_bytes, etag, last_modified, time.monotonic(), max_age_s)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def refresh(self, entry: CacheEntry):
+        entry.stored_at = time.monotonic()
+
+
+def new_cache(settings: Dict[str, Any]) -> Optional[ResponseCache]:
+    if not settings["enabled"]:
+        return None
+    return ResponseCache(settings["max_entries"], settings["max_age_s"])
+
+
+def rest_key(url: str) -> str:
+    return "GET " + url
+
+
+def graphql_key(document_sha256: str, variables: Optional[Dict[str, Any]] = None) -> str:
+    # The hash is of the printed (normalized) document; see prepare_query.
+    return "POST " + document_sha256 + " " + json.dumps(variables or {}, sort_keys=True, separators=(",", ":"))
+
+
+def through_cache(cache: Optional[ResponseCache], key: str, entry: Optional[CacheEntry], status: int, body: bytes, sizes: Dict[str, int], headers: Mapping[str, str], cacheable: bool = True, unvalidated_max_age_s: float = 0.0) -> Tuple[bytes, Dict[str, int], Dict[str, Any]]:
+    """
+    Resolve a network response against the cache: a 304 is answered with the
+    stored body, a 200 is stored. Returns the payload, its sizes and the
+    cache fields of the result.
+    """
+    if cache is None:
+        return body, sizes, {}
+    if status == 304 and entry is not None:
+        cache.refresh(entry)
+        return entry.body, {**sizes, "payloadSize": len(entry.body)}, \
+            {"cacheResult": REVALIDATED, "cacheSavedBytes": entry.wire_bytes}
+    if status == 200 and cacheable:
+        cache.store(key, body, sizes["wireBytes"], headers, unvalidated_max_age_s)
+    return body, sizes, {"cacheResult": MISS, "cacheSavedBytes": 0}
+
+
+def cached_response(entry: CacheEntry) -> Tuple[bytes, Dict[str, int], Dict[str, Any]]:
+    """A fresh entry served without a request."""
+    return entry.body, {"payloadSize": len(entry.body), "wireBytes": 0, "headerBytes": 0}, \
+        {"cacheResult": HIT, "cacheSavedBytes": entry.wire_bytes}
+
+
+def combine(parts: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Cache fields of an aggregated request from those of its sub-requests."""
+    if not parts or not parts[0]:
+        return {}
+    results = {p["cacheResult"] for p in parts}
+    return {
+        "cacheResult": results.pop() if len(results) == 1 else "mixed",
+        "cacheSavedBytes": sum(p["cacheSavedBytes"] for p in parts),
+    }
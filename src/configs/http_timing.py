@@ -0,0 +1,137 @@
+"""
+Per-phase timing for the sync (requests/urllib3) clients.
+Connections are subclassed so name resolution, TCP connect and TLS handshake
+are timed separately; the timings land in a thread-local record that the
+client reads back once the response has been downloaded.
+"""
+import gzip
+import socket
+import time
+import threading
+import zlib
+from typing import Dict, Tuple
+
+import requests
+from requests import Response
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import NameResolutionError, NewConnectionError
+
+_local = threading.local()
+
+
+def _record(phase: str, ms: float):
+    phases = getattr(_local, "phases", None)
+    if phases is not None:
+        phases[phase] += ms
+
+
+def _timed_new_conn(conn, new_conn) -> socket.socket:
+    host = conn._dns_host
+    t0 = time.perf_counter()
+    try:
+        infos = socket.getaddrinfo(host, conn.port, 0, socket.SOCK_STREAM)
+    except socket.gaierror as e:
+        raise NameResolutionError(conn.host, conn, e) from e
+    t1 = time.perf_counter()
+    # Connect to the already-resolved addresses, in resolver order, so the
+    # TCP handshake is not charged with a second lookup.
+    err = None
+    try:
+        for *_, sockaddr in infos:
+            conn._dns_host = sockaddr[0]
+            try:
+                sock = new_conn()
+                break
+            except NewConnectionError as e:
+                err = e
+        else:
+            raise err
+    finally:
+        conn._dns_host = host
+    t2 = time.perf_counter()
+    conn._net_ms = (t2 - t0) * 1000
+    _record("dns", (t1 - t0) * 1000)
+    _record("connect", (t2 - t1) * 1000)
+    return sock
+
+
+class TimedHTTPConnection(HTTPConnection):
+    def _new_conn(self) -> socket.socket:
+        return _timed_new_conn(self, super()._new_conn)
+
+
+class TimedHTTPSConnection(HTTPSConnection):
+    def _new_conn(self) -> socket.socket:
+        return _timed_new_conn(self, super()._new_conn)
+
+    def connect(self):
+        self._net_ms = 0.0
+        start = time.perf_counter()
+        super().connect()
+        _record("tls", (time.perf_counter() - start) * 1000 - self._net_ms)
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _TimedHTTPConnectionPool,
+            "https": _TimedHTTPSConnectionPool,
+        }
+
+
+def decode_body(raw: bytes, encoding: str) -> bytes:
+    """Undo a gzip or deflate Content-Encoding (the only ones the clients accept)."""
+    if encoding == "gzip":
+        return gzip.decompress(raw)
+    if encoding == "deflate":
+        try:
+            return zlib.decompress(raw)
+        except zlib.error:
+            return zlib.decompress(raw, -zlib.MAX_WBITS)
+    return raw
+
+
+def timed_request(session: requests.Session, method: str, url: str, **kwargs) -> Tuple[Response, Dict[str, float], int]:
+    """
+    Send a request and download its body, returning the response, its
+    phases in ms: dns, connect, tls (zero on a reused connection), ttfb
+    (request sent until response headers) and download; and the body's
+    size on the wire. The body is read undecoded, so the wire size holds for
+    chunked responses too (urllib3's tell() stays at 0 for those), and is
+    then decoded into resp.content.
+    """
+    phases = {"dns": 0.0, "connect": 0.0, "tls": 0.0}
+    _local.phases = phases
+    start = time.perf_counter()
+    try:
+        resp = session.request(method, url, stream=True, **kwargs)
+        headers_at = time.perf_counter()
+        raw = b"".join(resp.raw.stream(64 * 1024, decode_content=False))
+        resp._content = decode_body(raw, resp.headers.get("Content-Encoding", ""))
+        resp._content_consumed = True
+        done = time.perf_counter()
+    finally:
+        _local.phases = None
+    setup_ms = phases["dns"] + phases["connect"] + phases["tls"]
+    phases["ttfb"] = (headers_at - start) * 1000 - setup_ms
+    phases["download"] = (done - headers_at) * 1000
+    return resp, phases, len(raw)
+
+
+def sum_phases(all_phases) -> Dict[str, float]:
+    total: Dict[str, float] = {}
+    for phases in all_phases:
+        for k, v in phases.items():
+            total[k] = total.get(k, 0.0) + v
+    return total
@@ -0,0 +1,209 @@
+"""
+Client-side pacing against the API's rate limits.
+GitHub reports each budget in X-RateLimit-* headers ("core" for REST,
+"graphql" for GraphQL, spent in query points). One RateLimiter per process
+follows both from the responses and paces every client with a token bucket
+per resource: the remaining budget is spread over the time left until its
+reset, and GitHub's secondary per-minute limits cap the rate from the first
+request on. A rejected request (403/429) holds its resource until Retry-After
+or the reset. Clients wait before a measurement starts, so pacing is never
+counted as latency; the wait is recorded in the row instead.
+"""
+import asyncio
+import re
+import threading
+import time
+from typing import Any, Dict, List, Mapping, Optional
+
+from graphql import parse
+
+# GraphQL selection that makes GitHub report the query's point cost.
+COST_FIELD = "rateLimit { cost remaining resetAt }"
+# Read straight from the response body, as with GRAPHQL_ERRORS_MARKER.
+_COST_RE = re.compile(rb'"rateLimit":\{"cost":(\d+)')
+
+
+def with_cost_field(document):
+    """Add COST_FIELD to the query operations of a parsed document."""
+    field = parse("{ " + COST_FIELD + " }").definitions[0].selection_set.selections[0]
+    for definition in document.definitions:
+        if getattr(definition, "operation", None) is not None and definition.operation.value == "query":
+            selections = definition.selection_set.selections
+            definition.selection_set.selections = (*selections, field)
+    return document
+
+
+def graphql_cost(body: bytes) -> Optional[int]:
+    match = _COST_RE.search(body)
+    return int(match.group(1)) if match else None
+
+
+def rate_limit_info(status: int, headers: Mapping[str, str], body: bytes = b"") -> Dict[str, Any]:
+    """
+    Budget reported by one response, and whether the response is a
+    rate-limit rejection; empty when the server sends neither.
+    """
+    info: Dict[str, Any] = {}
+    remaining = headers.get("X-RateLimit-Remaining")
+    if remaining is not None:
+        info["remaining"] = int(remaining)
+        reset = headers.get("X-RateLimit-Reset")
+        if reset:
+            info["reset"] = float(reset)
+        info["resource"] = headers.get("X-RateLimit-Resource", "")
+    retry_after = headers.get("Retry-After")
+    if status == 429 or (status == 403 and (retry_after is not None or info.get("remaining") == 0 or b"rate limit" in body)):
+        info["limited"] = True
+        if retry_after is not None:
+            info["retryAfter"] = float(retry_after)
+    return info
+
+
+def lowest_budget(infos: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """The most restrictive of several sub-requests' budgets."""
+    infos = [i for i in infos if i]
+    if not infos:
+        return {}
+    return min(infos, key=lambda i: (not i.get("limited"), i.get("remaining", float("inf"))))
+
+
+class TokenBucket:
+    def __init__(self, rate: Optional[float], capacity: float):
+        self.rate = rate  # tokens/s; None is unlimited
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def wait_time(self, cost: float, now: float) -> float:
+        """Seconds until `cost` tokens are available (0 when they are now)."""
+        if self.rate is None:
+            return 0.0
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        # A request dearer than the bucket may go once it is full.
+        missing = min(cost, self.capacity) - self.tokens
+        return missing / self.rate if missing > 0 else 0.0
+
+    def take(self, cost: float):
+        if self.rate is not None:
+            self.tokens -= cost
+
+
+class _Resource:
+    def __init__(self, secondary_rate: Optional[float], burst: float):
+        self.secondary = TokenBucket(secondary_rate, burst)
+        self.primary = TokenBucket(None, burst)
+        self.remaining: Optional[int] = None
+        self.reset = 0.0
+        self.blocked_until = 0.0
+
+
+class RateLimiter:
+    """Shared by every client of the process: threads call acquire(), event-loop tasks acquire_async()."""
+
+    def __init__(self, settings: Dict[str, Any], secondary: bool = True):
+        self.settings = settings
+        per_minute = settings["secondary_per_minute"] if secondary else {}
+        self._resources = {
+            name: _Resource(per_minute[name] * settings["share"] / 60 if name in per_minute else None,
+                            settings["burst"])
+            for name in ("core", "graphql")
+        }
+        self._costs: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def cost(self, key: str, default: int = 1) -> int:
+        """Last known cost of a request kind (GraphQL queries cost points)."""
+        return self._costs.get(key, default)
+
+    def try_acquire(self, resource: str, cost: float) -> float:
+        """
+        Spend `cost` on `resource` and return 0, or return how long to wait
+        before trying again. Waiters re-check rather than queue, so a budget
+        learned meanwhile (e.g. a new window) applies to them at once.
+        """
+        r = self._resources[resource]
+        with self._lock:
+            now = time.monotonic()
+            delay = max(r.blocked_until - now,
+                        r.secondary.wait_time(cost, now),
+                        r.primary.wait_time(cost, now))
+            if delay > 0:
+                return delay
+            r.secondary.take(cost)
+            r.primary.take(cost)
+            return 0.0
+
+    def acquire(self, resource: str, cost: float) -> float:
+        """Block until `cost` may be spent on `resource`; returns the seconds waited."""
+        start = time.monotonic()
+        while True:
+            delay = self.try_acquire(resource, cost)
+            if delay <= 0:
+                return time.monotonic() - start
+            time.sleep(min(delay, self.settings["max_wait_step_s"]))
+
+    async def acquire_async(self, resource: str, cost: float) -> float:
+        start = time.monotonic()
+        while True:
+            delay = self.try_acquire(resource, cost)
+            if delay <= 0:
+                return time.monotonic() - start
+            await asyncio.sleep(min(delay, self.settings["max_wait_step_s"]))
+
+    def observe(self, resource: str, info: Dict[str, Any], key: Optional[str] = None, cost: Optional[int] = None):
+        if key is not None and cost is not None:
+            self._costs[key] = cost
+        if not info:
+            return
+        resource = info.get("resource") or resource
+        r = self._resources.get(resource)
+        if r is None:
+            return
+        with self._lock:
+            now_mono, now = time.monotonic(), time.time()
+            if "remaining" in info:
+                reset = info.get("reset")
+                if reset is not None and reset > r.reset:
+                    # A new window (or the first response): adopt its budget.
+                    r.reset, r.remaining = reset, info["remaining"]
+                elif reset is None or reset == r.reset:
+                    # Responses arrive out of order; the lowest count is the
+                    # latest. Without a reset there is no telling a new window.
+                    r.remaining = info["remaining"] if r.remaining is None else min(r.remaining, info["remaining"])
+                # The budget can only be spread over a window of known length.
+                if r.reset:
+                    window = max(r.reset - now, 1.0)
+                    usable = r.remaining - self.settings["reserve_remaining"]
+                    if usable > 0:
+                        r.primary.rate = usable / window
+                    else:
+                        r.blocked_until = max(r.blocked_until, now_mono + window)
+            if info.get("limited"):
+                wait = info.get("retryAfter")
+                if wait is None:
+                    # GitHub: without Retry-After, wait for the reset, or a minute.
+                    wait = r.reset - now if r.remaining == 0 and r.reset > now else 60.0
+                r.blocked_until = max(r.blocked_until, now_mono + wait)
+
+
+_shared: Optional[RateLimiter] = None
+_shared_lock = threading.Lock()
+
+
+def shared_limiter(settings: Dict[str, Any], target: str = "github") -> Optional[RateLimiter]:
+    """The process-wide limiter (budgets belong to the token, not to a treatment)."""
+    global _shared
+    if not settings["enabled"]:
+        return None
+    with _shared_lock:
+        if _shared is None:
+            # GitHub's secondary limits mean nothing to the local stand-in.
+            _shared = RateLimiter(settings, secondary=target == "github")
+        return _shared
+
+
+def reset_shared_limiter():
+    global _shared
+    with _shared_lock:
+        _shared = None
@@ -1,38 +1,211 @@
 """
 Request generators and load configuration helpers using local app modules.
 """
-from typing import Dict, Any, List
-from datetime import datetime
+import random
+import time
+from typing import Dict, Any, List, Optional
+from datetime import datetime, timezone
 
-from .clients import RestClient, GraphQLClientWrapper
+from .clients import ClientRegistry
+from .config import config
 from .queries import rest_queries, graphql_queries
+from .rate_limit import RateLimiter
 
+_default_registry: Optional[ClientRegistry] = None
 
-def generate_rest_request(query_type: str) -> Dict[str, Any]:
-    client = RestClient()
+# Per-request phase timings (ms) as CSV columns; a phase that was not measured
+# (e.g. JSON decode with parse_json off, TLS on the asyncio engine) is blank.
+PHASE_COLUMNS = {
+    "dns": "dns_ms",
+    "connect": "connect_ms",
+    "tls": "tls_ms",
+    "ttfb": "ttfb_ms",
+    "download": "download_ms",
+    "decode": "json_decode_ms",
+    "parse": "query_parse_ms",
+}
+
+
+def _registry(registry: Optional[ClientRegistry]) -> ClientRegistry:
+    global _default_registry
+    if registry is not None:
+        return registry
+    if _default_registry is None:
+        _default_registry = ClientRegistry()
+    return _default_registry
+
+
+def generate_rest_request(query_type: str, registry: Optional[ClientRegistry] = None) -> Dict[str, Any]:
+    registry = _registry(registry)
+    client = registry.rest()
+    q = rest_queries[query_type]
+    try:
+        if query_type == "aggregated":
+            return client.make_aggregated_request(q["urls"])
+        return client.make_request(q["url"])
+    finally:
+        registry.release(client)
+
+
+def generate_graphql_request(query_type: str, registry: Optional[ClientRegistry] = None) -> Dict[str, Any]:
+    registry = _registry(registry)
+    client = registry.graphql()
+    q = graphql_queries[query_type]
+    try:
+        return client.make_request(q)
+    finally:
+        registry.release(client)
+
+
+async def generate_rest_request_async(query_type: str, registry) -> Dict[str, Any]:
+    client = await registry.rest()
     q = rest_queries[query_type]
-    if query_type == "aggregated":
-        return client.make_aggregated_request(q["urls"])
-    return client.make_request(q["url"])
+    try:
+        if query_type == "aggregated":
+            return await client.make_aggregated_request(q["urls"])
+        return await client.make_request(q["url"])
+    finally:
+        await registry.release(client)
 
 
-def generate_graphql_request(query_type: str) -> Dict[str, Any]:
-    client = GraphQLClientWrapper()
+async def generate_graphql_request_async(query_type: str, registry) -> Dict[str, Any]:
+    client = await registry.graphql()
     q = graphql_queries[query_type]
-    return client.make_request(q)
-
-
-def build_record(api_type: str, query_type: str, concurrent_clients: int, cache_state: str, result: Dict[str, Any]) -> Dict[str, Any]:
-    return {
-        "timestamp": datetime.now(datetime.UTC).isoformat(),
-        "api_type": api_type,
-        "query_type": query_type,
-        "concurrent_clients": concurrent_clients,
-        "cache_state": cache_state,
-        "response_time_ms": round(result.get("responseTime", 0), 3),
-        "payload_size_bytes": result.get("payloadSize", 0),
-        "status_code": result.get("statusCode", 0),
-    }
+    try:
+        return await client.make_request(q)
+    finally:
+        await registry.release(client)
+
+
+def rate_limit_resource(api_type: str) -> str:
+    return "core" if api_type == "REST" else "graphql"
+
+
+def request_cost(limiter: RateLimiter, api_type: str, query_type: str) -> int:
+    """Budget a measurement spends: REST requests made, or the GraphQL query's last known points."""
+    if api_type == "REST":
+        return len(rest_queries[query_type].get("urls", [None]))
+    return limiter.cost(query_type)
+
+
+def observe_limits(limiter: RateLimiter, api_type: str, query_type: str, result: Dict[str, Any]):
+    limiter.observe(rate_limit_resource(api_type), result.get("rateLimit", {}),
+                    key=query_type, cost=result.get("graphqlCost"))
+
+
+def _iso(epoch: Optional[float]) -> str:
+    if epoch is None:
+        return ""
+    return datetime.fromtimestamp(epoch, timezone.utc).isoformat()
+
+
+# Kept as epoch seconds on the hot path; formatted as ISO 8601 by as_row().
+TIMESTAMP_COLUMNS = ("timestamp", "intended_send_ts", "actual_send_ts")
+
+
+class Record:
+    """
+    One measurement as built on the hot path: a slotted object rather than a
+    dict, holding raw epoch timestamps until the writer thread calls as_row().
+    Supports item access (rec["status_code"]) like the row dict it becomes.
+    """
+
+    __slots__ = (
+        "timestamp", "api_type", "query_type", "concurrent_clients", "cache_state",
+        "connection_mode", "query_mode", "fanout_strategy", "intended_send_ts",
+        "actual_send_ts", "response_time_ms", "request_body_bytes", "payload_size_bytes",
+        "wire_bytes", "header_bytes", "status_code", "cache_result", "cache_saved_bytes",
+        "throttle_ms", "rate_limited", "graphql_cost", *PHASE_COLUMNS.values(),
+        "subrequest_ms", "worker_id",
+    )
+
+    def __getitem__(self, column: str) -> Any:
+        try:
+            return getattr(self, column)
+        except AttributeError:
+            raise KeyError(column) from None
+
+    def __setitem__(self, column: str, value: Any):
+        setattr(self, column, value)
+
+    def get(self, column: str, default: Any = None) -> Any:
+        return getattr(self, column, default)
+
+    def as_row(self) -> Dict[str, Any]:
+        row = {column: getattr(self, column) for column in self.__slots__}
+        for column in TIMESTAMP_COLUMNS:
+            row[column] = _iso(row[column])
+        return row
+
+
+# as_row() emits every slot, so the writer's columns must be exactly these.
+if list(Record.__slots__) != config["output"]["csv_headers"]:
+    raise ValueError(
+        "config['output']['csv_headers'] must list the Record columns in order: "
+        f"{list(Record.__slots__)}")
+
+
+def build_record(api_type: str, query_type: str, concurrent_clients: int, cache_state: str, result: Dict[str, Any], connection_mode: str = "reuse") -> Record:
+    actual = result.get("actualSend")
+    intended = result.get("intendedSend", actual)
+    # Open loop: time spent waiting past the scheduled send counts as latency.
+    lag_ms = (actual - intended) * 1000 if actual is not None else 0.0
+    phases = result.get("phases", {})
+    rec = Record()
+    rec.timestamp = time.time()
+    rec.api_type = api_type
+    rec.query_type = query_type
+    rec.concurrent_clients = concurrent_clients
+    rec.cache_state = cache_state
+    rec.connection_mode = connection_mode
+    rec.query_mode = result.get("queryMode", "")
+    rec.fanout_strategy = result.get("fanout", "")
+    rec.intended_send_ts = intended
+    rec.actual_send_ts = actual
+    rec.response_time_ms = round(result.get("responseTime", 0) + lag_ms, 3)
+    rec.request_body_bytes = result.get("requestBytes", 0)
+    rec.payload_size_bytes = result.get("payloadSize", 0)
+    rec.wire_bytes = result.get("wireBytes", 0)
+    rec.header_bytes = result.get("headerBytes", 0)
+    rec.status_code = result.get("statusCode", 0)
+    # Client cache outcome ("hit", "revalidated", "miss"; blank without
+    # the cache) and the response bytes it kept off the wire.
+    rec.cache_result = result.get("cacheResult", "")
+    rec.cache_saved_bytes = result.get("cacheSavedBytes", 0)
+    # Time the rate limiter held the request before sending it, whether
+    # the API rejected it for a rate limit, and GraphQL's point cost.
+    rec.throttle_ms = round(result.get("throttleMs", 0.0), 3)
+    rec.rate_limited = int(bool(result.get("rateLimit", {}).get("limited")))
+    rec.graphql_cost = result.get("graphqlCost", "")
+    for phase, column in PHASE_COLUMNS.items():
+        setattr(rec, column, round(phases[phase], 3) if phase in phases else "")
+    rec.subrequest_ms = ";".join(
+        str(round(t, 3)) for t in result.get("subrequestTimes", []))
+    # Set by the distributed coordinator; blank for single-process runs.
+    rec.worker_id = ""
+    return rec
+
+
+def get_arrival_rate(rate, concurrent_clients: int) -> float:
+    if isinstance(rate, dict):
+        rate = rate[concurrent_clients]
+    if rate <= 0:
+        raise ValueError(f"Arrival rate must be positive, got {rate}")
+    return float(rate)
+
+
+def arrival_offsets(n: int, rate: float, process: str = "constant", rng: Optional[random.Random] = None) -> List[float]:
+    """Intended send offsets (seconds from treatment start) for n requests."""
+    if process == "constant":
+        return [i / rate for i in range(n)]
+    if process == "poisson":
+        rng = rng or random.Random()
+        offsets, t = [], 0.0
+        for _ in range(n):
+            offsets.append(t)
+            t += rng.expovariate(rate)
+        return offsets
+    raise ValueError(f"Unknown arrival process: {process}")
 
 
 def get_load_levels(levels: List[int]) -> List[int]:
@@ -23,7 +23,8 @@ VARIABLES_TEXT = {
         "api_type (REST, GraphQL)",
         "query_type (simple, nested, aggregated)",
         "cache_state (cold, warm)",
-        "concurrent_clients (níveis de carga)"
+        "concurrent_clients (níveis de carga)",
+        "connection_mode (reuse, fresh)"
     ],
     "dependentes": [
         "response_time_ms",
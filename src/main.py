@@ -1,13 +1,20 @@
 """
 Main orchestrator for GraphQL vs REST experiment.
-- Runs data collection
-- Runs analysis and generates plots
-- Logs the pipeline steps
+- collect: runs data collection
+- analyze: statistical analysis and report
+- plot: figures
+- summarize: bounded-memory per-treatment summary (streaming sketches)
+- all: collect, analyze and plot in sequence, with pipeline logs
+
+    python -m src.main [collect|analyze|plot|summarize|all] [--results PATH] [--resume]
+
+Each subcommand imports what it needs when it runs, so `collect` does not pay
+for pandas/scipy/matplotlib and no output directories are created on import.
 """
+import argparse
 import logging
 import os
 import sys
-import analyzers.analyze_results as analysis
 
 # Ensure project root on sys.path
 ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -29,36 +36,97 @@ def setup_logging():
     logging.info("Pipeline logging initialized")
 
 
-def run_pipeline():
+def collect(results_path: str | None = None, resume: bool = False) -> str:
+    from .collectors.collector import run_experiment
+    return run_experiment(results_path, resume)
+
+
+def analyze(results_path: str | None = None, stratified: bool = True):
+    from .analyzers.analyze_results import run_analysis
+    run_analysis(results_path, stratified=stratified)
+
+
+def plot(results_path: str | None = None, workers: int | None = None):
+    from .analyzers.plot_results import generate_all_plots
+    from .analyzers.result_loader import latest_results
+    from .configs.config import config
+    if results_path is None:
+        results_path = latest_results(config["output"]["results_dir"])
+    generate_all_plots(results_path, os.path.join(
+        "results", "analysis", "plots"), workers=workers)
+
+
+def summarize(results_path: str | None = None):
+    from .analyzers.result_loader import latest_results
+    from .analyzers.streaming import summarize as summarize_run
+    from .configs.config import config
+    if results_path is None:
+        results_path = latest_results(config["output"]["results_dir"])
+    summarize_run(results_path)
+
+
+def run_pipeline(results_path: str | None = None, stratified: bool = True, workers: int | None = None, resume: bool = False):
     setup_logging()
     logging.info("Starting experiment pipeline")
 
     # 1) Run experiment (collection)
     logging.info("Step 1/3: Running experiment (collection)")
-    from .collectors.collector import run_experiment
-    csv_path = run_experiment()
-    logging.info(f"Experiment completed. CSV: {csv_path}")
+    results_path = collect(results_path, resume)
+    logging.info(f"Experiment completed. Results: {results_path}")
 
-    # 2) Run analysis (stats + plots)
+    # 2) Run analysis (stats + report)
     logging.info("Step 2/3: Running analysis")
     try:
-        if hasattr(analysis, "main"):
-            analysis.main()
-        elif hasattr(analysis, "run"):
-            analysis.run()
-        elif hasattr(analysis, "analyze"):
-            analysis.analyze()
-        else:
-            logging.warning(
-                "Could not find an entrypoint in app.analyze_results. Ensure it has main()/run()/analyze().")
+        analyze(results_path, stratified)
     except Exception as e:
         logging.exception("Analysis step failed: %s", e)
         raise
 
+    # 3) Figures
+    logging.info("Step 3/3: Rendering plots")
+    plot(results_path, workers)
     logging.info(
-        "Analysis completed. See analyzers/analysis_report.md and results/plots/")
-    logging.info("Step 3/3: Pipeline finished")
+        "Pipeline finished. See results/analysis/analysis_report.md and results/analysis/plots/")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m src.main", description="GraphQL vs REST experiment")
+    sub = parser.add_subparsers(dest="command")
+    for name, help_text in (("collect", "run the data collection"),
+                            ("analyze", "statistical analysis and report"),
+                            ("plot", "render the figures"),
+                            ("summarize", "per-treatment summary in bounded memory, updated incrementally"),
+                            ("all", "collect, analyze and plot (default)")):
+        p = sub.add_parser(name, help=help_text)
+        p.add_argument("--results", default=None,
+                       help="results CSV/Parquet path; for collect, an interrupted run to resume"
+                       if name in ("collect", "all") else "results CSV/Parquet path (default: latest)")
+        if name in ("collect", "all"):
+            p.add_argument("--resume", action="store_true",
+                           help="continue --results, or else the latest unfinished run, skipping completed treatments")
+        if name in ("analyze", "all"):
+            p.add_argument("--no-stratified", action="store_true",
+                           help="skip the per-treatment analysis")
+        if name in ("plot", "all"):
+            p.add_argument("--workers", type=int, default=None,
+                           help="plot rendering processes (1 = serial)")
+    args = parser.parse_args(argv)
+
+    command = args.command or "all"
+    results = getattr(args, "results", None)
+    if command == "collect":
+        collect(results, args.resume)
+    elif command == "analyze":
+        analyze(results, not args.no_stratified)
+    elif command == "plot":
+        plot(results, args.workers)
+    elif command == "summarize":
+        summarize(results)
+    else:
+        run_pipeline(results, not getattr(args, "no_stratified", False),
+                     getattr(args, "workers", None), getattr(args, "resume", False))
 
 
 if __name__ == "__main__":
-    run_pipeline()
+    main()
@@ -0,0 +1,326 @@
+"""
+Deterministic fixture data for the local GitHub stand-in.
+One dataset backs both the REST and the GraphQL views of the repository, so
+the two APIs return the same facts in their own shapes.
+"""
+import base64
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Optional
+
+API_URL = "https://api.github.com"
+WEB_URL = "https://github.com"
+
+WORDS = (
+    "render component state hook effect fiber reconcile update props context "
+    "suspense server client bundle compile memo ref portal event handler "
+    "scheduler priority lane batch hydrate stream error boundary test fix"
+).split()
+
+LANGUAGES = [
+    ("JavaScript", "#f1e05a", 5_600_000),
+    ("TypeScript", "#3178c6", 1_900_000),
+    ("HTML", "#e34c26", 120_000),
+    ("CSS", "#563d7c", 95_000),
+    ("C++", "#f34b7d", 60_000),
+    ("CoffeeScript", "#244776", 18_000),
+    ("Shell", "#89e051", 12_000),
+    ("Python", "#3572A5", 6_000),
+    ("Makefile", "#427819", 1_200),
+    ("Rust", "#dea584", 900),
+]
+
+REPO_URL_TEMPLATES = [
+    "forks", "keys{/key_id}", "collaborators{/collaborator}", "teams", "hooks",
+    "issues/events{/number}", "events", "assignees{/user}", "branches{/branch}",
+    "tags", "blobs{/sha}", "git/tags{/sha}", "git/refs{/sha}", "git/trees{/sha}",
+    "statuses/{sha}", "languages", "stargazers", "contributors", "subscribers",
+    "subscription", "commits{/sha}", "git/commits{/sha}", "comments{/number}",
+    "issues/comments{/number}", "contents/{+path}", "compare/{base}...{head}",
+    "merges", "{archive_format}{/ref}", "downloads", "issues{/number}",
+    "pulls{/number}", "milestones{/number}", "notifications{?since,all,participating}",
+    "labels{/name}", "releases{/id}", "deployments",
+]
+
+
+def _node_id(kind: str, n: int) -> str:
+    return base64.b64encode(f"0{len(kind)}:{kind}{n}".encode()).decode()
+
+
+def _iso(dt: datetime) -> str:
+    return dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def build_dataset(owner: str = "facebook", name: str = "react", scale: int = 1, seed: int = 42) -> Dict[str, Any]:
+    """
+    Build the repository fixture. `scale` multiplies list lengths and the
+    length of free-text fields, to grow payloads without changing their shape.
+    """
+    rng = random.Random(seed)
+    scale = max(1, int(scale))
+    created = datetime(2013, 5, 24, 16, 15, 54, tzinfo=timezone.utc)
+    now = datetime(2024, 6, 1, 12, 0, 0, tzinfo=timezone.utc)
+
+    def text(words: int) -> str:
+        return " ".join(rng.choice(WORDS) for _ in range(words * scale))
+
+    def when() -> datetime:
+        return created + timedelta(seconds=rng.randrange(int((now - created).total_seconds())))
+
+    users = [{
+        "id": 1000 + i,
+        "login": f"user{i}",
+        "name": f"User {i}",
+        "contributions": rng.randrange(10, 2000),
+    } for i in range(40 * scale)]
+    users.sort(key=lambda u: -u["contributions"])
+
+    issues = []
+    for i in range(30 * scale):
+        opened = when()
+        comments = [{
+            "id": 500_000 + i * 100 + j,
+            "body": text(25),
+            "created_at": opened + timedelta(hours=j + 1),
+            "author": rng.choice(users),
+        } for j in range(rng.randrange(0, 6))]
+        issues.append({
+            "id": 900_000 + i,
+            "number": 28_000 - i,
+            "title": text(6).capitalize(),
+            "body": text(60),
+            "state": "open" if i % 4 else "closed",
+            "created_at": opened,
+            "updated_at": opened + timedelta(days=1),
+            "author": rng.choice(users),
+            "comments": comments,
+        })
+    issues.sort(key=lambda x: x["created_at"], reverse=True)
+
+    releases = [{
+        "id": 700_000 + i,
+        "tag_name": f"v18.{3 - i // 10}.{i % 10}",
+        "name": f"18.{3 - i // 10}.{i % 10} ({text(2)})",
+        "created_at": now - timedelta(days=30 * i),
+    } for i in range(10 * scale)]
+
+    return {
+        "id": 10270250,
+        "owner": {"id": 69631, "login": owner, "type": "Organization"},
+        "name": name,
+        "full_name": f"{owner}/{name}",
+        "description": "The library for web and native user interfaces.",
+        "stargazers_count": 228_000,
+        "forks_count": 46_700,
+        "open_issues_count": sum(1 for x in issues if x["state"] == "open"),
+        "created_at": created,
+        "updated_at": now,
+        "users": users,
+        "issues": issues,
+        "releases": releases,
+        "languages": LANGUAGES,
+    }
+
+
+# --- REST views -------------------------------------------------------------
+
+def _rest_user(u: Dict[str, Any]) -> Dict[str, Any]:
+    login = u["login"]
+    url = f"{API_URL}/users/{login}"
+    return {
+        "login": login,
+        "id": u["id"],
+        "node_id": _node_id("User", u["id"]),
+        "avatar_url": f"https://avatars.githubusercontent.com/u/{u['id']}?v=4",
+        "gravatar_id": "",
+        "url": url,
+        "html_url": f"{WEB_URL}/{login}",
+        "followers_url": f"{url}/followers",
+        "following_url": f"{url}/following{{/other_user}}",
+        "gists_url": f"{url}/gists{{/gist_id}}",
+        "starred_url": f"{url}/starred{{/owner}}{{/repo}}",
+        "subscriptions_url": f"{url}/subscriptions",
+        "organizations_url": f"{url}/orgs",
+        "repos_url": f"{url}/repos",
+        "events_url": f"{url}/events{{/privacy}}",
+        "received_events_url": f"{url}/received_events",
+        "type": u.get("type", "User"),
+        "site_admin": False,
+    }
+
+
+def rest_repository(ds: Dict[str, Any]) -> Dict[str, Any]:
+    full = ds["full_name"]
+    url = f"{API_URL}/repos/{full}"
+    repo = {
+        "id": ds["id"],
+        "node_id": _node_id("Repository", ds["id"]),
+        "name": ds["name"],
+        "full_name": full,
+        "private": False,
+        "owner": _rest_user(ds["owner"]),
+        "html_url": f"{WEB_URL}/{full}",
+        "description": ds["description"],
+        "fork": False,
+        "url": url,
+    }
+    for template in REPO_URL_TEMPLATES:
+        key = template.split("{")[0].strip("/").replace("/", "_") or "archive"
+        repo[f"{key}_url"] = f"{url}/{template}"
+    repo.update({
+        "created_at": _iso(ds["created_at"]),
+        "updated_at": _iso(ds["updated_at"]),
+        "pushed_at": _iso(ds["updated_at"]),
+        "git_url": f"git://github.com/{full}.git",
+        "ssh_url": f"git@github.com:{full}.git",
+        "clone_url": f"{WEB_URL}/{full}.git",
+        "homepage": "https://react.dev",
+        "size": 412_000,
+        "stargazers_count": ds["stargazers_count"],
+        "watchers_count": ds["stargazers_count"],
+        "language": "JavaScript",
+        "has_issues": True,
+        "has_projects": True,
+        "has_downloads": True,
+        "has_wiki": True,
+        "has_pages": False,
+        "has_discussions": False,
+        "forks_count": ds["forks_count"],
+        "archived": False,
+        "disabled": False,
+        "open_issues_count": ds["open_issues_count"],
+        "license": {"key": "mit", "name": "MIT License", "spdx_id": "MIT",
+                    "url": f"{API_URL}/licenses/mit", "node_id": "MDc6TGljZW5zZTEz"},
+        "allow_forking": True,
+        "is_template": False,
+        "topics": ["declarative", "frontend", "javascript", "library", "react", "ui"],
+        "visibility": "public",
+        "forks": ds["forks_count"],
+        "open_issues": ds["open_issues_count"],
+        "watchers": ds["stargazers_count"],
+        "default_branch": "main",
+        "network_count": ds["forks_count"],
+        "subscribers_count": 6_600,
+    })
+    return repo
+
+
+def rest_issues(ds: Dict[str, Any], state: str = "open", per_page: int = 30) -> List[Dict[str, Any]]:
+    full = ds["full_name"]
+    out = []
+    for issue in ds["issues"]:
+        if state != "all" and issue["state"] != state:
+            continue
+        url = f"{API_URL}/repos/{full}/issues/{issue['number']}"
+        out.append({
+            "url": url,
+            "repository_url": f"{API_URL}/repos/{full}",
+            "labels_url": f"{url}/labels{{/name}}",
+            "comments_url": f"{url}/comments",
+            "events_url": f"{url}/events",
+            "html_url": f"{WEB_URL}/{full}/issues/{issue['number']}",
+            "id": issue["id"],
+            "node_id": _node_id("Issue", issue["id"]),
+            "number": issue["number"],
+            "title": issue["title"],
+            "user": _rest_user(issue["author"]),
+            "labels": [],
+            "state": issue["state"],
+            "locked": False,
+            "assignee": None,
+            "assignees": [],
+            "milestone": None,
+            "comments": len(issue["comments"]),
+            "created_at": _iso(issue["created_at"]),
+            "updated_at": _iso(issue["updated_at"]),
+            "closed_at": None,
+            "author_association": "NONE",
+            "body": issue["body"],
+            "reactions": {"url": f"{url}/reactions", "total_count": 0, "+1": 0, "-1": 0,
+                          "laugh": 0, "hooray": 0, "confused": 0, "heart": 0,
+                          "rocket": 0, "eyes": 0},
+            "timeline_url": f"{url}/timeline",
+            "state_reason": None,
+        })
+        if len(out) >= per_page:
+            break
+    return out
+
+
+def rest_contributors(ds: Dict[str, Any], per_page: int = 30) -> List[Dict[str, Any]]:
+    return [{**_rest_user(u), "contributions": u["contributions"]} for u in ds["users"][:per_page]]
+
+
+def rest_languages(ds: Dict[str, Any]) -> Dict[str, int]:
+    return {name: size for name, _, size in ds["languages"]}
+
+
+# --- GraphQL view -----------------------------------------------------------
+
+def _first(items: List[Any], first: Optional[int]) -> List[Any]:
+    return items if first is None else items[:max(0, first)]
+
+
+def _connection(nodes: List[Any], first: Optional[int]) -> Dict[str, Any]:
+    return {"nodes": _first(nodes, first), "totalCount": len(nodes)}
+
+
+def _actor(u: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "login": u["login"],
+        "name": u["name"],
+        "avatarUrl": f"https://avatars.githubusercontent.com/u/{u['id']}?v=4",
+    }
+
+
+def graphql_root(ds: Dict[str, Any]) -> Dict[str, Any]:
+    """Root value for the stand-in schema; list fields resolve their `first` argument."""
+    issues = [{
+        "id": _node_id("Issue", x["id"]),
+        "number": x["number"],
+        "title": x["title"],
+        "body": x["body"],
+        "state": x["state"].upper(),
+        "createdAt": _iso(x["created_at"]),
+        "author": _actor(x["author"]),
+        "comments": (lambda comments: lambda info, first=None: _connection(comments, first))([{
+            "id": _node_id("IssueComment", c["id"]),
+            "body": c["body"],
+            "createdAt": _iso(c["created_at"]),
+            "author": _actor(c["author"]),
+        } for c in x["comments"]]),
+    } for x in ds["issues"]]
+    languages = [{"name": n, "color": c} for n, c, _ in ds["languages"]]
+    collaborators = [_actor(u) for u in ds["users"]]
+    releases = [{
+        "id": _node_id("Release", r["id"]),
+        "name": r["name"],
+        "tagName": r["tag_name"],
+        "createdAt": _iso(r["created_at"]),
+    } for r in ds["releases"]]
+
+    def issue_connection(info, first=None, states=None):
+        nodes = issues if not states else [x for x in issues if x["state"] in states]
+        return _connection(nodes, first)
+
+    repository = {
+        "id": _node_id("Repository", ds["id"]),
+        "name": ds["name"],
+        "nameWithOwner": ds["full_name"],
+        "description": ds["description"],
+        "stargazerCount": ds["stargazers_count"],
+        "forkCount": ds["forks_count"],
+        "createdAt": _iso(ds["created_at"]),
+        "updatedAt": _iso(ds["updated_at"]),
+        "issues": issue_connection,
+        "languages": lambda info, first=None: _connection(languages, first),
+        "collaborators": lambda info, first=None: _connection(collaborators, first),
+        "releases": lambda info, first=None: _connection(releases, first),
+    }
+
+    def find_repository(info, owner, name):
+        if f"{owner}/{name}".lower() != ds["full_name"].lower():
+            return None
+        return repository
+
+    return {"repository": find_repository}
@@ -0,0 +1,386 @@
+"""
+Local stand-in for the GitHub REST and GraphQL APIs.
+Serves the endpoints in rest_queries and executes GraphQL documents against a
+fixture dataset, with injected latency, error rate and payload scaling, so
+benchmarks can run offline and reproducibly (e.g. in CI). Successful responses
+carry an ETag and If-None-Match is answered with 304, for REST and GraphQL.
+With a rate_limit, each resource ("core", "graphql") allows that many requests
+per window, reported in X-RateLimit-* headers and in GraphQL's rateLimit
+field, and answers 403 once spent, as GitHub does.
+
+    python -m src.servers.mock_github --port 8787 --latency-ms 20
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, Any, Optional, Tuple
+from urllib.parse import urlsplit, parse_qs
+
+from graphql import build_schema, parse, validate, execute, GraphQLError
+
+from ..configs.config import config
+from .fixtures import (
+    build_dataset,
+    graphql_root,
+    rest_repository,
+    rest_issues,
+    rest_contributors,
+    rest_languages,
+)
+
+SCHEMA_SDL = """
+type Query {
+  repository(owner: String!, name: String!): Repository
+  rateLimit: RateLimit
+}
+
+type RateLimit { cost: Int! limit: Int remaining: Int resetAt: String used: Int }
+
+enum IssueState { OPEN CLOSED }
+
+type Repository {
+  id: ID!
+  name: String!
+  nameWithOwner: String!
+  description: String
+  stargazerCount: Int!
+  forkCount: Int!
+  createdAt: String!
+  updatedAt: String!
+  issues(first: Int, states: [IssueState!]): IssueConnection!
+  languages(first: Int): LanguageConnection
+  collaborators(first: Int): UserConnection
+  releases(first: Int): ReleaseConnection!
+}
+
+type Actor { login: String! name: String avatarUrl: String! }
+
+type Issue {
+  id: ID!
+  number: Int!
+  title: String!
+  body: String!
+  state: IssueState!
+  createdAt: String!
+  author: Actor
+  comments(first: Int): IssueCommentConnection!
+}
+type IssueConnection { nodes: [Issue] totalCount: Int! }
+
+type IssueComment { id: ID! body: String! createdAt: String! author: Actor }
+type IssueCommentConnection { nodes: [IssueComment] totalCount: Int! }
+
+type Language { name: String! color: String }
+type LanguageConnection { nodes: [Language] totalCount: Int! }
+
+type User { login: String! name: String avatarUrl: String! }
+type UserConnection { nodes: [User] totalCount: Int! }
+
+type Release { id: ID! name: String tagName: String! createdAt: String! }
+type ReleaseConnection { nodes: [Release] totalCount: Int! }
+"""
+
+DEFAULT_SETTINGS: Dict[str, Any] = {
+    "host": "127.0.0.1",
+    "port": 8787,
+    "latency_ms": 0.0,
+    "latency_jitter_ms": 0.0,
+    "error_rate": 0.0,
+    "payload_scale": 1,
+    "gzip": True,
+    "seed": 42,
+    "rate_limit": 0,
+    "rate_limit_window_s": 3600.0,
+}
+
+
+def _dumps(obj: Any) -> bytes:
+    # Compact separators, as GitHub sends them.
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+
+class MockGitHubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, settings: Optional[Dict[str, Any]] = None):
+        self.settings = {**DEFAULT_SETTINGS, **(settings or {})}
+        self.dataset = build_dataset(
+            scale=self.settings["payload_scale"], seed=self.settings["seed"])
+        self.schema = build_schema(SCHEMA_SDL)
+        self.root = graphql_root(self.dataset)
+        self.rest_cache = {
+            "repo": _dumps(rest_repository(self.dataset)),
+            "languages": _dumps(rest_languages(self.dataset)),
+        }
+        self._rng = random.Random(self.settings["seed"])
+        self._rng_lock = threading.Lock()
+        self._documents: Dict[str, Any] = {}
+        self.persisted: Dict[str, str] = {}
+        self._budgets: Dict[str, list] = {}  # resource -> [used, reset epoch]
+        self._budget_lock = threading.Lock()
+        super().__init__((self.settings["host"], self.settings["port"]), _Handler)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def draw(self) -> Tuple[float, bool]:
+        """Injected delay (s) and whether this request should fail."""
+        s = self.settings
+        with self._rng_lock:
+            jitter = self._rng.uniform(0, s["latency_jitter_ms"])
+            fail = self._rng.random() < s["error_rate"]
+        return (s["latency_ms"] + jitter) / 1000, fail
+
+    def charge(self, resource: str, cost: int = 1) -> Optional[Dict[str, Any]]:
+        """Spend `cost` from a resource; its budget state, or None without a rate limit."""
+        limit = self.settings["rate_limit"]
+        if not limit:
+            return None
+        with self._budget_lock:
+            now = time.time()
+            budget = self._budgets.get(resource)
+            if budget is None or now >= budget[1]:
+                budget = self._budgets[resource] = [
+                    0, int(now + self.settings["rate_limit_window_s"])]
+            allowed = budget[0] + cost <= limit
+            if allowed:
+                budget[0] += cost
+            return {"resource": resource, "limit": limit, "used": budget[0],
+                    "remaining": limit - budget[0], "reset": budget[1], "allowed": allowed}
+
+    def document(self, query: str):
+        doc = self._documents.get(query)
+        if doc is None:
+            doc = parse(query)
+            errors = validate(self.schema, doc)
+            if errors:
+                raise errors[0]
+            self._documents[query] = doc
+        return doc
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    # Buffer the head and body so each response leaves in a single write.
+    wbufsize = -1
+    server: MockGitHubServer
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: bytes, headers: Optional[Dict[str, str]] = None):
+        headers = {**getattr(self, "_limit_headers", {}), **(headers or {})}
+        if status == 200:
+            etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+            if etag in self.headers.get("If-None-Match", ""):
+                self.send_response(304)
+                for k, v in {**headers, "ETag": etag}.items():
+                    self.send_header(k, v)
+                self.end_headers()
+                return
+            headers["ETag"] = etag
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        if self.server.settings["gzip"] and "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body, compresslevel=6)
+            self.send_header("Content-Encoding", "gzip")
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _charge(self, resource: str) -> bool:
+        """Spend one request of `resource`; False once a 403 has been sent."""
+        self._budget = self.server.charge(resource)
+        if self._budget is None:
+            self._limit_headers = {}
+            return True
+        b = self._budget
+        self._limit_headers = {
+            "X-RateLimit-Limit": str(b["limit"]),
+            "X-RateLimit-Remaining": str(b["remaining"]),
+            "X-RateLimit-Used": str(b["used"]),
+            "X-RateLimit-Reset": str(b["reset"]),
+            "X-RateLimit-Resource": resource,
+        }
+        if not b["allowed"]:
+            self._send(403, _dumps({"message": "API rate limit exceeded"}))
+            return False
+        return True
+
+    def _inject(self) -> bool:
+        delay, fail = self.server.draw()
+        if delay > 0:
+            time.sleep(delay)
+        if fail:
+            self._send(502, _dumps({"message": "Server Error"}))
+            return True
+        return False
+
+    def do_GET(self):
+        if not self._charge("core") or self._inject():
+            return
+        parts = urlsplit(self.path)
+        segments = [p for p in parts.path.split("/") if p]
+        params = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+        ds = self.server.dataset
+        if len(segments) < 3 or segments[0] != "repos" or "/".join(segments[1:3]).lower() != ds["full_name"].lower():
+            return self._send(404, _dumps({"message": "Not Found"}))
+        per_page = min(int(params.get("per_page", 30)), 100)
+        resource = segments[3] if len(segments) > 3 else ""
+        if resource == "" and len(segments) == 3:
+            body = self.server.rest_cache["repo"]
+        elif resource == "issues" and len(segments) == 4:
+            body = _dumps(rest_issues(ds, params.get("state", "open"), per_page))
+        elif resource == "contributors" and len(segments) == 4:
+            body = _dumps(rest_contributors(ds, per_page))
+        elif resource == "languages" and len(segments) == 4:
+            body = self.server.rest_cache["languages"]
+        else:
+            return self._send(404, _dumps({"message": "Not Found"}))
+        self._send(200, body)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        raw = self.rfile.read(length)
+        if urlsplit(self.path).path != "/graphql":
+            return self._send(404, _dumps({"message": "Not Found"}))
+        if not self._charge("graphql") or self._inject():
+            return
+        try:
+            request = json.loads(raw)
+        except ValueError:
+            return self._send(400, _dumps({"message": "Problems parsing JSON"}))
+        self._send(200, _dumps(self._graphql(request)))
+
+    def _graphql(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        query = request.get("query")
+        persisted = (request.get("extensions") or {}).get("persistedQuery")
+        if persisted:
+            sha = persisted.get("sha256Hash")
+            if query:
+                self.server.persisted[sha] = query
+            else:
+                query = self.server.persisted.get(sha)
+                if query is None:
+                    return {"errors": [{"message": "PersistedQueryNotFound"}]}
+        if not query:
+            return {"errors": [{"message": "A query attribute must be specified"}]}
+        try:
+            document = self.server.document(query)
+        except GraphQLError as e:
+            return {"errors": [e.formatted]}
+        b = self._budget or {}
+        reset = b.get("reset")
+        root = {**self.server.root, "rateLimit": {
+            "cost": 1, "limit": b.get("limit"), "remaining": b.get("remaining"), "used": b.get("used"),
+            "resetAt": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(reset)) if reset else None,
+        }}
+        result = execute(self.server.schema, document, root_value=root,
+                         variable_values=request.get("variables"),
+                         operation_name=request.get("operationName"))
+        out: Dict[str, Any] = {"data": result.data}
+        if result.errors:
+            out["errors"] = [e.formatted for e in result.errors]
+        return out
+
+
+def mock_settings() -> Dict[str, Any]:
+    return {**DEFAULT_SETTINGS, **config.get("mock_server", {})}
+
+
+def start_in_thread(settings: Optional[Dict[str, Any]] = None) -> MockGitHubServer:
+    server = MockGitHubServer(settings)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def wait_until_ready(host: str, port: int, timeout: float = 10.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with socket.create_connection((host, port), timeout=0.5):
+                return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise TimeoutError(
+                    f"Mock GitHub server not reachable on {host}:{port}")
+            time.sleep(0.1)
+
+
+def spawn(settings: Optional[Dict[str, Any]] = None) -> subprocess.Popen:
+    """Run the server in its own process, so it does not share the collector's GIL."""
+    s = {**mock_settings(), **(settings or {})}
+    cmd = [sys.executable, "-m", "src.servers.mock_github",
+           "--host", str(s["host"]), "--port", str(s["port"]),
+           "--latency-ms", str(s["latency_ms"]),
+           "--latency-jitter-ms", str(s["latency_jitter_ms"]),
+           "--error-rate", str(s["error_rate"]),
+           "--payload-scale", str(s["payload_scale"]),
+           "--seed", str(s["seed"]),
+           "--rate-limit", str(s["rate_limit"]),
+           "--rate-limit-window-s", str(s["rate_limit_window_s"])]
+    if not s["gzip"]:
+        cmd.append("--no-gzip")
+    proc = subprocess.Popen(cmd)
+    try:
+        wait_until_ready(s["host"], s["port"])
+    except TimeoutError:
+        proc.terminate()
+        raise
+    return proc
+
+
+def main(argv=None):
+    s = mock_settings()
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default=s["host"])
+    parser.add_argument("--port", type=int, default=s["port"])
+    parser.add_argument("--latency-ms", type=float, default=s["latency_ms"])
+    parser.add_argument("--latency-jitter-ms", type=float,
+                        default=s["latency_jitter_ms"])
+    parser.add_argument("--error-rate", type=float, default=s["error_rate"])
+    parser.add_argument("--payload-scale", type=int, default=s["payload_scale"])
+    parser.add_argument("--seed", type=int, default=s["seed"])
+    parser.add_argument("--no-gzip", action="store_true")
+    parser.add_argument("--rate-limit", type=int, default=s["rate_limit"],
+                        help="requests per window and resource (0 = unlimited)")
+    parser.add_argument("--rate-limit-window-s", type=float,
+                        default=s["rate_limit_window_s"])
+    args = parser.parse_args(argv)
+    server = MockGitHubServer({
+        "host": args.host,
+        "port": args.port,
+        "latency_ms": args.latency_ms,
+        "latency_jitter_ms": args.latency_jitter_ms,
+        "error_rate": args.error_rate,
+        "payload_scale": args.payload_scale,
+        "gzip": not args.no_gzip,
+        "seed": args.seed,
+        "rate_limit": args.rate_limit,
+        "rate_limit_window_s": args.rate_limit_window_s,
+    })
+    print(f"Mock GitHub API listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from src.configs.config import config
+from src.servers.mock_github import start_in_thread
+
+
+@pytest.fixture
+def serve_api(monkeypatch):
+    """
+    Start an API server on a free port and point the clients at it.
+    serve_api(settings) runs the mock GitHub server with `settings`;
+    serve_api(handler=...) serves a bare BaseHTTPRequestHandler instead.
+    Every server started is shut down after the test.
+    """
+    servers = []
+
+    def serve(settings=None, handler=None):
+        if handler is None:
+            server = start_in_thread({"port": 0, **(settings or {})})
+        else:
+            server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        host, port = server.server_address[:2]
+        monkeypatch.setitem(config["github"], "target", "mock")
+        monkeypatch.setitem(config["mock_server"], "host", host)
+        monkeypatch.setitem(config["mock_server"], "port", port)
+        return server
+
+    yield serve
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def mock_api(request, serve_api, monkeypatch):
+    """The mock GitHub server with gzip on; parametrize indirectly for other settings."""
+    monkeypatch.setitem(config["http"], "parse_json", True)
+    return serve_api(getattr(request, "param", {"gzip": True}))
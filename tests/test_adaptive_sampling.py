@@ -0,0 +1,49 @@
+import numpy as np
+
+from src.collectors.adaptive_sampling import EarlyStopping, load_sampling, quantile_ci, save_sampling
+from src.collectors.result_writer import ResultWriter
+
+SETTINGS = {"enabled": True, "quantiles": [0.5, 0.95], "confidence": 0.95,
+            "target_rel_width": 0.10, "min_repetitions": 20, "max_repetitions": 300}
+
+
+def test_quantile_ci_brackets_estimate():
+    x = np.sort(np.random.default_rng(0).normal(100, 5, 1000))
+    estimate, low, high = quantile_ci(x, 0.5)
+    assert low < estimate < high
+    assert abs(estimate - 100) < 1
+    # Too few samples to bracket the p95.
+    assert np.isnan(quantile_ci(x[:5], 0.95)[1])
+
+
+def _feed(stopper, values):
+    for v in values:
+        if not stopper.add(v):
+            break
+    return stopper.summary()
+
+
+def test_stable_treatment_stops_early():
+    rng = np.random.default_rng(1)
+    summary = _feed(EarlyStopping(SETTINGS, clients=10), rng.normal(50, 2, 3000))
+    assert summary["reason"] == "converged"
+    assert 200 <= summary["measurements"] < 3000
+    assert all(w <= 0.10 for w in summary["rel_ci_width"].values())
+
+
+def test_noisy_treatment_uses_the_budget():
+    rng = np.random.default_rng(2)
+    summary = _feed(EarlyStopping(SETTINGS, clients=2), rng.lognormal(3, 1.5, 3000))
+    assert summary["reason"] == "budget"
+    assert summary["measurements"] == 600
+
+
+def test_only_the_last_outcome_of_completed_treatments_counts(tmp_path):
+    path = str(tmp_path / "run.csv")
+    # Saved, then interrupted before its marker: rerun and saved again.
+    for worker, n in (("w0", 10), ("w1", 20), ("w0", 30)):
+        save_sampling(path, "REST|simple", {"worker_id": worker, "measurements": n})
+    save_sampling(path, "GraphQL|simple", {"worker_id": "w0", "measurements": 40})
+    with ResultWriter(path, ["x"]) as writer:
+        writer.mark_done("REST|simple")
+    assert [(e["worker_id"], e["measurements"]) for e in load_sampling(path)] == [("w1", 20), ("w0", 30)]
@@ -0,0 +1,52 @@
+import time
+from collections import Counter
+
+import pytest
+
+from src.configs.config import config
+from src.collectors.async_collector import run_treatment_async
+
+
+class _Rows:
+    def __init__(self):
+        self.rows = []
+
+    def writerow(self, rec):
+        self.rows.append(rec)
+
+
+@pytest.fixture
+def slow_api(serve_api, monkeypatch):
+    for key, value in {"repetitions": 2, "request_interval": 0.0, "warmup_requests": 1,
+                       "load_model": "closed", "progress_bars": False}.items():
+        monkeypatch.setitem(config["experiment"], key, value)
+    return serve_api({"latency_ms": 50.0, "latency_jitter_ms": 0.0})
+
+
+@pytest.mark.parametrize("api,query", [("REST", "simple"), ("GraphQL", "simple"), ("REST", "aggregated")])
+def test_clients_share_one_loop(slow_api, api, query):
+    sink = _Rows()
+    started = time.perf_counter()
+    result = run_treatment_async(sink, api, query, 4, "cold")
+    elapsed = time.perf_counter() - started
+
+    assert set(result) == {"overhead", "sampling"}
+    assert len(sink.rows) == 4 * 2
+    assert all(r["api_type"] == api and r["concurrent_clients"] == 4 for r in sink.rows)
+    assert {r["status_code"] for r in sink.rows} == {200}
+    # Four clients in flight at once: well under the 8 sequential round trips.
+    assert elapsed < 8 * 0.05
+
+
+def test_warm_cache_and_open_loop(slow_api, monkeypatch):
+    monkeypatch.setitem(config["experiment"], "load_model", "open")
+    monkeypatch.setitem(config["experiment"], "arrival_rate", 200.0)
+    sink = _Rows()
+    ready = []
+    run_treatment_async(sink, "REST", "simple", 2, "warm", on_ready=lambda: ready.append(True))
+
+    assert ready == [True]
+    # Warmup requests are not recorded; the shared cache revalidates the rest.
+    assert len(sink.rows) == 2 * 2
+    assert Counter(r["cache_result"] for r in sink.rows) == {"revalidated": 4}
+    assert all(r["intended_send_ts"] <= r["actual_send_ts"] for r in sink.rows)
@@ -0,0 +1,34 @@
+import json
+import subprocess
+import sys
+
+HEAVY = ("pandas", "scipy", "matplotlib", "seaborn", "pyarrow", "aiohttp")
+# Generous wall-clock bound for importing the CLI and the collection path.
+IMPORT_BUDGET_S = 1.5
+
+
+def _probe(code: str) -> dict:
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True,
+                         text=True, check=True)
+    return json.loads(out.stdout)
+
+
+def test_collect_path_imports_no_scientific_stack_and_stays_within_budget():
+    result = _probe(
+        "import json, sys, time\n"
+        "t = time.perf_counter()\n"
+        "import src.main, src.collectors.collector\n"
+        "elapsed = time.perf_counter() - t\n"
+        f"print(json.dumps({{'elapsed': elapsed, 'heavy': [m for m in {HEAVY!r} if m in sys.modules]}}))\n"
+    )
+    assert result["heavy"] == []
+    assert result["elapsed"] < IMPORT_BUDGET_S
+
+
+def test_importing_analysis_creates_no_directories(tmp_path):
+    out = subprocess.run(
+        [sys.executable, "-c", "import src.analyzers.analyze_results, src.analyzers.plot_results, os; print(os.listdir('.'))"],
+        capture_output=True, text=True, check=True, cwd=tmp_path,
+        env={"PYTHONPATH": str(__import__("pathlib").Path(__file__).resolve().parents[1])},
+    )
+    assert out.stdout.strip() == "[]"
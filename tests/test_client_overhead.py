@@ -0,0 +1,45 @@
+import time
+
+from src.configs.config import config
+from src.collectors.client_overhead import OverheadMonitor, load_overhead, save_overhead
+from src.collectors.result_writer import ResultWriter
+
+
+def test_time_outside_http_is_flagged(tmp_path):
+    monitor = OverheadMonitor(config["client_monitor"])
+    monitor.start()
+    for _ in range(5):
+        # 30 ms of client work around a 20 ms request.
+        monitor.add(time.perf_counter() - 0.05, 20.0)
+    summary = monitor.stop()
+
+    assert summary["measurements"] == 5
+    assert 25 <= summary["outside_http_p50_ms"] <= 40
+    assert summary["flagged"]
+    assert any("outside HTTP" in r for r in summary["reasons"])
+
+    results = str(tmp_path / "experiment.csv")
+    save_overhead(results, "REST|simple|1|cold|reuse|full", {"worker_id": "", **summary})
+    assert load_overhead(results)[0]["treatment"] == "REST|simple|1|cold|reuse|full"
+
+
+def test_busy_client_reports_cpu():
+    monitor = OverheadMonitor({**config["client_monitor"], "max_cpu_percent": 50.0})
+    monitor.start()
+    deadline = time.perf_counter() + 0.2
+    while time.perf_counter() < deadline:
+        pass
+    summary = monitor.stop()
+    assert summary["cpu_percent"] > 50.0
+    assert summary["flagged"]
+
+
+def test_only_the_last_report_of_completed_treatments_counts(tmp_path):
+    path = str(tmp_path / "run.csv")
+    # Saved, then interrupted before its marker: rerun and saved again.
+    save_overhead(path, "REST|simple", {"worker_id": "", "measurements": 1})
+    save_overhead(path, "REST|simple", {"worker_id": "", "measurements": 2})
+    save_overhead(path, "GraphQL|simple", {"worker_id": "", "measurements": 3})
+    with ResultWriter(path, ["x"]) as writer:
+        writer.mark_done("REST|simple")
+    assert [e["measurements"] for e in load_overhead(path)] == [2]
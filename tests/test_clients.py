@@ -0,0 +1,217 @@
+import asyncio
+import gzip
+import json
+import threading
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+
+from src.configs import clients
+from src.configs.clients import ClientRegistry, GraphQLClientWrapper, RestClient, fanout_width, header_bytes, prepare_query
+from src.configs.config import config
+from src.configs.queries import rest_queries
+from src.configs.request_generators import build_record
+
+BODY = json.dumps({"items": ["x" * 40] * 100}).encode()
+GRAPHQL_ERRORS = b'{"data":null,"errors":[{"message":"boom"}]}'
+HTML_PAGE = b"<html><body><h1>502 Bad Gateway</h1></body></html>"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.startswith("/html/"):
+            # An error page from a proxy in front of the API: /html/<status>.
+            self.send_response(int(self.path.rsplit("/", 1)[1]))
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", str(len(HTML_PAGE)))
+            self.end_headers()
+            self.wfile.write(HTML_PAGE)
+            return
+        raw = gzip.compress(BODY)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Encoding", "gzip")
+        if self.path == "/chunked":
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for i in range(0, len(raw), 16):
+                part = raw[i:i + 16]
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(part), part))
+            self.wfile.write(b"0\r\n\r\n")
+        else:
+            self.send_header("Content-Length", str(len(raw)))
+            self.end_headers()
+            self.wfile.write(raw)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(GRAPHQL_ERRORS)))
+        self.end_headers()
+        self.wfile.write(GRAPHQL_ERRORS)
+
+
+@pytest.fixture
+def local_api(serve_api, monkeypatch):
+    monkeypatch.setitem(config["rate_limit"], "query_cost", False)
+    return serve_api(handler=_Handler)
+
+
+@pytest.mark.parametrize("path", ["/fixed", "/chunked"])
+def test_wire_bytes_are_the_compressed_body(local_api, path):
+    result = RestClient().make_request(path)
+    assert result["success"]
+    assert result["payloadSize"] == len(BODY)
+    assert result["wireBytes"] == len(gzip.compress(BODY))
+
+
+def test_non_json_bodies_give_error_results(local_api, monkeypatch):
+    monkeypatch.setitem(config["http"], "parse_json", True)
+    client = RestClient()
+    single = client.make_request("/html/502")
+    aggregated = client.make_aggregated_request(["/fixed", "/html/200"])
+    for result in (single, aggregated):
+        assert not result["success"] and result["statusCode"] == 0
+    assert aggregated["fanout"] == client.fanout_strategy
+    rec = build_record("REST", "simple", 1, "cold", single)
+    assert (rec["status_code"], rec["payload_size_bytes"]) == (0, 0)
+
+
+def test_non_json_bodies_give_error_results_async(local_api, monkeypatch):
+    pytest.importorskip("aiohttp")
+    from src.configs.async_clients import AsyncRestClient
+    monkeypatch.setitem(config["http"], "parse_json", True)
+
+    async def run():
+        client = AsyncRestClient()
+        try:
+            return [await client.make_request("/html/502"),
+                    await client.make_aggregated_request(["/fixed", "/html/200"])]
+        finally:
+            await client.close()
+
+    for result in asyncio.run(run()):
+        assert not result["success"] and result["statusCode"] == 0
+
+
+def test_graphql_errors_found_without_decoding(local_api):
+    result = GraphQLClientWrapper().make_request("{ viewer { login } }")
+    assert result["statusCode"] == 0 and not result["success"]
+    assert result["payloadSize"] == result["wireBytes"] == len(GRAPHQL_ERRORS)
+    assert "data" not in result
+
+
+def test_header_bytes_count_status_line_and_headers():
+    # "HTTP/1.1 200 OK\r\n" + "A: b\r\n" + "\r\n"
+    assert header_bytes("HTTP/1.1 200 OK", [("A", "b")]) == 17 + 6 + 2
+
+
+def test_queries_are_parsed_once(monkeypatch):
+    parsed, real_parse = [], clients.parse
+
+    def parse(query):
+        parsed.append(query)
+        return real_parse(query)
+
+    monkeypatch.setattr(clients, "_prepared", {})
+    monkeypatch.setattr(clients, "parse", parse)
+    monkeypatch.setitem(config["rate_limit"], "query_cost", False)
+    query = "{ viewer { login } }"
+    first = prepare_query(query)
+    assert prepare_query(query) is first and parsed == [query]
+    # The cost field makes a different document, prepared (and parsed) separately.
+    monkeypatch.setitem(config["rate_limit"], "query_cost", True)
+    assert prepare_query(query) is not first and len(parsed) == 2
+
+
+def test_persisted_queries_are_rejected_against_github(monkeypatch):
+    monkeypatch.setitem(config["github"], "target", "github")
+    with pytest.raises(ValueError, match="persisted"):
+        GraphQLClientWrapper(query_mode="persisted")
+
+
+@pytest.fixture
+def slow_mock(serve_api):
+    return serve_api({"latency_ms": 30.0, "latency_jitter_ms": 0.0})
+
+
+def test_fanout_width_per_strategy(monkeypatch):
+    monkeypatch.setitem(config["http"], "fanout_concurrency", 2)
+    assert fanout_width("sequential", 3) == 1
+    assert fanout_width("parallel", 3) == 3
+    assert fanout_width("bounded", 3) == 2 and fanout_width("bounded", 1) == 1
+    with pytest.raises(ValueError):
+        fanout_width("eager", 3)
+
+
+@pytest.mark.parametrize("strategy", ["sequential", "parallel", "bounded"])
+def test_aggregated_fanout_records_subrequests(slow_mock, monkeypatch, strategy):
+    monkeypatch.setitem(config["http"], "fanout_strategy", strategy)
+    urls = rest_queries["aggregated"]["urls"]
+    client = RestClient(pool_maxsize=1)
+    try:
+        result = client.make_aggregated_request(urls)
+    finally:
+        client.close()
+    assert result["success"] and result["fanout"] == strategy
+    subrequests = result["subrequestTimes"]
+    assert len(subrequests) == len(urls) and min(subrequests) >= 30.0
+    if strategy == "sequential":
+        assert result["responseTime"] >= sum(subrequests)
+    else:
+        # Overlapping sub-requests: the call takes less than their sum.
+        assert result["responseTime"] < sum(subrequests)
+    rec = build_record("REST", "aggregated", 1, "cold", result)
+    assert rec["fanout_strategy"] == strategy
+    assert [float(t) for t in rec["subrequest_ms"].split(";")] == [round(t, 3) for t in subrequests]
+
+
+def test_wider_fanout_closes_the_replaced_pool(slow_mock, monkeypatch):
+    monkeypatch.setitem(config["http"], "fanout_strategy", "parallel")
+    client = RestClient(pool_maxsize=1)
+    try:
+        client.make_request(rest_queries["simple"]["url"])
+        old = client.session.adapters["http://"]
+        assert old.poolmanager.pools
+        client.make_aggregated_request(rest_queries["aggregated"]["urls"])
+        assert client.session.adapters["http://"] is not old
+        assert not old.poolmanager.pools
+    finally:
+        client.close()
+
+
+def test_reuse_registry_keeps_one_client_per_thread():
+    registry = ClientRegistry("reuse")
+    try:
+        client = registry.rest()
+        assert registry.rest() is client and registry.graphql() is registry.graphql()
+        assert client.session.headers["Connection"] == "keep-alive"
+        other = []
+        worker = threading.Thread(target=lambda: other.append(registry.rest()))
+        worker.start()
+        worker.join()
+        assert other[0] is not client
+        registry.release(client)
+        assert registry.rest() is client
+    finally:
+        registry.close()
+    assert registry._clients == []
+
+
+def test_fresh_registry_closes_each_client(slow_mock):
+    registry = ClientRegistry("fresh")
+    client = registry.rest()
+    assert registry.rest() is not client
+    assert client.session.headers["Connection"] == "close"
+    assert client.make_request(rest_queries["simple"]["url"])["success"]
+    adapter = client.session.adapters["http://"]
+    assert adapter.poolmanager.pools
+    registry.release(client)
+    assert not adapter.poolmanager.pools
+    assert registry._clients == []
@@ -0,0 +1,70 @@
+import threading
+from collections import Counter
+
+import pytest
+
+from src.configs.config import config
+from src.collectors.distributed import Coordinator, cluster_key, run_worker, split_clients
+from src.servers.mock_github import start_in_thread
+
+
+class _Rows:
+    def __init__(self):
+        self.rows = []
+
+    def writerow(self, rec):
+        self.rows.append(rec)
+
+
+def test_split_clients():
+    assert split_clients(10, 3) == [4, 3, 3]
+    assert split_clients(1, 4) == [1]
+    assert sum(split_clients(50, 7)) == 50
+
+
+def test_cluster_key_is_required_for_remote_workers():
+    local = {"authkey": "", "spawn_local": True, "host": "127.0.0.1"}
+    assert len(cluster_key(local)) == 64 and cluster_key(local) != cluster_key(local)
+    assert cluster_key({**local, "authkey": "k"}) == "k"
+    with pytest.raises(ValueError, match="GVR_CLUSTER_KEY"):
+        cluster_key({**local, "host": "0.0.0.0"})
+    with pytest.raises(ValueError, match="GVR_CLUSTER_KEY"):
+        cluster_key({**local, "spawn_local": False})
+
+
+def test_treatment_is_split_and_merged(monkeypatch):
+    server = start_in_thread({"port": 0, "latency_ms": 1.0, "latency_jitter_ms": 0.0})
+    host, port = server.server_address[:2]
+    monkeypatch.setitem(config["github"], "target", "mock")
+    monkeypatch.setitem(config["mock_server"], "host", host)
+    monkeypatch.setitem(config["mock_server"], "port", port)
+    for key, value in {"repetitions": 2, "request_interval": 0.0, "warmup_requests": 1,
+                       "engine": "threads", "load_model": "closed", "progress_bars": True}.items():
+        monkeypatch.setitem(config["experiment"], key, value)
+    settings = {**config["distributed"], "workers": 2, "spawn_local": False,
+                "port": 0, "connect_timeout_s": 10.0, "authkey": "test-key"}
+
+    coordinator = Coordinator(settings)
+    workers = [threading.Thread(target=run_worker, args=(coordinator.address, f"w{i}", b"test-key"), daemon=True)
+               for i in range(2)]
+    for w in workers:
+        w.start()
+    try:
+        coordinator.start()
+        sink = _Rows()
+        coordinator.run_treatment(sink, {"api": "REST", "qt": "simple", "cc": 3,
+                                         "cs": "warm", "cm": "reuse", "qm": "full"})
+    finally:
+        coordinator.close()
+        server.shutdown()
+        server.server_close()
+    for w in workers:
+        w.join(5)
+
+    # Warmup requests are not recorded; each client does `repetitions` measurements.
+    per_worker = Counter(r["worker_id"] for r in sink.rows)
+    assert set(per_worker) == {"w0", "w1"}
+    assert sorted(per_worker.values()) == [2, 4]
+    assert all(r["concurrent_clients"] == 3 for r in sink.rows)
+    # Every worker warmed its own client cache, so all measurements revalidate.
+    assert {(r["status_code"], r["cache_result"]) for r in sink.rows} == {(304, "revalidated")}
@@ -0,0 +1,30 @@
+import numpy as np
+
+from src.analyzers.analyze_results import cliffs_delta, cliffs_delta_ci
+
+
+def _pairwise_delta(a, b):
+    gt = sum(x > y for x in a for y in b)
+    lt = sum(x < y for x in a for y in b)
+    return (gt - lt) / (len(a) * len(b))
+
+
+def test_cliffs_delta_matches_pairwise_definition_with_ties():
+    rng = np.random.default_rng(0)
+    a = rng.integers(0, 20, 300).astype(float)
+    b = rng.integers(3, 25, 250).astype(float)
+    assert np.isclose(cliffs_delta(a, b), _pairwise_delta(a, b))
+
+
+def test_cliffs_delta_extremes():
+    assert cliffs_delta(np.array([5.0, 6.0]), np.array([1.0, 2.0])) == 1.0
+    assert cliffs_delta(np.array([1.0]), np.array([1.0, 1.0])) == 0.0
+
+
+def test_bootstrap_interval_brackets_point_estimate():
+    rng = np.random.default_rng(1)
+    a = rng.normal(110, 10, 400)
+    b = rng.normal(100, 10, 500)
+    low, high = cliffs_delta_ci(a, b, resamples=500)
+    assert low < cliffs_delta(a, b) < high
+    assert 0 < low and high < 1
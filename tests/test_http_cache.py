@@ -0,0 +1,101 @@
+import asyncio
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+
+from src.configs.config import config
+from src.configs.clients import RestClient, GraphQLClientWrapper
+from src.configs.http_cache import ResponseCache
+from src.configs.queries import rest_queries, graphql_queries
+
+GRAPHQL_DATA = b'{"data":{"viewer":{"login":"octocat"}}}'
+
+
+class _NoValidators(BaseHTTPRequestHandler):
+    """Answers every GraphQL POST without ETag or Last-Modified, as GitHub does."""
+    protocol_version = "HTTP/1.1"
+    posts = 0
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        type(self).posts += 1
+        self.rfile.read(int(self.headers["Content-Length"]))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(GRAPHQL_DATA)))
+        self.end_headers()
+        self.wfile.write(GRAPHQL_DATA)
+
+
+def test_lru_evicts_least_recently_used():
+    cache = ResponseCache(max_entries=2)
+    for key in ("a", "b"):
+        cache.store(key, b"{}", 2, {"ETag": '"x"'})
+    cache.lookup("a")
+    cache.store("c", b"{}", 2, {"ETag": '"y"'})
+    assert cache.lookup("b")[0] is None and cache.lookup("a")[0] is not None
+    # Without validators or a max age an entry could never be reused.
+    cache.store("d", b"{}", 2, {})
+    assert cache.lookup("d")[0] is None
+    cache.store("e", b"{}", 2, {}, unvalidated_max_age_s=60)
+    assert cache.lookup("e")[1]
+
+
+def test_rest_revalidates_with_etag(mock_api):
+    client = RestClient(cache=ResponseCache())
+    url = rest_queries["simple"]["url"]
+    first, second = client.make_request(url), client.make_request(url)
+    assert (first["statusCode"], first["cacheResult"]) == (200, "miss")
+    assert (second["statusCode"], second["cacheResult"]) == (304, "revalidated")
+    assert second["payloadSize"] == first["payloadSize"]
+    assert second["cacheSavedBytes"] == first["wireBytes"]
+    assert second["data"] == first["data"]
+
+    client.make_aggregated_request(rest_queries["aggregated"]["urls"])
+    agg = client.make_aggregated_request(rest_queries["aggregated"]["urls"])
+    assert agg["cacheResult"] == "revalidated" and agg["cacheSavedBytes"] > 0
+
+
+def test_graphql_response_cache(mock_api):
+    client = GraphQLClientWrapper(cache=ResponseCache(max_age_s=60))
+    first = client.make_request(graphql_queries["simple"])
+    second = client.make_request(graphql_queries["simple"])
+    assert first["cacheResult"] == "miss"
+    # Fresh entry: answered without a request.
+    assert second["cacheResult"] == "hit" and second["wireBytes"] == 0
+    assert second["data"] == first["data"]
+
+    revalidating = GraphQLClientWrapper(cache=ResponseCache())
+    revalidating.make_request(graphql_queries["nested"])
+    assert revalidating.make_request(graphql_queries["nested"])["statusCode"] == 304
+
+
+def test_async_rest_revalidates(mock_api):
+    pytest.importorskip("aiohttp")
+    from src.configs.async_clients import AsyncRestClient
+
+    async def run():
+        client = AsyncRestClient(cache=ResponseCache())
+        try:
+            url = rest_queries["nested"]["url"]
+            return await client.make_request(url), await client.make_request(url)
+        finally:
+            await client.close()
+
+    first, second = asyncio.run(run())
+    assert (second["statusCode"], second["cacheResult"]) == (304, "revalidated")
+    assert second["payloadSize"] == first["payloadSize"]
+
+
+@pytest.mark.parametrize("max_age_s,second", [(60.0, "hit"), (0.0, "miss")])
+def test_graphql_without_validators_uses_its_max_age(serve_api, monkeypatch, max_age_s, second):
+    monkeypatch.setitem(config["http_cache"], "graphql_max_age_s", max_age_s)
+    monkeypatch.setitem(config["rate_limit"], "query_cost", False)
+    monkeypatch.setattr(_NoValidators, "posts", 0)
+    serve_api(handler=_NoValidators)
+    client = GraphQLClientWrapper(cache=ResponseCache())
+    results = [client.make_request("{ viewer { login } }") for _ in range(2)]
+    assert [r["cacheResult"] for r in results] == ["miss", second]
+    assert _NoValidators.posts == (1 if second == "hit" else 2)
@@ -0,0 +1,40 @@
+import requests
+
+from src.configs.clients import RestClient
+from src.configs.config import github_endpoints
+from src.configs.http_timing import TimedHTTPAdapter, timed_request
+from src.configs.queries import rest_queries
+from src.configs.request_generators import build_record
+
+
+def test_setup_phases_only_on_a_new_connection(serve_api):
+    serve_api({"latency_ms": 20.0, "latency_jitter_ms": 0.0})
+    session = requests.Session()
+    session.mount("http://", TimedHTTPAdapter(pool_maxsize=1))
+    url = github_endpoints()[0] + rest_queries["simple"]["url"]
+    try:
+        _, fresh, wire = timed_request(session, "GET", url)
+        _, reused, _ = timed_request(session, "GET", url)
+    finally:
+        session.close()
+
+    assert wire > 0
+    assert fresh["dns"] > 0 and fresh["connect"] > 0 and fresh["download"] > 0
+    # The mock's latency is spent between sending and the response headers.
+    assert fresh["ttfb"] >= 20.0 and reused["ttfb"] >= 20.0
+    assert reused["dns"] == reused["connect"] == 0.0
+    # Plain HTTP: no handshake on either connection.
+    assert fresh["tls"] == reused["tls"] == 0.0
+
+
+def test_phases_reach_the_record(serve_api):
+    serve_api()
+    client = RestClient(pool_maxsize=1)
+    try:
+        first, second = [client.make_request(rest_queries["simple"]["url"]) for _ in range(2)]
+    finally:
+        client.close()
+    cold = build_record("REST", "simple", 1, "cold", first)
+    warm = build_record("REST", "simple", 1, "cold", second)
+    assert cold["connect_ms"] > 0 and cold["ttfb_ms"] > 0
+    assert warm["connect_ms"] == warm["tls_ms"] == 0.0
@@ -0,0 +1,57 @@
+import threading
+
+from src.collectors.latency_histograms import (
+    HistogramRecorder,
+    load_histograms,
+    percentile_rows,
+    save_histogram,
+)
+from src.collectors.result_writer import ResultWriter
+
+
+class _ListWriter:
+    def __init__(self):
+        self.rows = []
+
+    def writerow(self, rec):
+        self.rows.append(rec)
+
+
+def test_recorder_merges_threads_and_runs(tmp_path):
+    writer = _ListWriter()
+    recorder = HistogramRecorder(writer)
+
+    def client(offset):
+        for i in range(1, 1001):
+            recorder.writerow({"response_time_ms": offset + i / 10})
+    threads = [threading.Thread(target=client, args=(k * 100,)) for k in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    hist = recorder.merged()
+    assert hist.total == len(writer.rows) == 4000
+    assert abs(hist.quantile(1.0) / 1000 - 400.0) < 0.4
+
+    runs = [str(tmp_path / "a.csv"), str(tmp_path / "b.csv")]
+    for run in runs:
+        save_histogram(run, "REST|simple", hist)
+    merged = load_histograms(*runs)
+    assert merged["REST|simple"].total == 8000
+    row = percentile_rows(merged)[0]
+    assert row["count"] == 8000 and abs(row["p50_ms"] - 200.0) < 0.2
+
+
+def test_only_the_last_histogram_of_completed_treatments_counts(tmp_path):
+    path = str(tmp_path / "run.csv")
+    recorder = HistogramRecorder(_ListWriter())
+    recorder.writerow({"response_time_ms": 1.0})
+    once = recorder.merged()
+    # Saved, then interrupted before its marker: rerun and saved again.
+    save_histogram(path, "REST|simple", once)
+    save_histogram(path, "REST|simple", once)
+    save_histogram(path, "GraphQL|simple", once)
+    with ResultWriter(path, ["x"]) as writer:
+        writer.mark_done("REST|simple")
+    merged = load_histograms(path)
+    assert list(merged) == ["REST|simple"] and merged["REST|simple"].total == 1
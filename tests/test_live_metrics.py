@@ -0,0 +1,73 @@
+import threading
+import urllib.request
+
+import pytest
+
+from src.configs.config import config
+from src.collectors import live_metrics
+from src.collectors.collector import _run_treatment
+
+
+class _Rows:
+    def __init__(self):
+        self.rows = []
+
+    def writerow(self, rec):
+        self.rows.append(rec)
+
+
+def _rec(api, ms, status=200):
+    return {"api_type": api, "query_type": "simple",
+            "response_time_ms": ms, "status_code": status}
+
+
+def test_render_counts_and_rolling_quantiles():
+    metrics = live_metrics.LiveMetrics(window_s=60)
+
+    def client():
+        for i in range(1000):
+            metrics.observe(_rec("REST", float(i % 100), 502 if i % 10 == 0 else 200))
+    threads = [threading.Thread(target=client) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    text = metrics.render()
+    assert 'gvr_requests_total{api_type="REST",query_type="simple"} 8000' in text
+    assert 'gvr_request_errors_total{api_type="REST",query_type="simple"} 800' in text
+    assert 'gvr_error_rate{api_type="REST",query_type="simple"} 0.1000' in text
+    assert 'gvr_response_time_ms{api_type="REST",query_type="simple",quantile="0.5"} 49.500' in text
+    assert 'gvr_response_time_ms_sum{api_type="REST",query_type="simple"} 396000.000' in text
+    assert 'gvr_response_time_ms_count{api_type="REST",query_type="simple"} 8000' in text
+
+
+def test_endpoint_serves_prometheus_text():
+    server = live_metrics.start_server(
+        {"enabled": True, "host": "127.0.0.1", "port": 0, "window_s": 30})
+    try:
+        live_metrics.observe(_rec("GraphQL", 12.0))
+        live_metrics.set_treatment({"api": "GraphQL", "qt": "simple"}, 3, 36)
+        port = server.server_address[1]
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as resp:
+            body = resp.read().decode()
+        assert resp.headers["Content-Type"].startswith("text/plain")
+        assert 'gvr_requests_total{api_type="GraphQL",query_type="simple"} 1' in body
+        assert "gvr_treatments_completed 3" in body
+        assert 'gvr_current_treatment{api="GraphQL",qt="simple"} 1' in body
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.mark.parametrize("engine", ["threads", "asyncio"])
+def test_warmup_requests_are_not_observed(serve_api, monkeypatch, engine):
+    serve_api()
+    for key, value in {"repetitions": 2, "request_interval": 0.0, "warmup_requests": 3,
+                       "engine": engine, "load_model": "closed", "progress_bars": False}.items():
+        monkeypatch.setitem(config["experiment"], key, value)
+    metrics = live_metrics.LiveMetrics(window_s=60)
+    monkeypatch.setattr(live_metrics, "METRICS", metrics)
+    sink = _Rows()
+    _run_treatment(sink, "REST", "simple", 2, "warm")
+    assert len(sink.rows) == 4
+    assert 'gvr_requests_total{api_type="REST",query_type="simple"} 4' in metrics.render()
@@ -0,0 +1,41 @@
+import pytest
+
+from src.configs.clients import RestClient, GraphQLClientWrapper
+from src.configs.queries import rest_queries, graphql_queries
+
+
+def test_rest_queries_are_served(mock_api):
+    client = RestClient()
+    simple = client.make_request(rest_queries["simple"]["url"])
+    assert simple["statusCode"] == 200
+    assert simple["data"]["full_name"] == "facebook/react"
+    assert simple["wireBytes"] < simple["payloadSize"]
+
+    nested = client.make_request(rest_queries["nested"]["url"])
+    assert len(nested["data"]) == 10
+    assert all(i["state"] == "open" for i in nested["data"])
+
+    agg = client.make_aggregated_request(rest_queries["aggregated"]["urls"])
+    repo, contributors, languages = agg["data"]
+    assert len(contributors) == 5 and "JavaScript" in languages
+
+
+@pytest.mark.parametrize("query_type", ["simple", "nested", "aggregated"])
+def test_graphql_queries_execute(mock_api, query_type):
+    result = GraphQLClientWrapper().make_request(graphql_queries[query_type])
+    assert result["success"], result.get("error")
+    assert result["data"]["repository"]["name"] == "react"
+
+
+def test_persisted_query_is_registered_once(mock_api):
+    client = GraphQLClientWrapper(query_mode="persisted")
+    first = client.make_request(graphql_queries["simple"])
+    second = client.make_request(graphql_queries["simple"])
+    assert first["success"] and second["success"]
+    assert second["requestBytes"] < first["requestBytes"]
+
+
+def test_injected_errors(mock_api):
+    mock_api.settings["error_rate"] = 1.0
+    result = RestClient().make_request(rest_queries["simple"]["url"])
+    assert result["statusCode"] == 502
@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+
+from src.analyzers.plot_results import (
+    FIGURES,
+    compute_aggregates,
+    generate_all_plots,
+    load_data,
+)
+
+
+def _frame(n=400):
+    rng = np.random.default_rng(0)
+    start = pd.Timestamp("2026-01-01", tz="UTC")
+    return pd.DataFrame({
+        "timestamp": [(start + pd.Timedelta(seconds=i / 10)).isoformat() for i in range(n)],
+        "api_type": rng.choice(["REST", "GraphQL"], n),
+        "query_type": "simple",
+        "cache_state": rng.choice(["cold", "warm"], n),
+        "concurrent_clients": 10,
+        "response_time_ms": rng.gamma(3, 30, n),
+        "payload_size_bytes": rng.integers(100, 9000, n),
+        "status_code": rng.choice([200, 502], n, p=[0.9, 0.1]),
+    })
+
+
+def test_aggregates_are_consistent_with_raw_rows(tmp_path):
+    path = tmp_path / "run.csv"
+    _frame().to_csv(path, index=False)
+    df = load_data(path)
+    agg = compute_aggregates(df)
+    for api, per_sec in agg["throughput"].items():
+        assert per_sec.sum() == (df["api_type"] == api).sum()
+        assert agg["ecdf"][api][1][-1] == 1.0
+    assert agg["success_rate"]["is_success"].between(0, 1).all()
+
+
+def test_all_figures_rendered_in_process_pool(tmp_path):
+    path = tmp_path / "run.csv"
+    _frame().to_csv(path, index=False)
+    out = tmp_path / "plots"
+    generate_all_plots(str(path), str(out), workers=2)
+    assert sorted(p.stem for p in out.glob("*.png")) == sorted(FIGURES)
@@ -0,0 +1,68 @@
+import time
+
+import pytest
+
+from src.configs.config import config
+from src.configs.clients import GraphQLClientWrapper, RestClient
+from src.configs.queries import graphql_queries, rest_queries
+from src.configs.rate_limit import RateLimiter, TokenBucket, rate_limit_info
+from src.configs.request_generators import build_record
+
+
+@pytest.fixture
+def limited_api(serve_api):
+    return serve_api({"rate_limit": 3})
+
+
+def test_token_bucket_refills_at_its_rate():
+    bucket = TokenBucket(rate=10.0, capacity=2)
+    now = time.monotonic()
+    for _ in range(2):
+        assert bucket.wait_time(1, now) == 0.0
+        bucket.take(1)
+    assert bucket.wait_time(1, now) == pytest.approx(0.1)
+    assert bucket.wait_time(1, now + 0.1) == pytest.approx(0.0)
+    # Dearer than the whole bucket: goes once the bucket is full.
+    assert bucket.wait_time(5, now) == pytest.approx(0.2)
+
+
+def test_limiter_paces_remaining_budget_and_holds_after_rejection():
+    settings = {**config["rate_limit"], "reserve_remaining": 10, "burst": 1}
+    limiter = RateLimiter(settings, secondary=False)
+    assert limiter.try_acquire("core", 1) == 0.0
+    # 20 left, 10 in reserve, 10 s to the reset: one request per second.
+    limiter.observe("core", {"remaining": 20, "reset": time.time() + 10, "resource": "core"})
+    assert limiter.try_acquire("core", 1) == 0.0
+    assert limiter.try_acquire("core", 1) == pytest.approx(1.0, abs=0.1)
+    limiter.observe("graphql", {"limited": True, "retryAfter": 5.0})
+    assert limiter.try_acquire("graphql", 1) == pytest.approx(5.0, abs=0.1)
+
+
+def test_limiter_tolerates_a_missing_reset():
+    limiter = RateLimiter({**config["rate_limit"], "reserve_remaining": 0}, secondary=False)
+    limiter.observe("core", rate_limit_info(200, {"X-RateLimit-Remaining": "30"}))
+    limiter.observe("core", rate_limit_info(200, {"X-RateLimit-Remaining": "20"}))
+    assert limiter._resources["core"].remaining == 20
+    assert limiter.try_acquire("core", 1) == 0.0
+
+
+def test_rate_limited_responses_are_tagged(limited_api):
+    client = RestClient()
+    results = [client.make_request(rest_queries["simple"]["url"]) for _ in range(4)]
+    assert [r["rateLimit"]["remaining"] for r in results[:3]] == [2, 1, 0]
+    assert results[3]["statusCode"] == 403 and results[3]["rateLimit"]["limited"]
+    rec = build_record("REST", "simple", 1, "cold", results[3])
+    assert rec["rate_limited"] == 1 and rec["graphql_cost"] == ""
+
+
+def test_graphql_cost_is_recorded(limited_api, monkeypatch):
+    monkeypatch.setitem(config["rate_limit"], "query_cost", True)
+    result = GraphQLClientWrapper().make_request(graphql_queries["simple"])
+    assert result["success"] and result["graphqlCost"] == 1
+    assert result["rateLimit"]["resource"] == "graphql"
+    assert build_record("GraphQL", "simple", 1, "cold", result)["graphql_cost"] == 1
+
+
+def test_rate_limit_info_without_headers():
+    assert rate_limit_info(200, {}) == {}
+    assert rate_limit_info(429, {"Retry-After": "2"}) == {"limited": True, "retryAfter": 2.0}
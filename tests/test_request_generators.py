@@ -0,0 +1,49 @@
+import random
+
+from src.configs.config import config
+
+from src.configs.request_generators import (
+    arrival_offsets,
+    build_record,
+    get_arrival_rate,
+)
+
+
+def test_constant_arrivals_are_evenly_spaced():
+    assert arrival_offsets(4, 2.0) == [0.0, 0.5, 1.0, 1.5]
+
+
+def test_poisson_arrivals_are_increasing_with_expected_mean_gap():
+    offsets = arrival_offsets(2000, 50.0, "poisson", random.Random(1))
+    gaps = [b - a for a, b in zip(offsets, offsets[1:])]
+    assert all(g >= 0 for g in gaps)
+    assert abs(sum(gaps) / len(gaps) - 1 / 50.0) < 0.005
+
+
+def test_arrival_rate_per_load_level():
+    assert get_arrival_rate({1: 5, 10: 20}, 10) == 20.0
+
+
+def test_open_loop_record_charges_schedule_lag_to_latency():
+    result = {"responseTime": 10.0, "payloadSize": 5, "statusCode": 200,
+              "intendedSend": 100.0, "actualSend": 100.25}
+    rec = build_record("REST", "simple", 1, "cold", result)
+    assert rec["response_time_ms"] == 260.0
+    assert rec["intended_send_ts"] < rec["actual_send_ts"]
+
+
+def test_phase_columns_are_blank_when_not_measured():
+    result = {"responseTime": 5.0, "statusCode": 200,
+              "phases": {"dns": 1.0, "connect": 2.0, "ttfb": 1.5, "download": 0.5}}
+    rec = build_record("GraphQL", "nested", 1, "cold", result)
+    assert rec["dns_ms"] == 1.0 and rec["download_ms"] == 0.5
+    assert rec["tls_ms"] == "" and rec["query_parse_ms"] == ""
+
+
+def test_record_keeps_epoch_timestamps_until_written():
+    result = {"responseTime": 5.0, "statusCode": 200, "actualSend": 1_700_000_000.0}
+    rec = build_record("REST", "simple", 1, "cold", result)
+    assert rec["actual_send_ts"] == 1_700_000_000.0 and not hasattr(rec, "__dict__")
+    row = rec.as_row()
+    assert list(row) == config["output"]["csv_headers"]
+    assert row["actual_send_ts"] == "2023-11-14T22:13:20+00:00"
@@ -0,0 +1,50 @@
+import pytest
+
+from src.analyzers.result_loader import load_results
+from src.collectors.result_writer import ResultWriter
+from src.configs.config import config
+from src.configs.request_generators import build_record
+
+pytest.importorskip("pyarrow")
+
+HEADERS = config["output"]["csv_headers"]
+
+
+def _record(api, qt, cc, ms):
+    result = {"responseTime": ms, "payloadSize": 100, "statusCode": 200,
+              "actualSend": 1_700_000_000.0, "phases": {"ttfb": ms / 2}}
+    return build_record(api, qt, cc, "cold", result)
+
+
+def test_parquet_store_round_trip_with_partition_filters(tmp_path):
+    path = str(tmp_path / "run.parquet")
+    with ResultWriter(path, HEADERS, fmt="parquet") as writer:
+        for api in ("REST", "GraphQL"):
+            for cc in (1, 10):
+                for i in range(5):
+                    writer.writerow(_record(api, "nested", cc, 10.0 + i))
+                writer.mark_done(f"{api}|{cc}")
+
+    df = load_results(path)
+    assert len(df) == 20
+    assert str(df["api_type"].dtype) == "category"
+    assert str(df["timestamp"].dtype).startswith("datetime64")
+    assert df["dns_ms"].isna().all()
+
+    sub = load_results(path, columns=["api_type", "response_time_ms"],
+                       filters={"api_type": "REST", "concurrent_clients": 10})
+    assert list(sub.columns) == ["api_type", "response_time_ms"]
+    assert len(sub) == 5 and set(sub["api_type"]) == {"REST"}
+
+
+def test_parquet_resume_discards_interrupted_treatment(tmp_path):
+    path = str(tmp_path / "run.parquet")
+    writer = ResultWriter(path, HEADERS, fmt="parquet")
+    writer.writerow(_record("REST", "simple", 1, 5.0))
+    writer.mark_done("done")
+    writer.writerow(_record("GraphQL", "simple", 1, 5.0))
+    writer.close()
+
+    with ResultWriter(path, HEADERS, fmt="parquet") as writer:
+        assert writer.completed == {"done"}
+    assert list(load_results(path)["api_type"]) == ["REST"]
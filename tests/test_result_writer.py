@@ -0,0 +1,49 @@
+import csv
+import threading
+
+from src.collectors.result_writer import ResultWriter, read_markers
+
+FIELDS = ["client", "seq"]
+
+
+def _rows(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def test_concurrent_rows_are_not_interleaved(tmp_path):
+    path = str(tmp_path / "run.csv")
+    with ResultWriter(path, FIELDS, batch_size=7, flush_interval=0.05) as writer:
+        def client(n):
+            for i in range(200):
+                writer.writerow({"client": n, "seq": i})
+        threads = [threading.Thread(target=client, args=(n,))
+                   for n in range(20)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        writer.mark_done("REST|simple")
+    rows = _rows(path)
+    assert len(rows) == 4000
+    assert {(r["client"], r["seq"]) for r in rows} == {
+        (str(n), str(i)) for n in range(20) for i in range(200)}
+    assert read_markers(path)[0]["rows"] == 4000
+
+
+def test_resume_drops_rows_of_the_interrupted_treatment(tmp_path):
+    path = str(tmp_path / "run.csv")
+    writer = ResultWriter(path, FIELDS)
+    writer.writerow({"client": 0, "seq": 0})
+    writer.mark_done("done")
+    writer.writerow({"client": 1, "seq": 0})
+    writer.close()
+    # Simulate a crash that left a torn row behind.
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("1,")
+
+    with ResultWriter(path, FIELDS) as writer:
+        assert writer.completed == {"done"}
+        writer.writerow({"client": 2, "seq": 0})
+        writer.mark_done("again")
+    assert [r["client"] for r in _rows(path)] == ["0", "2"]
@@ -0,0 +1,36 @@
+from src.collectors import collector
+from src.collectors.result_writer import ResultWriter
+from src.collectors.run_manifest import latest_unfinished, load_manifest, save_manifest
+from src.configs.config import config
+
+
+def test_seed_fixes_the_treatment_order():
+    assert collector._generate_treatments(7) == collector._generate_treatments(7)
+    assert collector._generate_treatments(7) != collector._generate_treatments(8)
+
+
+def test_manifest_follows_the_markers_and_keeps_its_order(tmp_path, monkeypatch):
+    path = str(tmp_path / "experiment_a.csv")
+    monkeypatch.setitem(config["experiment"], "seed", None)
+    manifest = collector._open_manifest(path)
+    first = collector._treatment_key(manifest["treatments"][0])
+    with ResultWriter(path, ["x"]) as writer:
+        writer.writerow({"x": 1})
+        writer.writerow({"x": 2})
+        writer.mark_done(first)
+        # Interrupted: rows of the second treatment never get a marker.
+        writer.writerow({"x": 3})
+
+    assert latest_unfinished(str(tmp_path)) == path
+    monkeypatch.setitem(config["experiment"], "concurrent_clients", [2])
+    monkeypatch.setitem(config["experiment"], "repetitions", 3)
+    resumed = collector._open_manifest(path)
+    assert resumed["treatments"] == manifest["treatments"]
+    assert config["experiment"]["repetitions"] == manifest["design"]["repetitions"]
+    assert config["experiment"]["concurrent_clients"] == manifest["design"]["concurrent_clients"]
+    assert resumed["seed"] == manifest["seed"]
+    assert resumed["completed"] == {first: 2} and resumed["rows"] == 2
+
+    resumed["finished"] = 1.0
+    save_manifest(path, resumed)
+    assert load_manifest(path)["finished"] and latest_unfinished(str(tmp_path)) is None
@@ -0,0 +1,51 @@
+import itertools
+
+from src.collectors.stabilization import Stabilizer, TreatmentPipeline
+
+SETTINGS = {
+    "mode": "adaptive",
+    "fixed_s": 30.0,
+    "baseline_probes": 3,
+    "probe_interval_s": 0.0,
+    "window": 3,
+    "tolerance": 0.2,
+    "min_s": 0.0,
+    "max_s": 0.5,
+    "overlap_warmup": True,
+}
+
+
+def test_cooldown_waits_for_latency_to_return_to_baseline():
+    # REST recovers after a few slow probes; GraphQL stays slow.
+    rest = itertools.chain([10.0] * 3, [50.0, 40.0, None, 10.0, 11.0, 9.0], itertools.repeat(10.0))
+    probes = {"REST": rest, "GraphQL": itertools.chain([10.0] * 3, itertools.repeat(30.0))}
+    stabilizer = Stabilizer(SETTINGS, probe=lambda api: next(probes[api]))
+    stabilizer.measure_baselines(["REST", "GraphQL"])
+    assert stabilizer.baselines == {"REST": 10.0, "GraphQL": 10.0}
+
+    rest_cooldown = stabilizer.cool_down("REST")
+    rest_cooldown.wait()
+    assert rest_cooldown.reason == "settled"
+    graphql_cooldown = stabilizer.cool_down("GraphQL")
+    graphql_cooldown.wait()
+    assert graphql_cooldown.reason == "max_s" and graphql_cooldown.elapsed >= 0.5
+
+
+def test_pipeline_overlaps_warmup_only_across_apis():
+    stabilizer = Stabilizer({**SETTINGS, "mode": "fixed", "fixed_s": 0.2})
+    pipeline = TreatmentPipeline(stabilizer)
+    pipeline.start("REST")()
+    assert pipeline.finish("REST", more=True) is None
+
+    # GraphQL next: warmup runs during the cooldown, measuring waits for it.
+    on_ready = pipeline.start("GraphQL")
+    assert pipeline._overlapped
+    on_ready()
+    assert "overlapped" in pipeline.finish("GraphQL", more=True)
+
+    # GraphQL again: the same API waits for its cooldown before starting.
+    pipeline.start("GraphQL")()
+    assert not pipeline._overlapped
+    pipeline.finish("GraphQL", more=False)
+    # Two fixed 0.2 s pauses and no warmups: nothing overlapped to save.
+    assert abs(pipeline.idle - 0.4) < 0.1 and abs(pipeline.saved()) < 0.1
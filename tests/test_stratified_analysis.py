@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+
+from src.analyzers.analyze_results import _stratified, adjust_pvalues
+
+
+def test_holm_and_bh_adjustment():
+    p = [0.01, 0.04, np.nan, 0.03]
+    assert np.allclose(adjust_pvalues(p, "holm"), [0.03, 0.06, np.nan, 0.06], equal_nan=True)
+    assert np.allclose(adjust_pvalues(p, "fdr_bh"), [0.03, 0.04, np.nan, 0.04], equal_nan=True)
+
+
+def test_one_row_per_cell_and_metric():
+    rng = np.random.default_rng(0)
+    frames = []
+    for qt, shift in (("simple", 0.0), ("nested", 30.0)):
+        for api, extra in (("REST", shift), ("GraphQL", 0.0)):
+            frames.append(pd.DataFrame({
+                "api_type": api, "query_type": qt, "cache_state": "cold",
+                "concurrent_clients": 10,
+                "response_time_ms": rng.normal(100 + extra, 5, 60),
+                "payload_size_bytes": rng.integers(900, 1100, 60),
+            }))
+    table = _stratified(pd.concat(frames), ["response_time_ms", "payload_size_bytes"])
+    assert len(table) == 4
+    rt = table[table["metric"] == "response_time_ms"].set_index("query_type")
+    assert rt.loc["nested", "reject_h0"] and not rt.loc["simple", "reject_h0"]
+    assert (rt["n_rest"] == 60).all()
+    assert (table["p_adj"] >= table["p"]).all()
+
+
+def test_connection_and_query_modes_are_cells():
+    rng = np.random.default_rng(1)
+    frames = []
+    for cm in ("reuse", "fresh"):
+        frames.append(pd.DataFrame({
+            "api_type": "REST", "query_type": "simple", "cache_state": "cold",
+            "concurrent_clients": 1, "connection_mode": cm, "query_mode": np.nan,
+            "response_time_ms": rng.normal(100, 5, 30)}))
+        for qm in ("full", "persisted"):
+            frames.append(pd.DataFrame({
+                "api_type": "GraphQL", "query_type": "simple", "cache_state": "cold",
+                "concurrent_clients": 1, "connection_mode": cm, "query_mode": qm,
+                "response_time_ms": rng.normal(100, 5, 30)}))
+    table = _stratified(pd.concat(frames), ["response_time_ms"])
+    # REST in each connection mode against each GraphQL query mode.
+    assert len(table) == 4
+    assert set(zip(table["connection_mode"], table["query_mode"])) == {
+        (cm, qm) for cm in ("reuse", "fresh") for qm in ("full", "persisted")}
+    assert (table["n_rest"] == 30).all() and (table["n_graphql"] == 30).all()
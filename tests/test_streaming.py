@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+
+from src.analyzers.sketches import HdrHistogram, RunningStats
+from src.analyzers.streaming import StreamingAggregator
+from src.collectors.result_writer import ResultWriter
+
+
+def test_running_stats_merge_matches_numpy():
+    x = np.random.default_rng(0).normal(50, 7, 1001)
+    a, b = RunningStats(), RunningStats()
+    a.update(x[:300])
+    b.update(x[300:])
+    a.merge(b)
+    assert a.count == 1001
+    assert np.isclose(a.mean, x.mean()) and np.isclose(a.std, x.std(ddof=1))
+
+
+def test_hdr_quantiles_within_precision_and_round_trip():
+    x = np.random.default_rng(1).lognormal(9, 1.2, 50_000)
+    h = HdrHistogram(significant_digits=3)
+    h.record(x)
+    exact = np.quantile(np.rint(x), [0.5, 0.99], method="inverted_cdf")
+    assert np.all(np.abs(h.quantiles([0.5, 0.99]) / exact - 1) < 1e-3)
+    assert np.array_equal(HdrHistogram.from_dict(h.to_dict()).counts, h.counts)
+
+
+def test_aggregator_reads_only_new_csv_rows(tmp_path):
+    rng = np.random.default_rng(2)
+    path = tmp_path / "run.csv"
+
+    def rows(n):
+        return pd.DataFrame({
+            "api_type": rng.choice(["REST", "GraphQL"], n),
+            "query_type": "simple", "cache_state": "cold", "concurrent_clients": 10,
+            "response_time_ms": rng.gamma(4, 20, n).round(3),
+            "payload_size_bytes": rng.integers(100, 5000, n),
+        })
+
+    first, second = rows(700), rows(500)
+    first.to_csv(path, index=False)
+    agg = StreamingAggregator()
+    assert agg.consume(str(path), chunk_rows=128) == 700
+    second.to_csv(path, mode="a", header=False, index=False)
+    agg = StreamingAggregator.from_dict(agg.to_dict())
+    assert agg.consume(str(path), chunk_rows=128) == 500
+
+    full = pd.concat([first, second])
+    table = agg.summary().set_index(["api_type", "metric"])
+    for api, sub in full.groupby("api_type"):
+        row = table.loc[(api, "response_time_ms")]
+        assert row["count"] == len(sub)
+        assert np.isclose(row["mean"], sub["response_time_ms"].mean())
+        assert abs(row["p50"] / sub["response_time_ms"].median() - 1) < 2e-3
+
+
+def test_aggregator_follows_a_resumed_run(tmp_path):
+    path = str(tmp_path / "run.csv")
+    headers = ["api_type", "query_type", "cache_state", "concurrent_clients",
+               "response_time_ms", "payload_size_bytes"]
+
+    def row(api, ms):
+        return dict(zip(headers, [api, "simple", "cold", 1, ms, 100]))
+
+    with ResultWriter(path, headers) as writer:
+        for ms in (10.0, 20.0):
+            writer.writerow(row("REST", ms))
+        writer.mark_done("REST")
+        # Interrupted treatment: not yet final, so not read.
+        writer.writerow(row("GraphQL", 999.0))
+        writer.writerow(row("GraphQL", 999.0))
+    agg = StreamingAggregator()
+    assert agg.consume(path) == 2
+
+    # Resume truncates the interrupted rows and writes the treatment again.
+    with ResultWriter(path, headers) as writer:
+        writer.writerow(row("GraphQL", 30.0))
+        writer.mark_done("GraphQL")
+    agg = StreamingAggregator.from_dict(agg.to_dict())
+    assert agg.consume(path) == 1
+    table = agg.summary().set_index(["api_type", "metric"])
+    assert table.loc[("GraphQL", "response_time_ms"), "max"] == 30.0
+    assert table["count"].sum() == 6